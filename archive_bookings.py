@@ -0,0 +1,10 @@
+# archive_bookings.py → pindahkan booking completed/cancelled yang sudah lama ke bookings_archive
+# Pakai: python archive_bookings.py [umur_hari] [batch_size]
+
+import sys
+from utils.archive import archive_bookings, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+
+days = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AFTER_DAYS
+batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else ARCHIVE_BATCH_SIZE
+moved = archive_bookings(days, batch_size)
+print(f"{moved} booking lebih tua dari {days} hari dipindah ke bookings_archive")
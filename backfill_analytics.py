@@ -0,0 +1,9 @@
+# backfill_analytics.py → bangun ulang rollup analitik dari histori bookings
+# Pakai: python backfill_analytics.py [batch_size]
+
+import sys
+from utils.analytics import rebuild_rollups, BACKFILL_BATCH_SIZE
+
+batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else BACKFILL_BATCH_SIZE
+total = rebuild_rollups(batch_size)
+print(f"Rollup analitik dibangun ulang dari {total} booking (batch {batch_size})")
@@ -0,0 +1,7 @@
+# backfill_fare_calendar.py → bangun ulang fare_calendar dari koleksi schedules
+# Pakai: python backfill_fare_calendar.py
+
+from utils.fare_calendar import rebuild
+
+rebuild()
+print("Fare calendar dibangun ulang")
@@ -0,0 +1,9 @@
+# build_static.py → salin css/js ke static/dist dengan hash isi di nama file + salinan .gz/.br,
+# dan tulis static/dist/index.html yang memakai URL baru. Jalankan ulang setiap aset berubah.
+# Pakai: python build_static.py
+
+from utils.static_assets import build
+
+for name, sizes in build().items():
+    detail = ", ".join(f"{enc} {size:,} B" for enc, size in sizes.items())
+    print(f"{name}: {detail}")
@@ -1,16 +1,72 @@
 # database.py
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from utils import circuit_breaker, profiling
 import os
 
 load_dotenv()
 MONGODB_URI = os.getenv("MONGODB_URI")
-client = MongoClient(MONGODB_URI)
-db = client.travel_agency
+MONGODB_DB = os.getenv("MONGODB_DB", "travel_agency")
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
+# Default driver 30 detik; server tidak terjangkau harus cepat terdeteksi circuit breaker
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# "memory" → entitas utama di repositories/memory.py, subsistem yang hanya ada di MongoDB
+# (outbox, waitlist, idempotency, cache bus, audit, okupansi, kalender harga) dimatikan
+# supaya aplikasi bisa jalan tanpa mongod (benchmark/pengujian offline)
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "mongo")
+MONGO_ENABLED = REPOSITORY_BACKEND != "memory"
+
+# connect=False → import modul ini tidak membuka koneksi; koneksi dibuka saat operasi pertama
+# atau saat warm_up() dipanggil dari lifespan aplikasi (main.py)
+# Latensi/error setiap command dicatat circuit breaker (utils/circuit_breaker.py) dan,
+# untuk request yang diprofil, oleh utils/profiling.py
+client = MongoClient(
+    MONGODB_URI,
+    connect=False,
+    minPoolSize=MONGODB_MIN_POOL_SIZE,
+    serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    event_listeners=[circuit_breaker.CommandListener(), profiling.CommandListener()]
+)
+db = client[MONGODB_DB]
 
 # Koleksi
 users = db.users
 schedules = db.schedules
 bookings = db.bookings
+bookings_archive = db.bookings_archive   # booking lama (lihat utils/archive.py)
 reviews = db.reviews 
-companies = db.companies
\ No newline at end of file
+companies = db.companies
+
+# Rollup analitik harian (lihat utils/analytics.py)
+daily_stats = db.daily_stats
+
+# Response tersimpan untuk header Idempotency-Key (lihat utils/idempotency.py)
+idempotency_keys = db.idempotency_keys
+
+# Ringkasan harga/kursi harian per rute (lihat utils/fare_calendar.py)
+fare_calendar = db.fare_calendar
+
+# Capped collection bus invalidasi cache antar worker (lihat utils/cache_bus.py)
+cache_invalidations = db.cache_invalidations
+
+# Antrian efek samping async booking/review (lihat utils/outbox.py)
+outbox = db.outbox
+
+# Antrian tunggu jadwal yang penuh (lihat utils/waitlist.py)
+waitlist = db.waitlist
+
+# Time-series riwayat kursi tersedia per jadwal (lihat utils/occupancy.py)
+schedule_occupancy = db.schedule_occupancy
+
+# Jejak audit mutasi admin, ditulis batch oleh utils/audit.py
+audit_log = db.audit_log
+
+
+def warm_up(index_setups: list):
+    # Ping + semua pengecekan index jalan paralel, sekaligus mengisi connection pool
+    with ThreadPoolExecutor(max_workers=len(index_setups) + 1) as pool:
+        futures = [pool.submit(client.admin.command, "ping")]
+        futures += [pool.submit(setup) for setup in index_setups]
+        for future in futures:
+            future.result()
@@ -1,29 +1,84 @@
 # main.py
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-from routes import user, schedule, booking, review, company
-from database import client
-import uvicorn
+from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from routes import user, schedule, booking, review, company, analytics, admin
+from utils.analytics import ensure_indexes as ensure_analytics_indexes
+from utils.idempotency import ensure_indexes as ensure_idempotency_indexes
+from utils.review_search import ensure_indexes as ensure_review_search_indexes
+from utils.ratings import ensure_indexes as ensure_rating_indexes
+from utils.fare_calendar import ensure_indexes as ensure_fare_calendar_indexes
+from utils.archive import ensure_indexes as ensure_archive_indexes
+from utils.schedule_import import ensure_indexes as ensure_schedule_import_indexes
+from utils.waitlist import ensure_indexes as ensure_waitlist_indexes
+from utils import cache_bus, schedule_snapshot, outbox, audit, occupancy
+from utils.rate_limit import RateLimitMiddleware
+from utils.circuit_breaker import circuit_breaker_middleware
+from utils.profiling import ProfilingMiddleware
+from utils.compression import CompressionMiddleware
+from utils.static_assets import PrecompressedStaticFiles, file_response, index_path, NO_CACHE
+from database import client, warm_up, MONGO_ENABLED
+import asyncio
 
-app = FastAPI(title="Travel Agency API")
+INDEX_SETUPS = [
+    ensure_analytics_indexes,
+    ensure_idempotency_indexes,
+    ensure_review_search_indexes,
+    ensure_rating_indexes,
+    ensure_fare_calendar_indexes,
+    ensure_archive_indexes,
+    ensure_schedule_import_indexes,
+    ensure_waitlist_indexes,
+    cache_bus.ensure_collection,
+    outbox.ensure_indexes,
+    audit.ensure_indexes,
+    occupancy.ensure_collection,
+]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not MONGO_ENABLED:
+        # REPOSITORY_BACKEND=memory: tanpa ping/index dan tanpa worker yang membaca MongoDB
+        yield
+        return
+    await asyncio.to_thread(warm_up, INDEX_SETUPS)
+    if schedule_snapshot.snapshot is not None:
+        await asyncio.to_thread(schedule_snapshot.snapshot.load)
+    stop_cache_bus = cache_bus.start()
+    stop_outbox = outbox.start()
+    stop_audit = audit.start()
+    stop_occupancy = occupancy.start()
+    yield
+    stop_occupancy()
+    stop_audit()
+    stop_outbox()
+    stop_cache_bus()
+    client.close()
+
+app = FastAPI(title="Travel Agency API", lifespan=lifespan)
+# Paling dalam: profil request (header X-Profile) hanya mengukur aplikasi, bukan middleware lain
+app.add_middleware(ProfilingMiddleware)
+# Circuit breaker melihat body asli (belum di-gzip) untuk disimpan sebagai cadangan stale
+app.middleware("http")(circuit_breaker_middleware)
+# Response API >1 KB dikompres brotli/gzip sesuai q-value Accept-Encoding (listing JSON besar);
+# aset statis sudah dikompres saat build. Didaftarkan sebelum rate limit → berada di dalamnya.
+app.add_middleware(CompressionMiddleware, minimum_size=1024, compresslevel=6)
+app.add_middleware(RateLimitMiddleware)
 
 app.include_router(user.router, prefix="/api/users")
 app.include_router(schedule.router, prefix="/api/schedules")
 app.include_router(booking.router, prefix="/api/bookings")
 app.include_router(review.router, prefix="/api/reviews") 
 app.include_router(company.router, prefix="/api/companies")
+app.include_router(analytics.router, prefix="/api/analytics")
+app.include_router(admin.router, prefix="/api/admin")
 
-# Serve static files (HTML, CSS, JS)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Serve static files (HTML, CSS, JS); static/dist hasil build_static.py → precompressed + immutable
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 @app.get("/")
-async def root():
-    return FileResponse("static/index.html")
-
-@app.on_event("shutdown")
-def shutdown_db_client():
-    client.close()
+async def root(request: Request):
+    return file_response(index_path(), request.headers.get("accept-encoding", ""), NO_CACHE)
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
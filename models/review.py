@@ -20,4 +20,7 @@ class ReviewOut(BaseModel):
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+        }
+
+class ReviewSearchOut(ReviewOut):
+    score: float = 0.0     # relevansi dari text index
\ No newline at end of file
@@ -0,0 +1,13 @@
+# repositories/__init__.py
+# Akses data entitas utama (users, companies, schedules, bookings, reviews) lewat repository.
+# Backend dipilih lewat REPOSITORY_BACKEND: "mongo" (default) atau "memory" (in-process, untuk
+# benchmark/pengujian tanpa mongod). Subsistem khusus (analytics, outbox, idempotency, waitlist,
+# fare calendar, pencarian review) tetap langsung memakai koleksi MongoDB di database.py; dengan
+# backend memory subsistem itu dimatikan (database.MONGO_ENABLED) dan endpoint-nya menjawab 503
+# (utils/auth.require_mongo).
+from database import REPOSITORY_BACKEND
+
+if REPOSITORY_BACKEND == "memory":
+    from repositories.memory import users, companies, schedules, bookings, reviews
+else:
+    from repositories.mongo import users, companies, schedules, bookings, reviews
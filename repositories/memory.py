@@ -0,0 +1,425 @@
+# repositories/memory.py
+# Implementasi repository in-memory (dict + index sekunder) untuk benchmark/pengujian offline
+# tanpa mongod. Bentuk hasil sama dengan repositories/mongo.py; join dilakukan lewat lookup
+# dict per _id. Tidak persisten dan hanya untuk satu proses.
+from bson import ObjectId
+from collections import defaultdict
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from utils import outbox
+import bisect
+import threading
+import re
+
+_lock = threading.RLock()
+
+
+class _Table:
+    """Dokumen per _id + index hash untuk field tertentu (opsional unik)."""
+
+    def __init__(self, indexed=(), unique=()):
+        self.rows = {}
+        self.unique = set(unique)
+        self.indexes = {field: defaultdict(set) for field in (*indexed, *unique)}
+
+    def _index(self, doc: dict, add: bool):
+        for field, index in self.indexes.items():
+            if field not in doc:
+                continue
+            if add:
+                index[doc[field]].add(doc["_id"])
+            else:
+                index[doc[field]].discard(doc["_id"])
+
+    def insert(self, doc: dict):
+        # Sama seperti insert_one: _id ditambahkan ke dokumen pemanggil
+        doc.setdefault("_id", ObjectId())
+        doc = dict(doc)
+        for field in self.unique:
+            if doc.get(field) is not None and self.indexes[field].get(doc[field]):
+                raise DuplicateKeyError(f"duplicate key: {field}")
+        self.rows[doc["_id"]] = doc
+        self._index(doc, add=True)
+        return doc["_id"]
+
+    def get(self, _id):
+        doc = self.rows.get(_id)
+        return dict(doc) if doc else None
+
+    def find(self, field: str, value) -> list:
+        return [dict(self.rows[_id]) for _id in self.indexes[field].get(value, ())]
+
+    def update(self, _id, fields: dict):
+        """Return (lama, baru) atau (None, None) jika tidak ada."""
+        old = self.rows.get(_id)
+        if old is None:
+            return None, None
+        new = {**old, **fields}
+        self._index(old, add=False)
+        self.rows[_id] = new
+        self._index(new, add=True)
+        return dict(old), dict(new)
+
+    def delete(self, _id):
+        old = self.rows.pop(_id, None)
+        if old is not None:
+            self._index(old, add=False)
+        return old
+
+
+users_table = _Table(indexed=("email",))
+companies_table = _Table()
+schedules_table = _Table(indexed=("company_id",))
+bookings_table = _Table(indexed=("user_id", "schedule_id"))
+reviews_table = _Table(indexed=("company_id",), unique=("booking_id",))
+
+# Index terurut (departure_date, _id) untuk filter rentang tanggal pencarian jadwal
+_by_departure = []
+
+
+def _sorted_key(doc: dict):
+    return (doc.get("departure_date") or datetime.min, doc["_id"])
+
+
+def _departure(key: tuple):
+    return key[0]
+
+
+def _company_summary(company_id):
+    company = companies_table.rows.get(company_id)
+    if not company:
+        return None
+    return {"id": str(company["_id"]), "name": company.get("name"), "type": company.get("type")}
+
+
+def _pick(doc: dict, fields) -> dict:
+    return {f: doc[f] for f in fields if f in doc}
+
+
+class UserRepository:
+    def get(self, user_id):
+        with _lock:
+            user = users_table.get(user_id)
+        if user:
+            user.pop("password", None)
+        return user
+
+    def get_by_email(self, email: str):
+        with _lock:
+            found = users_table.find("email", email)
+        return found[0] if found else None
+
+    def insert(self, doc: dict):
+        with _lock:
+            return users_table.insert(doc)
+
+    def update(self, user_id, fields: dict) -> bool:
+        with _lock:
+            old, new = users_table.update(user_id, fields)
+        return old is not None and old != new
+
+    def delete(self, user_id) -> bool:
+        with _lock:
+            return users_table.delete(user_id) is not None
+
+    def list_public(self):
+        with _lock:
+            rows = list(users_table.rows.values())
+        return [
+            {**{k: v for k, v in user.items() if k not in ("_id", "password")}, "id": str(user["_id"])}
+            for user in rows
+        ]
+
+
+class CompanyRepository:
+    def get(self, company_id):
+        with _lock:
+            return companies_table.get(company_id)
+
+    def find_by_name(self, name: str):
+        pattern = re.compile(f"^{name}$", re.IGNORECASE)
+        with _lock:
+            return next((dict(c) for c in companies_table.rows.values() if pattern.search(c.get("name", ""))), None)
+
+    def insert(self, doc: dict):
+        with _lock:
+            return companies_table.insert(doc)
+
+    def update(self, company_id, fields: dict) -> bool:
+        with _lock:
+            old, new = companies_table.update(company_id, fields)
+        return old is not None and old != new
+
+    def delete(self, company_id) -> bool:
+        with _lock:
+            return companies_table.delete(company_id) is not None
+
+    def _ratings(self, company_id):
+        ratings = [r["rating"] for r in reviews_table.find("company_id", company_id)]
+        return (round(sum(ratings) / len(ratings), 1) if ratings else 0.0), len(ratings)
+
+    def list_with_ratings(self) -> list:
+        result = []
+        with _lock:
+            for company in companies_table.rows.values():
+                item = _pick(company, ("name", "type", "description", "logo", "contact_email", "phone"))
+                item["average_rating"], item["total_reviews"] = self._ratings(company["_id"])
+                item["id"] = str(company["_id"])
+                result.append(item)
+        return result
+
+    def get_with_ratings(self, company_id):
+        with _lock:
+            company = companies_table.get(company_id)
+            if not company:
+                return None
+            company["average_rating"], company["total_reviews"] = self._ratings(company_id)
+        company["id"] = str(company.pop("_id"))
+        return company
+
+
+class ScheduleRepository:
+    def get(self, schedule_id, projection: dict = None):
+        with _lock:
+            sched = schedules_table.get(schedule_id)
+        if sched and projection:
+            sched = {"_id": sched["_id"], **_pick(sched, [f for f, on in projection.items() if on])}
+        return sched
+
+    def get_with_company(self, schedule_id):
+        with _lock:
+            sched = schedules_table.get(schedule_id)
+            if sched:
+                company = companies_table.get(sched.get("company_id"))
+                if company:
+                    sched["company_info"] = company
+        return sched
+
+    def insert(self, doc: dict):
+        with _lock:
+            _id = schedules_table.insert(doc)
+            bisect.insort(_by_departure, _sorted_key(schedules_table.rows[_id]))
+        return _id
+
+    def update(self, schedule_id, fields: dict):
+        with _lock:
+            current = schedules_table.rows.get(schedule_id)
+            if current and "available_seats" in fields and "capacity" in current:
+                # Sama seperti mongo: kursi terjual (capacity - available_seats) tetap
+                seats = fields["available_seats"]
+                sold = current["capacity"] - current.get("available_seats", 0)
+                fields = {**fields, "capacity": max(seats, seats + sold)}
+            old, new = schedules_table.update(schedule_id, fields)
+            if old is not None:
+                _by_departure.remove(_sorted_key(old))
+                bisect.insort(_by_departure, _sorted_key(new))
+        return old
+
+    def delete(self, schedule_id):
+        with _lock:
+            old = schedules_table.delete(schedule_id)
+            if old is not None:
+                _by_departure.remove(_sorted_key(old))
+        return old
+
+    def exists_for_company(self, company_id) -> bool:
+        with _lock:
+            return bool(schedules_table.indexes["company_id"].get(company_id))
+
+    def reserve_seats(self, schedule_id, count: int):
+        with _lock:
+            sched = schedules_table.rows.get(schedule_id)
+            if not sched or sched.get("available_seats", 0) < count:
+                return None
+            sched["available_seats"] -= count
+            return _pick(sched, ("_id", "origin", "destination", "available_seats"))
+
+    def release_seats(self, schedule_id, count: int):
+        with _lock:
+            sched = schedules_table.rows.get(schedule_id)
+            if not sched:
+                return None
+            sched["available_seats"] = sched.get("available_seats", 0) + count
+            return _pick(sched, ("_id", "origin", "destination", "available_seats"))
+
+    def search(self, origin, destination, type, start, end, price_min, price_max, sort_field, descending=False) -> list:
+        checks = []
+        if origin:
+            pattern = re.compile(origin, re.IGNORECASE)
+            checks.append(lambda s: pattern.search(s.get("origin") or ""))
+        if destination:
+            dest_pattern = re.compile(destination, re.IGNORECASE)
+            checks.append(lambda s: dest_pattern.search(s.get("destination") or ""))
+        if type:
+            type_pattern = re.compile(f"^{type}$", re.IGNORECASE)
+            checks.append(lambda s: type_pattern.search(s.get("type") or ""))
+        if price_min is not None:
+            checks.append(lambda s: s.get("price") is not None and s["price"] >= price_min)
+        if price_max is not None:
+            checks.append(lambda s: s.get("price") is not None and s["price"] <= price_max)
+
+        with _lock:
+            # Rentang tanggal lewat index terurut (bisect), sisanya difilter per dokumen
+            if start is not None or end is not None:
+                lo = bisect.bisect_left(_by_departure, start, key=_departure) if start is not None else 0
+                hi = bisect.bisect_right(_by_departure, end, key=_departure) if end is not None else len(_by_departure)
+                candidates = [schedules_table.rows[_id] for _, _id in _by_departure[lo:hi]]
+            else:
+                candidates = list(schedules_table.rows.values())
+            matched = [s for s in candidates if all(check(s) for check in checks)]
+
+            result = []
+            for sched in sorted(matched, key=lambda s: s.get(sort_field), reverse=descending):
+                item = _pick(sched, ("type", "origin", "destination", "departure_date", "arrival_date", "price", "available_seats"))
+                item["id"] = str(sched["_id"])
+                item["company"] = _company_summary(sched.get("company_id")) or {
+                    "id": None, "name": "Unknown Operator", "type": "unknown"
+                }
+                result.append(item)
+        return result
+
+
+class BookingRepository:
+    def get(self, booking_id):
+        with _lock:
+            return bookings_table.get(booking_id)
+
+    def insert(self, doc: dict):
+        with _lock:
+            return bookings_table.insert(doc)
+
+    def update(self, booking_id, fields: dict) -> bool:
+        with _lock:
+            old, new = bookings_table.update(booking_id, fields)
+        return old is not None and old != new
+
+    def delete(self, booking_id) -> bool:
+        with _lock:
+            return bookings_table.delete(booking_id) is not None
+
+    def set_status_review(self, booking_id, status: str) -> bool:
+        with _lock:
+            booking = bookings_table.rows.get(booking_id)
+            if not booking or booking.get("status_review") == status:
+                return False
+            bookings_table.update(booking_id, {"status_review": status})
+            return True
+
+    def cancel(self, booking_id) -> bool:
+        with _lock:
+            booking = bookings_table.rows.get(booking_id)
+            if not booking or booking.get("status") == "cancelled":
+                return False
+            bookings_table.update(booking_id, {"status": "cancelled", "cancelled_at": datetime.utcnow()})
+            return True
+
+    def has_active(self, schedule_id) -> bool:
+        with _lock:
+            return any(b.get("status") != "cancelled" for b in bookings_table.find("schedule_id", schedule_id))
+
+    def _detail(self, booking: dict, with_ids: bool) -> dict:
+        item = _pick(booking, ("booking_code", "status", "total_price", "passenger_name", "passenger_count", "booking_date"))
+        item["_id"] = str(booking["_id"])
+        item["status_review"] = booking.get("status_review") or "pending"
+        user = users_table.rows.get(booking.get("user_id"))
+        if user:
+            item["user_info"] = _pick(user, ("name", "email"))
+            if with_ids:
+                item["user_info"]["_id"] = str(user["_id"])
+        sched = schedules_table.rows.get(booking.get("schedule_id"))
+        if sched:
+            info = _pick(sched, ("origin", "destination", "departure_date", "price", "type"))
+            company = companies_table.rows.get(sched.get("company_id"))
+            if company:
+                info["company"] = _pick(company, ("name",))
+            if with_ids:
+                info["_id"] = str(sched["_id"])
+            item["schedule_info"] = info
+        return item
+
+    @staticmethod
+    def _in_range(booking: dict, start, end) -> bool:
+        date = booking.get("booking_date")
+        return (start is None or date >= start) and (end is None or date <= end)
+
+    def list_for_user(self, user_id, start=None, end=None):
+        with _lock:
+            return [self._detail(b, with_ids=True) for b in bookings_table.find("user_id", user_id)
+                    if self._in_range(b, start, end)]
+
+    def list_detailed(self, start=None, end=None):
+        with _lock:
+            return [self._detail(b, with_ids=False) for b in bookings_table.rows.values()
+                    if self._in_range(b, start, end)]
+
+    def get_detailed(self, booking_id):
+        with _lock:
+            booking = bookings_table.rows.get(booking_id)
+            return self._detail(booking, with_ids=False) if booking else None
+
+    def get_review_context(self, booking_id):
+        with _lock:
+            booking = bookings_table.rows.get(booking_id)
+            if not booking:
+                return None
+            context = _pick(booking, ("_id", "status", "status_review", "user_id"))
+            sched = schedules_table.rows.get(booking.get("schedule_id"))
+            if sched:
+                context["schedule"] = _pick(sched, ("company_id",))
+                company = companies_table.rows.get(sched.get("company_id"))
+                if company:
+                    context["company"] = _pick(company, ("name",))
+            user = users_table.rows.get(booking.get("user_id"))
+            if user:
+                context["user"] = _pick(user, ("name",))
+        return context
+
+
+class ReviewRepository:
+    def get(self, review_id):
+        with _lock:
+            return reviews_table.get(review_id)
+
+    def insert(self, doc: dict, side_effect: tuple = None):
+        with _lock:
+            review_id = reviews_table.insert(doc)
+        if side_effect:
+            kind, payload = side_effect
+            outbox.enqueue(kind, **payload)
+        return review_id
+
+    def update(self, review_id, fields: dict):
+        with _lock:
+            return reviews_table.update(review_id, fields)[0]
+
+    def exists_for_booking(self, booking_id) -> bool:
+        with _lock:
+            return bool(reviews_table.indexes["booking_id"].get(booking_id))
+
+    def delete(self, review_id):
+        with _lock:
+            return reviews_table.delete(review_id)
+
+    def list_detailed(self, company_id=None) -> list:
+        with _lock:
+            rows = reviews_table.find("company_id", company_id) if company_id is not None else list(reviews_table.rows.values())
+            result = []
+            for review in rows:
+                item = _pick(review, ("rating", "comment", "created_at"))
+                item["id"] = str(review["_id"])
+                item["company_id"] = str(review.get("company_id"))
+                company = companies_table.rows.get(review.get("company_id"))
+                if company:
+                    item["company_name"] = company.get("name")
+                user = users_table.rows.get(review.get("user_id"))
+                item["user_name"] = (user or {}).get("name") or "Anonymous"
+                result.append(item)
+        result.sort(key=lambda r: r.get("created_at"), reverse=True)
+        return result
+
+
+users = UserRepository()
+companies = CompanyRepository()
+schedules = ScheduleRepository()
+bookings = BookingRepository()
+reviews = ReviewRepository()
@@ -0,0 +1,282 @@
+# repositories/mongo.py
+# Implementasi repository di atas koleksi MongoDB (database.py). Semua join memakai $lookup.
+from database import users as users_col, companies as companies_col, schedules as schedules_col
+from database import bookings as bookings_col, bookings_archive, reviews as reviews_col
+import pymongo
+from pymongo import ReturnDocument
+from bson import ObjectId
+from datetime import datetime
+from utils.archive import booking_source, date_match
+from utils.raw_json import RawBatches
+from utils import outbox
+from repositories.pipelines import (
+    booking_pipeline, review_pipeline, review_context_pipeline, schedule_search_pipeline, JOIN_SCHEDULE_COMPANY
+)
+
+# Field jadwal yang dikembalikan reserve/release_seats (untuk riwayat okupansi)
+_SEATS_PROJECTION = {"origin": 1, "destination": 1, "available_seats": 1}
+
+
+class UserRepository:
+    def get(self, user_id):
+        """User tanpa field password, atau None."""
+        return users_col.find_one({"_id": user_id}, {"password": 0})
+
+    def get_by_email(self, email: str):
+        return users_col.find_one({"email": email})
+
+    def insert(self, doc: dict):
+        return users_col.insert_one(doc).inserted_id
+
+    def update(self, user_id, fields: dict) -> bool:
+        return users_col.update_one({"_id": user_id}, {"$set": fields}).modified_count == 1
+
+    def delete(self, user_id) -> bool:
+        return users_col.delete_one({"_id": user_id}).deleted_count == 1
+
+    def list_public(self):
+        """Semua user tanpa password, _id diganti id (string)."""
+        pipeline = [
+            {"$project": {"password": 0}},
+            {"$addFields": {"id": {"$toString": "$_id"}}},
+            {"$project": {"_id": 0}}
+        ]
+        return RawBatches(users_col, pipeline)
+
+
+class CompanyRepository:
+    def get(self, company_id):
+        return companies_col.find_one({"_id": company_id})
+
+    def find_by_name(self, name: str):
+        # Case-insensitive, nama harus sama persis
+        return companies_col.find_one({"name": {"$regex": f"^{name}$", "$options": "i"}})
+
+    def insert(self, doc: dict):
+        return companies_col.insert_one(doc).inserted_id
+
+    def update(self, company_id, fields: dict) -> bool:
+        return companies_col.update_one({"_id": company_id}, {"$set": fields}).modified_count == 1
+
+    def delete(self, company_id) -> bool:
+        return companies_col.delete_one({"_id": company_id}).deleted_count == 1
+
+    def list_with_ratings(self) -> list:
+        # Rating dari field cached (utils/ratings.py), tanpa $lookup ke reviews
+        pipeline = [
+            {"$project": {
+                "name": 1, "type": 1, "description": 1, "logo": 1,
+                "contact_email": 1, "phone": 1,
+                "average_rating": {"$ifNull": ["$cached_rating", 0]},
+                "total_reviews": {"$ifNull": ["$cached_total_reviews", 0]}
+            }}
+        ]
+        result = list(companies_col.aggregate(pipeline))
+        for item in result:
+            item["id"] = str(item.pop("_id"))
+            item["average_rating"] = item.get("average_rating") or 0.0
+        return result
+
+    def get_with_ratings(self, company_id):
+        pipeline = [
+            {"$match": {"_id": company_id}},
+            {"$lookup": {
+                "from": "reviews",
+                "localField": "_id",
+                "foreignField": "company_id",
+                "as": "company_reviews"
+            }},
+            {"$addFields": {
+                "average_rating": {"$round": [{"$ifNull": [{"$avg": "$company_reviews.rating"}, 0]}, 1]},
+                "total_reviews": {"$size": "$company_reviews"}
+            }},
+            {"$project": {"company_reviews": 0}}
+        ]
+        company = next(companies_col.aggregate(pipeline), None)
+        if company:
+            company["id"] = str(company.pop("_id"))
+            company["average_rating"] = company.get("average_rating") or 0.0
+        return company
+
+
+class ScheduleRepository:
+    def get(self, schedule_id, projection: dict = None):
+        return schedules_col.find_one({"_id": schedule_id}, projection)
+
+    def get_with_company(self, schedule_id):
+        """Dokumen jadwal mentah + company_info (dokumen company atau None)."""
+        pipeline = [
+            {"$match": {"_id": schedule_id}},
+            *JOIN_SCHEDULE_COMPANY
+        ]
+        return next(schedules_col.aggregate(pipeline), None)
+
+    def insert(self, doc: dict):
+        return schedules_col.insert_one(doc).inserted_id
+
+    def update(self, schedule_id, fields: dict):
+        """Terapkan $set, kembalikan dokumen versi lama (None jika tidak ada)."""
+        if "available_seats" not in fields:
+            return schedules_col.find_one_and_update({"_id": schedule_id}, {"$set": fields})
+        # available_seats = stok saat ini → capacity bergeser sebesar selisih stok supaya kursi terjual
+        # (capacity - available_seats, dasar load factor utils/occupancy.py) tetap. Satu update
+        # pipeline: $set satu stage membaca nilai lama, jadi tidak ada celah dengan booking paralel.
+        # Jadwal lama tanpa capacity dibiarkan tanpa capacity.
+        seats = fields["available_seats"]
+        return schedules_col.find_one_and_update({"_id": schedule_id}, [{"$set": {
+            # $literal: nilai string "$..." tidak boleh dibaca sebagai field path
+            **{k: {"$literal": v} for k, v in fields.items()},
+            "capacity": {"$cond": [
+                {"$eq": [{"$type": "$capacity"}, "missing"]},
+                "$$REMOVE",
+                {"$max": [seats, {"$add": [
+                    "$capacity", {"$subtract": [seats, {"$ifNull": ["$available_seats", 0]}]}
+                ]}]}
+            ]}
+        }}])
+
+    def delete(self, schedule_id):
+        """Hapus, kembalikan dokumen yang dihapus (None jika tidak ada)."""
+        return schedules_col.find_one_and_delete({"_id": schedule_id})
+
+    def exists_for_company(self, company_id) -> bool:
+        return schedules_col.find_one({"company_id": company_id}, {"_id": 1}) is not None
+
+    def reserve_seats(self, schedule_id, count: int):
+        """Jadwal sesudah update (_SEATS_PROJECTION), atau None jika kursi tidak cukup."""
+        # Kurangi stok hanya jika kursi masih cukup (atomik, tidak bisa overbooking)
+        return schedules_col.find_one_and_update(
+            {"_id": schedule_id, "available_seats": {"$gte": count}},
+            {"$inc": {"available_seats": -count}},
+            projection=_SEATS_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+
+    def release_seats(self, schedule_id, count: int):
+        """Jadwal sesudah update (_SEATS_PROJECTION), atau None jika tidak ada."""
+        return schedules_col.find_one_and_update(
+            {"_id": schedule_id},
+            {"$inc": {"available_seats": count}},
+            projection=_SEATS_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+
+    def search(self, origin, destination, type, start, end, price_min, price_max, sort_field, descending=False) -> list:
+        """Cari jadwal + join company, bentuk hasil sama dengan GET /api/schedules/."""
+        query = {}
+        if origin:
+            query["origin"] = {"$regex": origin, "$options": "i"}
+        if destination:
+            query["destination"] = {"$regex": destination, "$options": "i"}
+        if type:
+            query["type"] = {"$regex": f"^{type}$", "$options": "i"}  # lebih ketat
+        if start is not None or end is not None:
+            query["departure_date"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v is not None}
+        if price_min is not None:
+            query["price"] = {**query.get("price", {}), "$gte": price_min}
+        if price_max is not None:
+            query["price"] = {**query.get("price", {}), "$lte": price_max}
+
+        # Filter + sort, join companies, lalu projection kartu (template di repositories/pipelines.py)
+        pipeline = schedule_search_pipeline(
+            query, {sort_field: pymongo.DESCENDING if descending else pymongo.ASCENDING}
+        )
+        result = list(schedules_col.aggregate(pipeline))
+
+        # Jika company_info kosong (jadwal lama), beri nilai default
+        for sched in result:
+            if not sched.get("company"):
+                sched["company"] = {"id": None, "name": "Unknown Operator", "type": "unknown"}
+        return result
+
+
+class BookingRepository:
+    def get(self, booking_id):
+        return bookings_col.find_one({"_id": booking_id})
+
+    def insert(self, doc: dict):
+        return bookings_col.insert_one(doc).inserted_id
+
+    def update(self, booking_id, fields: dict) -> bool:
+        return bookings_col.update_one({"_id": booking_id}, {"$set": fields}).modified_count == 1
+
+    def delete(self, booking_id) -> bool:
+        return bookings_col.delete_one({"_id": booking_id}).deleted_count == 1
+
+    def set_status_review(self, booking_id, status: str) -> bool:
+        """Ubah status_review; False jika tidak ada atau statusnya sudah sama (atomik)."""
+        result = bookings_col.update_one(
+            {"_id": booking_id, "status_review": {"$ne": status}}, {"$set": {"status_review": status}}
+        )
+        return result.modified_count == 1
+
+    def cancel(self, booking_id) -> bool:
+        """Tandai cancelled; False jika tidak ada atau sudah cancelled (atomik)."""
+        result = bookings_col.update_one(
+            {"_id": booking_id, "status": {"$ne": "cancelled"}},
+            {"$set": {"status": "cancelled", "cancelled_at": datetime.utcnow()}}
+        )
+        return result.modified_count == 1
+
+    def has_active(self, schedule_id) -> bool:
+        return bookings_col.find_one({"schedule_id": schedule_id, "status": {"$ne": "cancelled"}}, {"_id": 1}) is not None
+
+    def list_for_user(self, user_id, start=None, end=None):
+        """Booking milik user + info user/jadwal/company (termasuk archive jika rentangnya perlu)."""
+        # Filter hanya booking milik user ini (+ archive jika rentangnya menyentuh archive)
+        source = booking_source({"user_id": user_id, **date_match(start, end)}, start)
+        pipeline = booking_pipeline(source, with_ids=True)
+        return RawBatches(bookings_col, pipeline)
+
+    def list_detailed(self, start=None, end=None):
+        """Semua booking + info user/jadwal/company (termasuk archive jika rentangnya perlu)."""
+        pipeline = booking_pipeline(booking_source(date_match(start, end), start))
+        return RawBatches(bookings_col, pipeline)
+
+    def get_detailed(self, booking_id):
+        pipeline = booking_pipeline([{"$match": {"_id": booking_id}}])
+        # Booking lama mungkin sudah dipindah ke archive
+        return next(bookings_col.aggregate(pipeline), None) or next(bookings_archive.aggregate(pipeline), None)
+
+    def get_review_context(self, booking_id):
+        """Booking + company_id jadwal + nama company + nama user untuk membuat review."""
+        return next(bookings_col.aggregate(review_context_pipeline(booking_id)), None)
+
+
+class ReviewRepository:
+    def get(self, review_id):
+        return reviews_col.find_one({"_id": review_id})
+
+    def insert(self, doc: dict, side_effect: tuple = None):
+        # Duplikat dicegah unique index reviews.booking_id (lihat utils/ratings.py) → DuplicateKeyError
+        # side_effect = (kind, payload) outbox → ditulis dalam satu bulkWrite bersama review
+        if side_effect:
+            doc.setdefault("_id", ObjectId())
+            kind, payload = side_effect
+            outbox.insert_with(reviews_col, doc, kind, **payload)
+            return doc["_id"]
+        return reviews_col.insert_one(doc).inserted_id
+
+    def update(self, review_id, fields: dict):
+        """Terapkan $set, kembalikan dokumen versi lama (None jika tidak ada)."""
+        return reviews_col.find_one_and_update({"_id": review_id}, {"$set": fields})
+
+    def exists_for_booking(self, booking_id) -> bool:
+        return reviews_col.find_one({"booking_id": booking_id}, {"_id": 1}) is not None
+
+    def delete(self, review_id):
+        """Hapus, kembalikan dokumen yang dihapus (None jika tidak ada)."""
+        return reviews_col.find_one_and_delete({"_id": review_id})
+
+    def list_detailed(self, company_id=None) -> list:
+        """Review + nama user/company, terbaru dulu; semua atau per company."""
+        match = {"company_id": company_id} if company_id is not None else None
+        pipeline = review_pipeline(match)
+        return list(reviews_col.aggregate(pipeline))
+
+
+users = UserRepository()
+companies = CompanyRepository()
+schedules = ScheduleRepository()
+bookings = BookingRepository()
+reviews = ReviewRepository()
@@ -0,0 +1,185 @@
+# repositories/pipelines.py
+# Template stage aggregation yang dipakai bersama (join user, jadwal + company, projection
+# booking/review). Stage dibangun sekali saat import dan dipakai ulang di setiap request;
+# yang berubah per request hanya stage $match/$sort/$skip/$limit di depan.
+# Urutan selalu: filter → sort → skip/limit → join → projection, supaya $lookup hanya
+# dijalankan untuk dokumen yang benar-benar dikembalikan (dicek tests/test_pipelines.py).
+# Template dibekukan (FrozenDict/tuple) supaya tidak bisa diubah tanpa sengaja oleh satu request.
+# FrozenDict subclass dict, bukan MappingProxyType: encoder BSON C hanya cepat untuk dict
+# (MappingProxyType ~5x lebih lambat di-encode, lihat scripts/bench_pipelines.py).
+
+
+class FrozenDict(dict):
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Template pipeline tidak boleh diubah (repositories/pipelines.py)")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # copy/deepcopy/pickle membuat ulang dari isi dict, bukan lewat __setitem__
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value):
+    """dict → FrozenDict, list → tuple (rekursif)."""
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def join(collection: str, local_field: str, as_field: str) -> tuple:
+    """$lookup by _id + $unwind yang mempertahankan dokumen tanpa pasangan."""
+    return freeze((
+        {"$lookup": {"from": collection, "localField": local_field, "foreignField": "_id", "as": as_field}},
+        {"$unwind": {"path": f"${as_field}", "preserveNullAndEmptyArrays": True}},
+    ))
+
+
+JOIN_BOOKING_USER = join("users", "user_id", "user_info")
+# Jadwal + company di dalam schedule_info (biar company name langsung ada)
+JOIN_BOOKING_SCHEDULE = (
+    *join("schedules", "schedule_id", "schedule_info"),
+    *join("companies", "schedule_info.company_id", "schedule_info.company"),
+)
+JOIN_REVIEW_USER = join("users", "user_id", "user_info")
+JOIN_REVIEW_COMPANY = join("companies", "company_id", "company_info")
+JOIN_SCHEDULE_COMPANY = join("companies", "company_id", "company_info")
+
+_BOOKING_FIELDS = {
+    # Field utama
+    "_id": {"$toString": "$_id"},                  # ← jadi string, nama field tetap "_id"
+    "booking_code": 1,
+    "status": 1,
+    "status_review": {"$ifNull": ["$status_review", "pending"]},  # ← WAJIB ADA (default "pending")
+    "total_price": 1,
+    "passenger_name": 1,
+    "passenger_count": 1,
+    "booking_date": 1,
+
+    # User info
+    "user_info.name": 1,
+    "user_info.email": 1,
+
+    # Schedule info
+    "schedule_info.origin": 1,
+    "schedule_info.destination": 1,
+    "schedule_info.departure_date": 1,
+    "schedule_info.price": 1,
+    "schedule_info.type": 1,
+    "schedule_info.company.name": 1,               # ← company name langsung ada
+}
+PROJECT_BOOKING = freeze({"$project": _BOOKING_FIELDS})
+# Listing milik user juga mengirim ID user & jadwal (dipakai frontend untuk review/detail)
+PROJECT_BOOKING_WITH_IDS = freeze({"$project": {
+    **_BOOKING_FIELDS,
+    "user_info._id": {"$toString": "$user_info._id"},
+    "schedule_info._id": {"$toString": "$schedule_info._id"},
+}})
+
+_REVIEW_FIELDS = {
+    "id": {"$toString": "$_id"},
+    "company_id": {"$toString": "$company_id"},
+    "company_name": "$company_info.name",
+    "user_name": {"$ifNull": ["$user_info.name", "Anonymous"]},
+    "rating": 1,
+    "comment": 1,
+    "created_at": 1
+}
+PROJECT_REVIEW = freeze({"$project": _REVIEW_FIELDS})
+# Hasil pencarian full-text (utils/review_search.py) juga mengirim skor relevansi
+TEXT_SCORE = freeze({"$addFields": {"score": {"$meta": "textScore"}}})
+PROJECT_REVIEW_SCORED = freeze({"$project": {**_REVIEW_FIELDS, "score": 1}})
+
+# Kartu hasil pencarian jadwal; company kosong (jadwal lama) diisi default di repositories/mongo.py
+PROJECT_SCHEDULE_CARD = freeze({"$project": {
+    "id": {"$toString": "$_id"},
+    "_id": 0,
+    "type": 1,
+    "origin": 1,
+    "destination": 1,
+    "departure_date": 1,
+    "arrival_date": 1,
+    "price": 1,
+    "available_seats": 1,
+    "company": {
+        "id": {"$toString": "$company_info._id"},
+        "name": "$company_info.name",
+        "type": "$company_info.type"
+    }
+}})
+
+# Data untuk membuat review: status booking + company_id jadwal + nama company + nama user
+REVIEW_CONTEXT = (
+    *join("schedules", "schedule_id", "schedule"),
+    *join("companies", "schedule.company_id", "company"),
+    *join("users", "user_id", "user"),
+    freeze({"$project": {
+        "status": 1,
+        "status_review": 1,
+        "user_id": 1,
+        "schedule.company_id": 1,
+        "company.name": 1,
+        "user.name": 1
+    }}),
+)
+
+
+def _window(sort: dict = None, skip: int = 0, limit: int = None) -> list:
+    stages = []
+    if sort:
+        stages.append({"$sort": sort})
+    if skip:
+        stages.append({"$skip": skip})
+    if limit:
+        stages.append({"$limit": limit})
+    return stages
+
+
+def booking_pipeline(source: list, with_ids: bool = False, sort: dict = None, skip: int = 0, limit: int = None) -> list:
+    """source: stage filter awal ($match, boleh + $unionWith dari utils/archive.booking_source)."""
+    return [
+        *source,
+        *_window(sort, skip, limit),
+        *JOIN_BOOKING_USER,
+        *JOIN_BOOKING_SCHEDULE,
+        PROJECT_BOOKING_WITH_IDS if with_ids else PROJECT_BOOKING,
+    ]
+
+
+def review_pipeline(match: dict = None, skip: int = 0, limit: int = None) -> list:
+    """Review + nama user/company, terbaru dulu."""
+    return [
+        *([{"$match": match}] if match else []),
+        *_window({"created_at": -1}, skip, limit),
+        *JOIN_REVIEW_USER,
+        *JOIN_REVIEW_COMPANY,
+        PROJECT_REVIEW,
+    ]
+
+
+def review_search_pipeline(match: dict, skip: int = 0, limit: int = None) -> list:
+    """match berisi $text → ranking textScore, lalu paging, baru join (hanya untuk 1 halaman)."""
+    return [
+        {"$match": match},
+        TEXT_SCORE,
+        *_window({"score": -1, "created_at": -1}, skip, limit),
+        *JOIN_REVIEW_USER,
+        *JOIN_REVIEW_COMPANY,
+        PROJECT_REVIEW_SCORED,
+    ]
+
+
+def schedule_search_pipeline(match: dict, sort: dict) -> list:
+    return [
+        {"$match": match},
+        *_window(sort),
+        *JOIN_SCHEDULE_COMPANY,
+        PROJECT_SCHEDULE_CARD,
+    ]
+
+
+def review_context_pipeline(booking_id) -> list:
+    return [{"$match": {"_id": booking_id}}, *REVIEW_CONTEXT]
@@ -0,0 +1,77 @@
+# routes/admin.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from utils.auth import get_current_user_admin, require_mongo
+from utils import rate_limit, outbox, schedule_cache, search_cache, admin_summary, profiling, audit, occupancy
+from bson import ObjectId
+from datetime import datetime
+from typing import Optional
+
+router = APIRouter()
+
+# === GET: Ringkasan dashboard admin ($facet per koleksi, cache beberapa detik) ===
+@router.get("/summary", response_model=dict, dependencies=[Depends(require_mongo)])
+async def summary(current_admin=Depends(get_current_user_admin)):
+    return admin_summary.get_summary()
+
+# === GET: Statistik rate limit & admission control (ADMIN ONLY) ===
+@router.get("/limits", response_model=dict)
+async def limit_stats(current_admin=Depends(get_current_user_admin)):
+    return rate_limit.stats()
+
+# === GET: Antrian outbox + lag efek samping async (ADMIN ONLY) ===
+@router.get("/outbox", response_model=dict)
+async def outbox_stats(current_admin=Depends(get_current_user_admin)):
+    return outbox.stats()
+
+# === GET: Hit rate cache objek jadwal & hasil pencarian (ADMIN ONLY) ===
+@router.get("/cache", response_model=dict)
+async def cache_stats(current_admin=Depends(get_current_user_admin)):
+    return {"schedules": schedule_cache.stats(), "search": search_cache.stats()}
+
+# === GET: Profil request yang diambil lewat header X-Profile: 1 (ADMIN ONLY) ===
+@router.get("/profiles", response_model=list)
+async def list_profiles(current_admin=Depends(get_current_user_admin)):
+    return profiling.list_profiles()
+
+@router.get("/profiles/{profile_id}", response_model=dict)
+async def get_profile(profile_id: str, current_admin=Depends(get_current_user_admin)):
+    profile = profiling.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(404, "Profil tidak ditemukan")
+    return profile
+
+# File .prof mentah (pstats), buka dengan `python -m pstats` atau snakeviz
+@router.get("/profiles/{profile_id}/download")
+async def download_profile(profile_id: str, current_admin=Depends(get_current_user_admin)):
+    data = profiling.dump_profile(profile_id)
+    if data is None:
+        raise HTTPException(404, "Profil tidak ditemukan")
+    return Response(data, media_type="application/octet-stream", headers={
+        "Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'
+    })
+
+# === GET: Jejak audit mutasi admin, filter actor/entity/rentang waktu (ADMIN ONLY) ===
+@router.get("/audit", response_model=list, dependencies=[Depends(require_mongo)])
+async def audit_events(
+    actor: Optional[str] = Query(None, description="ID user admin"),
+    entity: Optional[str] = Query(None, pattern="^(company|schedule|booking|user|review)$"),
+    entity_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=audit.QUERY_MAX_LIMIT),
+    current_admin=Depends(get_current_user_admin)
+):
+    if actor is not None and not ObjectId.is_valid(actor):
+        raise HTTPException(400, "actor tidak valid")
+    return audit.query(ObjectId(actor) if actor else None, entity, entity_id, start, end, limit)
+
+# === GET: Antrian & counter drop audit log (ADMIN ONLY) ===
+@router.get("/audit/stats", response_model=dict)
+async def audit_stats(current_admin=Depends(get_current_user_admin)):
+    return audit.stats()
+
+# === GET: Antrian & counter drop penulisan riwayat okupansi (ADMIN ONLY) ===
+@router.get("/occupancy/stats", response_model=dict)
+async def occupancy_stats(current_admin=Depends(get_current_user_admin)):
+    return occupancy.stats()
@@ -0,0 +1,111 @@
+# routes/analytics.py
+from fastapi import APIRouter, HTTPException, Query, Depends
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import List, Optional
+from utils.auth import get_current_user_admin, require_mongo
+from utils import analytics, occupancy
+
+# Semua laporan dari rollup/koleksi MongoDB → tidak tersedia dengan backend memory
+router = APIRouter(dependencies=[Depends(require_mongo)])
+
+
+def _parse_range(start: str, end: str):
+    try:
+        return datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(400, "Format start/end: YYYY-MM-DD")
+
+
+# === GET: Rollup harian (ADMIN ONLY) ===
+@router.get("/daily", response_model=List[dict])
+async def daily_report(
+    start: str = Query(...),
+    end: str = Query(...),
+    company_id: Optional[str] = Query(None),
+    origin: Optional[str] = Query(None),
+    destination: Optional[str] = Query(None),
+    current_admin=Depends(get_current_user_admin)
+):
+    start_dt, end_dt = _parse_range(start, end)
+    match = {}
+    if company_id:
+        if not ObjectId.is_valid(company_id):
+            raise HTTPException(400, "company_id tidak valid")
+        match["company_id"] = ObjectId(company_id)
+    if origin:
+        match["origin"] = origin
+    if destination:
+        match["destination"] = destination
+    return analytics.query_rollups(start_dt, end_dt, "day", match)
+
+
+# === GET: Revenue & okupansi per perusahaan (ADMIN ONLY) ===
+@router.get("/companies", response_model=List[dict])
+async def company_report(
+    start: str = Query(...),
+    end: str = Query(...),
+    current_admin=Depends(get_current_user_admin)
+):
+    start_dt, end_dt = _parse_range(start, end)
+    return analytics.query_rollups(start_dt, end_dt, "company")
+
+
+# === GET: Revenue & okupansi per rute (ADMIN ONLY) ===
+@router.get("/routes", response_model=List[dict])
+async def route_report(
+    start: str = Query(...),
+    end: str = Query(...),
+    current_admin=Depends(get_current_user_admin)
+):
+    start_dt, end_dt = _parse_range(start, end)
+    return analytics.query_rollups(start_dt, end_dt, "route")
+
+
+# === GET: Per jadwal (ADMIN ONLY) ===
+@router.get("/schedules", response_model=List[dict])
+async def schedule_report(
+    start: str = Query(...),
+    end: str = Query(...),
+    company_id: Optional[str] = Query(None),
+    current_admin=Depends(get_current_user_admin)
+):
+    start_dt, end_dt = _parse_range(start, end)
+    match = {}
+    if company_id:
+        if not ObjectId.is_valid(company_id):
+            raise HTTPException(400, "company_id tidak valid")
+        match["company_id"] = ObjectId(company_id)
+    return analytics.query_rollups(start_dt, end_dt, "schedule", match)
+
+
+# === GET: Kurva okupansi (load factor) per jadwal dari riwayat kursi (ADMIN ONLY) ===
+# Pilih jadwal lewat schedule_ids (dipisah koma, maks 5000) dan/atau rute origin+destination.
+@router.get("/occupancy", response_model=List[dict])
+async def occupancy_curves(
+    schedule_ids: Optional[str] = Query(None),
+    origin: Optional[str] = Query(None),
+    destination: Optional[str] = Query(None),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    unit: str = Query("hour", pattern="^(minute|hour|day)$"),
+    bin_size: int = Query(1, ge=1, le=1000),
+    current_admin=Depends(get_current_user_admin)
+):
+    ids = [s for s in (schedule_ids or "").split(",") if s.strip()]
+    if not ids and not (origin and destination):
+        raise HTTPException(400, "Isi schedule_ids atau origin + destination")
+    if len(ids) > occupancy.MAX_SCHEDULES:
+        raise HTTPException(400, f"Maksimal {occupancy.MAX_SCHEDULES} jadwal per request")
+    if not all(ObjectId.is_valid(s.strip()) for s in ids):
+        raise HTTPException(400, "schedule_ids tidak valid")
+
+    start_dt = end_dt = None
+    if start or end:
+        if not (start and end):
+            raise HTTPException(400, "start dan end harus diisi bersamaan")
+        start_dt, end_dt = _parse_range(start, end)
+        end_dt += timedelta(days=1)   # end inklusif (sampai akhir hari)
+    return occupancy.curves(
+        [ObjectId(s.strip()) for s in ids], origin, destination, start_dt, end_dt, unit, bin_size
+    )
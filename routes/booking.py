@@ -1,17 +1,46 @@
 # routes/booking.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 from models.booking import BookingCreate, BookingUpdate
-from database import bookings, schedules, users
+import repositories as repo
 from bson import ObjectId
-from datetime import datetime
-from typing import List
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+from typing import List, Optional
 from utils.auth import get_current_user_admin
+from utils import analytics
+from utils.schedule_events import schedule_changed, seats_changed
+from utils import outbox, schedule_cache, waitlist, audit
+from utils.idempotency import idempotent
+from utils.raw_json import json_response
 
 router = APIRouter()
 
+
+# === Efek samping booking (dijalankan worker outbox, bukan di dalam request) ===
+# Stok kursi tetap di-update langsung di request supaya tidak terjadi overbooking.
+@outbox.task("booking_side_effects")
+def _booking_side_effects(booking: dict, schedule_id, created=False, passenger_delta=0, revenue_delta=0,
+                          cancelled=False, event_id=None):
+    sched = repo.schedules.get(schedule_id, {"company_id": 1, "origin": 1, "destination": 1, "departure_date": 1})
+    # Refresh idempotent; $inc analitik diterapkan sekali per event_id (retry tidak menghitung dua kali)
+    schedule_changed(schedule_id, sched)
+    analytics.record_booking_event(event_id, booking, sched, created, passenger_delta, revenue_delta, cancelled)
+
+
+def _booking_summary(booking: dict) -> dict:
+    return {
+        "booking_date": booking["booking_date"],
+        "passenger_count": booking["passenger_count"],
+        "total_price": booking.get("total_price", 0)
+    }
+
 # === POST: Buat Booking ===
 @router.post("/")
-async def create_booking(booking_in: BookingCreate):
+@idempotent("bookings")
+async def create_booking(
+    booking_in: BookingCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     # Konversi ID ke ObjectId
     try:
         user_obj_id = ObjectId(booking_in.user_id)
@@ -19,250 +48,214 @@ async def create_booking(booking_in: BookingCreate):
     except Exception:
         raise HTTPException(400, "user_id atau schedule_id tidak valid (harus 24 karakter hex)")
 
-    # Cek jadwal
-    sched = schedules.find_one({"_id": schedule_obj_id})
+    # Cek jadwal (dari cache objek jadwal; stok final dicek atomik saat dikurangi)
+    sched = schedule_cache.get_raw(booking_in.schedule_id)
     if not sched:
         raise HTTPException(404, f"Jadwal dengan ID {booking_in.schedule_id} tidak ditemukan")
     if sched["available_seats"] < booking_in.passenger_count:
         raise HTTPException(400, f"Kursi tidak cukup. Tersedia: {sched['available_seats']}, Diminta: {booking_in.passenger_count}")
+    # Kursi yang dilepas jatah antrian waitlist dulu (FIFO), bukan siapa cepat
+    if waitlist.has_waiting(schedule_obj_id, sched.get("capacity")):
+        raise HTTPException(409, "Jadwal ini punya antrian waitlist, silakan masuk waitlist")
+
+    # Kurangi stok hanya jika kursi masih cukup (atomik, tidak bisa overbooking)
+    reserved = repo.schedules.reserve_seats(schedule_obj_id, booking_in.passenger_count)
+    seats_changed(booking_in.schedule_id, reserved, booking_in.passenger_count)
+    if not reserved:
+        raise HTTPException(400, f"Kursi tidak cukup untuk {booking_in.passenger_count} penumpang")
+
+    booking_id, code = _insert_booking(
+        user_obj_id, schedule_obj_id, booking_in.passenger_name, booking_in.passenger_count, sched["price"]
+    )
+    return {
+        "id": str(booking_id),
+        "booking_code": code,
+        "message": "Booking berhasil!"
+    }
 
-    # Hitung total
-    total = sched["price"] * booking_in.passenger_count
-    code = f"TRAV-{datetime.now().strftime('%Y%m%d')}-{str(ObjectId())[-6:]}".upper()
 
-    # Simpan booking
+def _insert_booking(user_id, schedule_id, passenger_name: str, passenger_count: int, price: int):
+    # Simpan booking (stok kursi sudah dikurangi pemanggil)
+    code = f"TRAV-{datetime.now().strftime('%Y%m%d')}-{str(ObjectId())[-6:]}".upper()
     booking_doc = {
-        "user_id": user_obj_id,
-        "schedule_id": schedule_obj_id,
-        "passenger_name": booking_in.passenger_name,
-        "passenger_count": booking_in.passenger_count,
-        "total_price": total,
+        "user_id": user_id,
+        "schedule_id": schedule_id,
+        "passenger_name": passenger_name,
+        "passenger_count": passenger_count,
+        "total_price": price * passenger_count,
         "status": "pending",
         "status_review": "pending",
         "booking_code": code,
         "booking_date": datetime.utcnow()
     }
-    result = bookings.insert_one(booking_doc)
+    booking_id = repo.bookings.insert(booking_doc)
+
+    # Rollup analitik + data turunan jadwal lewat outbox
+    outbox.enqueue("booking_side_effects", booking=_booking_summary(booking_doc), schedule_id=schedule_id, created=True)
+    return booking_id, code
+
+
+def _promote_waitlist(schedule_id):
+    # Kursi baru dilepas → berikan ke antrian terdepan selama kursinya cukup (FIFO ketat:
+    # jika entry terdepan belum muat, entry di belakangnya juga menunggu)
+    while True:
+        entry = waitlist.claim_head(schedule_id)
+        if not entry:
+            return
+        # Harga dibaca sebelum kursi dikurangi: jadwal yang sudah dihapus tidak boleh menahan kursi/claim
+        sched = schedule_cache.get_raw(str(schedule_id))
+        if not sched:
+            waitlist.release(entry)
+            return
+        capacity = sched.get("capacity")
+        if capacity is not None and entry["passenger_count"] > capacity:
+            # Tidak akan pernah muat (mis. entry lama sebelum validasi join) → jangan blok antrian
+            waitlist.reject(entry, "passenger_count melebihi kapasitas jadwal")
+            continue
+        reserved = repo.schedules.reserve_seats(schedule_id, entry["passenger_count"])
+        if not reserved:
+            waitlist.release(entry)
+            # Kursi yang dilepas selagi entry ini ter-claim tidak memicu promosi di proses lain
+            # (claim_head melihat entry terdepan sedang diproses) → cek ulang sesudah release
+            sched = repo.schedules.get(schedule_id, {"available_seats": 1})
+            if sched and sched["available_seats"] >= entry["passenger_count"]:
+                continue
+            return
+        seats_changed(schedule_id, reserved, entry["passenger_count"])
+        booking_id, _ = _insert_booking(
+            entry["user_id"], schedule_id, entry["passenger_name"], entry["passenger_count"], sched["price"]
+        )
+        waitlist.mark_promoted(entry, booking_id)
 
-    # Kurangi stok
-    schedules.update_one(
-        {"_id": schedule_obj_id},
-        {"$inc": {"available_seats": -booking_in.passenger_count}}
-    )
 
+# Admin menambah kursi lewat PUT /api/schedules/{id} → antrian dipromosikan lewat outbox
+@outbox.task("waitlist_promote")
+def _waitlist_promote_task(schedule_id, event_id=None):
+    _promote_waitlist(schedule_id)
+
+
+def _require_waitlist():
+    if not waitlist.ENABLED:
+        raise HTTPException(503, "Waitlist tidak tersedia (REPOSITORY_BACKEND=memory)")
+
+
+# === POST: Masuk waitlist jadwal yang penuh ===
+@router.post("/waitlist", response_model=dict)
+async def join_waitlist(booking_in: BookingCreate):
+    _require_waitlist()
+    if not ObjectId.is_valid(booking_in.user_id) or not ObjectId.is_valid(booking_in.schedule_id):
+        raise HTTPException(400, "user_id atau schedule_id tidak valid (harus 24 karakter hex)")
+    if booking_in.passenger_count < 1:
+        raise HTTPException(400, "Jumlah penumpang minimal 1")
+    schedule_obj_id = ObjectId(booking_in.schedule_id)
+
+    sched = schedule_cache.get_raw(booking_in.schedule_id)
+    if not sched:
+        raise HTTPException(404, f"Jadwal dengan ID {booking_in.schedule_id} tidak ditemukan")
+    capacity = sched.get("capacity")
+    if capacity is not None and booking_in.passenger_count > capacity:
+        raise HTTPException(400, f"Jumlah penumpang melebihi kapasitas jadwal ({capacity} kursi)")
+    if sched["available_seats"] >= booking_in.passenger_count and not waitlist.has_waiting(schedule_obj_id, capacity):
+        raise HTTPException(400, "Kursi masih tersedia, silakan booking langsung")
+
+    try:
+        entry = waitlist.join(
+            schedule_obj_id, ObjectId(booking_in.user_id), booking_in.passenger_name, booking_in.passenger_count
+        )
+    except DuplicateKeyError:
+        raise HTTPException(400, "Sudah ada di waitlist jadwal ini")
+    if not entry:
+        raise HTTPException(404, f"Jadwal dengan ID {booking_in.schedule_id} tidak ditemukan")
+
+    # Kursi bisa saja baru dilepas di antara cek dan join
+    _promote_waitlist(schedule_obj_id)
     return {
-        "id": str(result.inserted_id),
-        "booking_code": code,
-        "message": "Booking berhasil!"
+        "id": str(entry["_id"]),
+        "position": entry["position"],
+        "ahead": waitlist.ahead(entry),
+        "message": "Masuk waitlist, booking dibuat otomatis saat kursi tersedia"
+    }
+
+# === GET: Status entry waitlist (lebih murah daripada polling detail jadwal) ===
+@router.get("/waitlist/{entry_id}", response_model=dict)
+async def get_waitlist_entry(entry_id: str):
+    _require_waitlist()
+    if not ObjectId.is_valid(entry_id):
+        raise HTTPException(400, "ID tidak valid")
+    entry = waitlist.get(ObjectId(entry_id))
+    if not entry:
+        raise HTTPException(404, "Entry waitlist tidak ditemukan")
+    queued = entry["status"] in ("waiting", "promoting")
+    return {
+        "id": entry_id,
+        "schedule_id": str(entry["schedule_id"]),
+        "status": entry["status"],
+        "position": entry["position"],
+        "ahead": waitlist.ahead(entry) if queued else 0,
+        "booking_id": str(entry["booking_id"]) if entry.get("booking_id") else None,
+        # Status "merged": user antri ulang, entry ini digabung ke entry lamanya
+        "merged_into": str(entry["merged_into"]) if entry.get("merged_into") else None
     }
 
+# === DELETE: Keluar dari waitlist ===
+@router.delete("/waitlist/{entry_id}")
+async def leave_waitlist(entry_id: str):
+    _require_waitlist()
+    if not ObjectId.is_valid(entry_id):
+        raise HTTPException(400, "ID tidak valid")
+    if not waitlist.leave(ObjectId(entry_id)):
+        raise HTTPException(404, "Entry waitlist tidak ditemukan atau sudah diproses")
+    return {"message": "Keluar dari waitlist"}
+
+
+# Rentang booking_date opsional (YYYY-MM-DD, end inklusif sampai akhir hari)
+def _parse_date_range(start: Optional[str], end: Optional[str]):
+    try:
+        start_dt = datetime.strptime(start, "%Y-%m-%d") if start else None
+        end_dt = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1) - timedelta(microseconds=1) if end else None
+    except ValueError:
+        raise HTTPException(400, "Format start/end: YYYY-MM-DD")
+    return start_dt, end_dt
+
 
 # === GET: Booking dengan Join (User + Schedule) ===
 # routes/booking.py → TAMBAH ROUTE BARU DI BAWAH
 
 # === GET: Booking per User (dengan Join) ===
 @router.get("/user/{user_id}", response_model=List[dict])
-async def get_user_bookings(user_id: str):
+async def get_user_bookings(
+    user_id: str,
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None)
+):
     # Pastikan user_id valid dan konversi ke ObjectId
     try:
         user_obj_id = ObjectId(user_id)
     except Exception:
         raise HTTPException(400, "user_id tidak valid (harus 24 karakter hex)")
+    start_dt, end_dt = _parse_date_range(start, end)
 
-    pipeline = [
-        # 1. Filter hanya booking milik user ini
-        {"$match": {"user_id": user_obj_id}},
-
-        # Join users (opsional, karena kita sudah tahu user-nya)
-        {"$lookup": {
-            "from": "users",
-            "localField": "user_id",
-            "foreignField": "_id",
-            "as": "user_info"
-        }},
-        # Join schedules + company
-        {"$lookup": {
-            "from": "schedules",
-            "localField": "schedule_id",
-            "foreignField": "_id",
-            "as": "schedule_info"
-        }},
-        {"$unwind": {"path": "$user_info", "preserveNullAndEmptyArrays": True}},
-        {"$unwind": {"path": "$schedule_info", "preserveNullAndEmptyArrays": True}},
-        # Join company di dalam schedule_info
-        {"$lookup": {
-            "from": "companies",
-            "localField": "schedule_info.company_id",
-            "foreignField": "_id",
-            "as": "schedule_info.company"
-        }},
-        {"$unwind": {"path": "$schedule_info.company", "preserveNullAndEmptyArrays": True}},
-
-        {"$project": {
-            # Field utama
-            "_id": {"$toString": "$_id"},
-            "booking_code": 1,
-            "status": 1,
-            "status_review": 1,
-            "total_price": 1,
-            "passenger_name": 1,
-            "passenger_count": 1,
-            "booking_date": 1,
-
-            # User info
-            "user_info._id": {"$toString": "$user_info._id"}, # Perbaikan: Gunakan user_info._id
-            "user_info.name": 1,
-            "user_info.email": 1,
-
-            # Schedule info
-            "schedule_info._id": {"$toString": "$schedule_info._id"}, # Tambahkan Schedule ID
-            "schedule_info.origin": 1,
-            "schedule_info.destination": 1,
-            "schedule_info.departure_date": 1,
-            "schedule_info.price": 1,
-            "schedule_info.type": 1,
-            "schedule_info.company.name": 1,
-        }}
-    ]
-
-    result = list(bookings.aggregate(pipeline))
-
-    if not result:
-        # Opsional: Jika tidak ada booking ditemukan untuk user_id ini
-        # raise HTTPException(404, "Tidak ada booking ditemukan untuk user ini") 
-        # Lebih baik mengembalikan list kosong []
-        pass 
-
-    # Pastikan semua booking punya status_review (default "pending")
-    for booking in result:
-        if "status_review" not in booking or booking["status_review"] is None:
-            booking["status_review"] = "pending"
-
-    return result
+    # Tidak ada booking → list kosong []; hasil di-stream langsung (batch BSON mentah di backend Mongo)
+    return json_response(repo.bookings.list_for_user(user_obj_id, start_dt, end_dt))
 
 @router.get("/", response_model=List[dict])
-async def get_bookings():
-    pipeline = [
-        # Join users
-        {"$lookup": {
-            "from": "users",
-            "localField": "user_id",
-            "foreignField": "_id",
-            "as": "user_info"
-        }},
-        # Join schedules + company
-        {"$lookup": {
-            "from": "schedules",
-            "localField": "schedule_id",
-            "foreignField": "_id",
-            "as": "schedule_info"
-        }},
-        {"$unwind": {"path": "$user_info", "preserveNullAndEmptyArrays": True}},
-        {"$unwind": {"path": "$schedule_info", "preserveNullAndEmptyArrays": True}},
-        # Join company di dalam schedule_info (biar company name langsung ada)
-        {"$lookup": {
-            "from": "companies",
-            "localField": "schedule_info.company_id",
-            "foreignField": "_id",
-            "as": "schedule_info.company"
-        }},
-        {"$unwind": {"path": "$schedule_info.company", "preserveNullAndEmptyArrays": True}},
-
-        {"$project": {
-            # Field utama
-            "_id": {"$toString": "$_id"},                  # ← jadi string, nama field tetap "_id"
-            "booking_code": 1,
-            "status": 1,
-            "status_review": 1,                            # ← WAJIB ADA!!!
-            "total_price": 1,
-            "passenger_name": 1,
-            "passenger_count": 1,
-            "booking_date": 1,
-
-            # User info
-            "user_info.name": 1,
-            "user_info.email": 1,
-
-            # Schedule info
-            "schedule_info.origin": 1,
-            "schedule_info.destination": 1,
-            "schedule_info.departure_date": 1,
-            "schedule_info.price": 1,
-            "schedule_info.type": 1,
-            "schedule_info.company.name": 1,               # ← company name langsung ada
-        }}
-    ]
-
-    result = list(bookings.aggregate(pipeline))
-
-    # Pastikan semua booking punya status_review (default "pending")
-    for booking in result:
-        if "status_review" not in booking or booking["status_review"] is None:
-            booking["status_review"] = "pending"
-
-    return result
+async def get_bookings(
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None)
+):
+    start_dt, end_dt = _parse_date_range(start, end)
+    # Booking aktif (+ archive jika rentangnya menyentuh archive)
+    return json_response(repo.bookings.list_detailed(start_dt, end_dt))
 
 @router.get("/{booking_id}", response_model=dict)
 async def get_booking(booking_id: str, current_admin=Depends(get_current_user_admin)):
     if not ObjectId.is_valid(booking_id):
         raise HTTPException(400, "ID tidak valid")
-    pipeline = [
-        {"$match": {"_id": ObjectId(booking_id)}},
-        {"$lookup": {
-            "from": "users",
-            "localField": "user_id",
-            "foreignField": "_id",
-            "as": "user_info"
-        }},
-        # Join schedules + company
-        {"$lookup": {
-            "from": "schedules",
-            "localField": "schedule_id",
-            "foreignField": "_id",
-            "as": "schedule_info"
-        }},
-        {"$unwind": {"path": "$user_info", "preserveNullAndEmptyArrays": True}},
-        {"$unwind": {"path": "$schedule_info", "preserveNullAndEmptyArrays": True}},
-        # Join company di dalam schedule_info (biar company name langsung ada)
-        {"$lookup": {
-            "from": "companies",
-            "localField": "schedule_info.company_id",
-            "foreignField": "_id",
-            "as": "schedule_info.company"
-        }},
-        {"$unwind": {"path": "$schedule_info.company", "preserveNullAndEmptyArrays": True}},
-
-        {"$project": {
-            # Field utama
-            "_id": {"$toString": "$_id"},                  # ← jadi string, nama field tetap "_id"
-            "booking_code": 1,
-            "status": 1,
-            "status_review": 1,                            # ← WAJIB ADA!!!
-            "total_price": 1,
-            "passenger_name": 1,
-            "passenger_count": 1,
-            "booking_date": 1,
-
-            # User info
-            "user_info.name": 1,
-            "user_info.email": 1,
-
-            # Schedule info
-            "schedule_info.origin": 1,
-            "schedule_info.destination": 1,
-            "schedule_info.departure_date": 1,
-            "schedule_info.price": 1,
-            "schedule_info.type": 1,
-            "schedule_info.company.name": 1,               # ← company name langsung ada
-        }}
-    ]
-    try:
-        booking = next(bookings.aggregate(pipeline))
-        if "status_review" not in booking or booking["status_review"] is None:
-            booking["status_review"] = "pending"
-        return booking
-    except StopIteration:
+    # Booking lama mungkin sudah dipindah ke archive (dicari di repository)
+    booking = repo.bookings.get_detailed(ObjectId(booking_id))
+    if not booking:
         raise HTTPException(404, "Booking tidak ditemukan")
+    return booking
     
 # === PUT: Update Status Booking (opsional) ===
 @router.put("/{booking_id}/status")
@@ -270,11 +263,15 @@ async def update_booking_status(booking_id: str, status: str):
     if status not in ["pending", "confirmed", "cancelled"]:
         raise HTTPException(400, "Status tidak valid")
 
-    result = bookings.update_one(
-        {"_id": ObjectId(booking_id)},
-        {"$set": {"status": status}}
-    )
-    if result.modified_count == 0:
+    # Pembatalan selalu lewat jalur yang sama (stok, analitik, waitlist)
+    if status == "cancelled":
+        booking = repo.bookings.get(ObjectId(booking_id))
+        if not booking:
+            raise HTTPException(404, "Booking tidak ditemukan")
+        _cancel(booking)
+        return {"message": f"Status diubah menjadi {status}"}
+
+    if not repo.bookings.update(ObjectId(booking_id), {"status": status}):
         raise HTTPException(404, "Booking tidak ditemukan")
     return {"message": f"Status diubah menjadi {status}"}
 
@@ -282,18 +279,30 @@ async def update_booking_status(booking_id: str, status: str):
 # === DELETE: Cancel Booking + Kembalikan Stok ===
 @router.delete("/{booking_id}")
 async def cancel_booking(booking_id: str):
-    booking = bookings.find_one({"_id": ObjectId(booking_id)})
+    booking = repo.bookings.get(ObjectId(booking_id))
     if not booking:
         raise HTTPException(404, "Booking tidak ditemukan")
+    if not _cancel(booking):
+        return {"message": "Booking sudah dibatalkan"}
+    return {"message": "Booking dibatalkan dan stok dikembalikan"}
 
-    # Kembalikan stok
-    schedules.update_one(
-        {"_id": booking["schedule_id"]},
-        {"$inc": {"available_seats": booking["passenger_count"]}}
-    )
 
-    bookings.delete_one({"_id": ObjectId(booking_id)})
-    return {"message": "Booking dibatalkan dan stok dikembalikan"}
+def _cancel(booking: dict) -> bool:
+    # Booking tidak dihapus, hanya ditandai cancelled: rollup incremental dan rebuild_rollups()
+    # (utils/analytics.py) menghitung pembatalan dengan aturan yang sama. Transisi status atomik
+    # → pembatalan ganda tidak mengembalikan stok dua kali. False jika sudah cancelled.
+    if not repo.bookings.cancel(booking["_id"]):
+        return False
+    released = repo.schedules.release_seats(booking["schedule_id"], booking["passenger_count"])
+    seats_changed(booking["schedule_id"], released, -booking["passenger_count"])
+    outbox.enqueue(
+        "booking_side_effects",
+        booking=_booking_summary(booking),
+        schedule_id=booking["schedule_id"],
+        cancelled=True
+    )
+    _promote_waitlist(booking["schedule_id"])
+    return True
 
 # routes/booking.py → TAMBAH ROUTE BARU DI BAWAH
 
@@ -305,14 +314,10 @@ async def complete_booking(
     if not ObjectId.is_valid(booking_id):
         raise HTTPException(400, "booking_id tidak valid")
 
-    result = bookings.update_one(
-        {"_id": ObjectId(booking_id)},
-        {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
-    )
-
-    if result.modified_count == 0:
+    if not repo.bookings.update(ObjectId(booking_id), {"status": "completed", "completed_at": datetime.utcnow()}):
         raise HTTPException(404, "Booking tidak ditemukan atau gagal diupdate")
 
+    audit.record(current_admin, "complete", "booking", booking_id)
     return {"message": "Booking selesai! User sekarang bisa memberikan ulasan."}
 
 @router.put("/{booking_id}", response_model=dict)
@@ -325,11 +330,17 @@ async def update_booking(
         raise HTTPException(400, "booking_id tidak valid")
 
     booking_obj_id = ObjectId(booking_id)
-    booking = bookings.find_one({"_id": booking_obj_id})
+    booking = repo.bookings.get(booking_obj_id)
     if not booking:
         raise HTTPException(404, "Booking tidak ditemukan")
 
     update_fields = {}
+    schedule_id = str(booking["schedule_id"])
+    schedule = schedule_cache.get_raw(schedule_id)
+    if not schedule:
+        raise HTTPException(404, "Jadwal untuk booking ini tidak ditemukan")
+    passenger_delta = revenue_delta = 0
+    cancel = False
 
     # 1. Update nama penumpang
     if update_data.passenger_name is not None:
@@ -345,35 +356,32 @@ async def update_booking(
         old_count = booking["passenger_count"]
         diff = update_data.passenger_count - old_count
 
-        # Cek ketersediaan kursi jika ditambah
+        # Update stok kursi; jika ditambah, hanya berhasil kalau kursi masih cukup (atomik)
         if diff > 0:
-            schedule = schedules.find_one({"_id": booking["schedule_id"]})
-            if schedule["available_seats"] < diff:
-                raise HTTPException(400, 
-                    f"Kursi tidak cukup. Tersedia: {schedule['available_seats']}, dibutuhkan: {diff}")
+            reserved = repo.schedules.reserve_seats(booking["schedule_id"], diff)
+            seats_changed(schedule_id, reserved, diff)
+            if not reserved:
+                raise HTTPException(400, f"Kursi tidak cukup. Dibutuhkan tambahan: {diff}")
+        elif diff < 0:
+            released = repo.schedules.release_seats(booking["schedule_id"], -diff)
+            seats_changed(schedule_id, released, diff)
 
         update_fields["passenger_count"] = update_data.passenger_count
         update_fields["total_price"] = schedule["price"] * update_data.passenger_count
-
-        # Update stok kursi
-        schedules.update_one(
-            {"_id": booking["schedule_id"]},
-            {"$inc": {"available_seats": -diff}}  # + jika kurang, - jika lebih
-        )
+        passenger_delta = diff
+        revenue_delta = update_fields["total_price"] - booking.get("total_price", 0)
 
     # 3. Update status booking
     if update_data.status is not None:
         allowed_status = ["pending", "confirmed", "completed", "cancelled"]
         if update_data.status not in allowed_status:
             raise HTTPException(400, f"Status tidak valid. Pilih dari: {', '.join(allowed_status)}")
-        update_fields["status"] = update_data.status
-
-        # Jika di-cancel, kembalikan stok
-        if update_data.status == "cancelled" and booking["status"] != "cancelled":
-            schedules.update_one(
-                {"_id": booking["schedule_id"]},
-                {"$inc": {"available_seats": booking["passenger_count"]}}
-            )
+        # Pembatalan lewat _cancel (transisi status atomik) sesudah field lain tersimpan: cek status
+        # dari data yang dibaca di awal bisa basi → DELETE + PUT paralel mengembalikan stok dua kali
+        if update_data.status == "cancelled":
+            cancel = True
+        else:
+            update_fields["status"] = update_data.status
 
     # 4. Update status_review (jarang dipakai manual, tapi tersedia)
     if update_data.status_review is not None:
@@ -382,18 +390,33 @@ async def update_booking(
         update_fields["status_review"] = update_data.status_review
 
     # Jika tidak ada yang diubah
-    if not update_fields:
+    if not update_fields and not cancel:
         raise HTTPException(400, "Tidak ada data yang dikirim untuk diupdate")
 
     # Terapkan update
-    result = bookings.update_one(
-        {"_id": booking_obj_id},
-        {"$set": update_fields}
-    )
-
-    if result.modified_count == 0:
+    if update_fields and not repo.bookings.update(booking_obj_id, update_fields):
         raise HTTPException(500, "Gagal memperbarui booking")
 
+    # Stok kursi berubah → rollup analitik + data turunan jadwal lewat outbox
+    if passenger_delta or revenue_delta:
+        outbox.enqueue(
+            "booking_side_effects",
+            booking=_booking_summary({**booking, **update_fields}),
+            schedule_id=booking["schedule_id"],
+            passenger_delta=passenger_delta,
+            revenue_delta=revenue_delta
+        )
+
+    # _cancel: stok (jumlah penumpang terbaru), rollup dan waitlist; tidak apa-apa jika sudah cancelled
+    if cancel:
+        _cancel({**booking, **update_fields})
+        update_fields["status"] = "cancelled"
+    # Kursi dilepas (jumlah penumpang dikurangi) → jatah antrian waitlist dulu
+    elif passenger_delta < 0:
+        _promote_waitlist(booking["schedule_id"])
+
+    audit.record(current_admin, "update", "booking", booking_id,
+                 fields=update_fields, previous={k: booking.get(k) for k in update_fields})
     return {
         "message": "Booking berhasil diperbarui",
         "updated_fields": list(update_fields.keys())
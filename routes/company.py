@@ -2,8 +2,10 @@
 
 from fastapi import APIRouter, HTTPException, Depends
 from models.company import CompanyCreate, CompanyOut
-from database import companies
+import repositories as repo
 from utils.auth import get_current_user_admin
+from utils.schedule_events import company_changed
+from utils import audit
 from bson import ObjectId
 from typing import List
 
@@ -15,12 +17,12 @@ async def create_company(
     company_in: CompanyCreate,
     current_admin = Depends(get_current_user_admin)
 ):
-    if companies.find_one({"name": {"$regex": f"^{company_in.name}$", "$options": "i"}}):
+    if repo.companies.find_by_name(company_in.name):
         raise HTTPException(400, "Nama perusahaan sudah ada")
     
     doc = company_in.dict()
-    result = companies.insert_one(doc)
-    created = companies.find_one({"_id": result.inserted_id})
+    created = repo.companies.get(repo.companies.insert(doc))
+    audit.record(current_admin, "create", "company", created["_id"], name=company_in.name)
     
     return CompanyOut(
         id=str(created["_id"]),
@@ -39,14 +41,12 @@ async def update_company(
     if not ObjectId.is_valid(company_id):
         raise HTTPException(400, "ID tidak valid")
     
-    result = companies.update_one(
-        {"_id": ObjectId(company_id)},
-        {"$set": company_in.dict()}
-    )
-    if result.modified_count == 0:
+    if not repo.companies.update(ObjectId(company_id), company_in.dict()):
         raise HTTPException(404, "Perusahaan tidak ditemukan atau tidak ada perubahan")
     
-    updated = companies.find_one({"_id": ObjectId(company_id)})
+    company_changed(company_id)
+    audit.record(current_admin, "update", "company", company_id, fields=company_in.dict())
+    updated = repo.companies.get(ObjectId(company_id))
     return CompanyOut(
         id=str(updated["_id"]),
         **updated,
@@ -64,68 +64,28 @@ async def delete_company(
         raise HTTPException(400, "ID tidak valid")
     
     # Cek apakah ada jadwal yang pakai perusahaan ini (opsional)
-    from database import schedules
-    if schedules.find_one({"company_id": ObjectId(company_id)}):
+    if repo.schedules.exists_for_company(ObjectId(company_id)):
         raise HTTPException(400, "Tidak bisa hapus: perusahaan masih punya jadwal")
     
-    result = companies.delete_one({"_id": ObjectId(company_id)})
-    if result.deleted_count == 0:
+    if not repo.companies.delete(ObjectId(company_id)):
         raise HTTPException(404, "Perusahaan tidak ditemukan")
     
+    company_changed(company_id)
+    audit.record(current_admin, "delete", "company", company_id)
     return {"message": "Perusahaan dihapus"}
 
 # === GET Semua Perusahaan (Publik) ===
 @router.get("/", response_model=List[CompanyOut])
 async def get_companies():
-    pipeline = [
-        {"$lookup": {
-            "from": "reviews",
-            "localField": "_id",
-            "foreignField": "company_id",
-            "as": "company_reviews"
-        }},
-        {"$addFields": {
-            "average_rating": {"$round": [{"$ifNull": [{"$avg": "$company_reviews.rating"}, 0]}, 1]},
-            "total_reviews": {"$size": "$company_reviews"}
-        }},
-        {"$project": {
-            "name": 1, "type": 1, "description": 1, "logo": 1,
-            "contact_email": 1, "phone": 1, "average_rating": {"$ifNull": ["$cached_rating", 0]}, "total_reviews": {"$ifNull": ["$cached_total_reviews", 0]}
-        }}
-    ]
-    result = list(companies.aggregate(pipeline))
-    for item in result:
-        item["id"] = str(item["_id"])
-        item.pop("_id", None)
-        item["average_rating"] = item.get("average_rating") or 0.0
-    return result
+    return repo.companies.list_with_ratings()
 
 # === GET Detail Perusahaan (Publik) ===
 @router.get("/{company_id}", response_model=CompanyOut)
 async def get_company(company_id: str):
     if not ObjectId.is_valid(company_id):
         raise HTTPException(400, "ID tidak valid")
-    
-    pipeline = [
-        {"$match": {"_id": ObjectId(company_id)}},
-        {"$lookup": {
-            "from": "reviews",
-            "localField": "_id",
-            "foreignField": "company_id",
-            "as": "company_reviews"
-        }},
-        {"$addFields": {
-            "average_rating": {"$round": [{"$ifNull": [{"$avg": "$company_reviews.rating"}, 0]}, 1]},
-            "total_reviews": {"$size": "$company_reviews"}
-        }},
-        {"$project": {"company_reviews": 0}}
-    ]
-    
-    try:
-        company = next(companies.aggregate(pipeline))
-        company["id"] = str(company["_id"])
-        company.pop("_id", None)
-        company["average_rating"] = company.get("average_rating") or 0.0
-        return company
-    except StopIteration:
-        raise HTTPException(404, "Perusahaan tidak ditemukan")
\ No newline at end of file
+
+    company = repo.companies.get_with_ratings(ObjectId(company_id))
+    if not company:
+        raise HTTPException(404, "Perusahaan tidak ditemukan")
+    return company
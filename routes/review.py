@@ -1,63 +1,87 @@
 # routes/review.py → GANTI SELURUH FILE DENGAN INI
 
-from fastapi import APIRouter, HTTPException, Depends
-from models.review import ReviewCreate, ReviewOut
-from database import reviews, bookings, schedules, companies, users
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from models.review import ReviewCreate, ReviewOut, ReviewSearchOut
+from database import reviews
+import repositories as repo
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 from datetime import datetime
-from typing import List
-from utils.auth import get_current_user_admin
+from typing import List, Optional
+from utils.auth import get_current_user_admin, require_mongo
+from utils.idempotency import idempotent
+from utils.review_search import search_pipeline, MAX_PAGE_SIZE
+from utils.ratings import add_rating, adjust_rating
+from utils import outbox, audit
 
 router = APIRouter()
 
+
+# === Efek samping review baru (dijalankan worker outbox) ===
+@outbox.task("review_created", inline_without_mongo=True)
+def _review_side_effects(booking_id, company_id, rating: int, review_id=None, event_id=None):
+    # Flag idempotent dulu, update rating incremental terakhir (add_rating sekali per review_id).
+    # Review yang sudah dihapus admin (status_review kembali "pending") tidak boleh ditandai done:
+    # delete_review menghapus review dulu baru reset status, jadi cek ulang sesudah update menutup celahnya.
+    if not repo.reviews.exists_for_booking(booking_id):
+        return
+    repo.bookings.set_status_review(booking_id, "done")
+    if not repo.reviews.exists_for_booking(booking_id):
+        repo.bookings.set_status_review(booking_id, "pending")
+        return
+    add_rating(company_id, rating, review_id)
+
 # === CREATE REVIEW (untuk user biasa) ===
 @router.post("/", response_model=ReviewOut)
-async def create_review(review_in: ReviewCreate):
+@idempotent("reviews")
+async def create_review(
+    review_in: ReviewCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     if not ObjectId.is_valid(review_in.booking_id):
         raise HTTPException(400, "booking_id tidak valid")
-    
-    booking = bookings.find_one({"_id": ObjectId(review_in.booking_id)})
+    if not 1 <= review_in.rating <= 5:
+        raise HTTPException(400, "Rating harus 1-5")
+    booking_obj_id = ObjectId(review_in.booking_id)
+
+    # Satu lookup: booking + schedule + company + user sekaligus
+    booking = repo.bookings.get_review_context(booking_obj_id)
     if not booking:
         raise HTTPException(404, "Booking tidak ditemukan")
     if booking.get("status") != "completed":
         raise HTTPException(403, "Hanya booking completed yang bisa direview")
-    if reviews.find_one({"booking_id": ObjectId(review_in.booking_id)}):
+    if booking.get("status_review") == "done":
         raise HTTPException(400, "Sudah pernah mereview booking ini")
+    if not booking.get("schedule"):
+        raise HTTPException(404, "Jadwal untuk booking ini tidak ditemukan")
 
-    schedule = schedules.find_one({"_id": booking["schedule_id"]})
-    company = companies.find_one({"_id": schedule["company_id"]})
-    user = users.find_one({"_id": booking["user_id"]})
-
+    company_id = booking["schedule"]["company_id"]
+    review_id = ObjectId()
     review_doc = {
-        "booking_id": ObjectId(review_in.booking_id),
-        "company_id": schedule["company_id"],
+        "_id": review_id,
+        "booking_id": booking_obj_id,
+        "company_id": company_id,
         "user_id": booking["user_id"],
         "rating": review_in.rating,
         "comment": review_in.comment,
-        "created_at": datetime.utcnow()
+        "created_at": datetime.utcnow(),
+        "rating_pending": True   # dihapus add_rating saat cached rating company sudah memuatnya
     }
-    result = reviews.insert_one(review_doc)
-
-    # Update status_review di booking
-    bookings.update_one({"_id": ObjectId(review_in.booking_id)}, {"$set": {"status_review": "done"}})
-
-    # Update cached rating di company
-    pipeline = [
-        {"$match": {"company_id": schedule["company_id"]}},
-        {"$group": {"_id": None, "avg": {"$avg": "$rating"}, "count": {"$sum": 1}}}
-    ]
-    agg = list(reviews.aggregate(pipeline))
-    if agg:
-        companies.update_one(
-            {"_id": schedule["company_id"]},
-            {"$set": {"cached_rating": round(agg[0]["avg"], 1), "cached_total_reviews": agg[0]["count"]}}
-        )
+    # status_review booking + cached rating company diupdate lewat outbox; dokumen outbox ditulis
+    # dalam satu batch bersama review. Duplikat dicegah unique index reviews.booking_id.
+    try:
+        repo.reviews.insert(review_doc, side_effect=("review_created", {
+            "booking_id": booking_obj_id, "company_id": company_id,
+            "rating": review_in.rating, "review_id": review_id
+        }))
+    except DuplicateKeyError:
+        raise HTTPException(400, "Sudah pernah mereview booking ini")
 
     return ReviewOut(
-        id=str(result.inserted_id),
-        company_id=str(schedule["company_id"]),
-        company_name=company["name"],
-        user_name=user.get("name", "Anonymous"),
+        id=str(review_id),
+        company_id=str(company_id),
+        company_name=booking.get("company", {}).get("name", "Unknown"),
+        user_name=booking.get("user", {}).get("name", "Anonymous"),
         rating=review_in.rating,
         comment=review_in.comment,
         created_at=review_doc["created_at"]
@@ -66,50 +90,33 @@ async def create_review(review_in: ReviewCreate):
 # === GET ALL REVIEWS (UNTUK ADMIN PANEL) → INI YANG DIPAKE ADMIN ===
 @router.get("/", response_model=List[ReviewOut])
 async def get_all_reviews(current_admin=Depends(get_current_user_admin)):
-    pipeline = [
-        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "_id", "as": "user_info"}},
-        {"$lookup": {"from": "companies", "localField": "company_id", "foreignField": "_id", "as": "company_info"}},
-        {"$unwind": {"path": "$user_info", "preserveNullAndEmptyArrays": True}},
-        {"$unwind": {"path": "$company_info", "preserveNullAndEmptyArrays": True}},
-        {"$project": {
-            "id": {"$toString": "$_id"},
-            "company_id": {"$toString": "$company_id"},
-            "company_name": "$company_info.name",
-            "user_name": {"$ifNull": ["$user_info.name", "Anonymous"]},
-            "rating": 1,
-            "comment": 1,
-            "created_at": 1
-        }},
-        {"$sort": {"created_at": -1}}
-    ]
-    result = list(reviews.aggregate(pipeline))
-    return result
+    return repo.reviews.list_detailed()
 
 # === GET REVIEWS BY COMPANY (untuk halaman publik perusahaan) ===
 @router.get("/company/{company_id}", response_model=List[ReviewOut])
 async def get_reviews_by_company(company_id: str):
     if not ObjectId.is_valid(company_id):
         raise HTTPException(400, "company_id tidak valid")
-
-    pipeline = [
-        {"$match": {"company_id": ObjectId(company_id)}},
-        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "_id", "as": "user_info"}},
-        {"$lookup": {"from": "companies", "localField": "company_id", "foreignField": "_id", "as": "company_info"}},
-        {"$unwind": {"path": "$user_info", "preserveNullAndEmptyArrays": True}},
-        {"$unwind": {"path": "$company_info", "preserveNullAndEmptyArrays": True}},
-        {"$project": {
-            "id": {"$toString": "$_id"},
-            "company_id": {"$toString": "$company_id"},
-            "company_name": "$company_info.name",
-            "user_name": {"$ifNull": ["$user_info.name", "Anonymous"]},
-            "rating": 1,
-            "comment": 1,
-            "created_at": 1
-        }},
-        {"$sort": {"created_at": -1}}
-    ]
-    result = list(reviews.aggregate(pipeline))
-    return result
+    return repo.reviews.list_detailed(ObjectId(company_id))
+
+# === SEARCH REVIEWS (full-text, publik) ===
+@router.get("/search", response_model=List[ReviewSearchOut], dependencies=[Depends(require_mongo)])
+async def search_reviews(
+    q: str = Query(..., min_length=1),
+    company_id: Optional[str] = Query(None),
+    rating_min: Optional[int] = Query(None, ge=1, le=5),
+    rating_max: Optional[int] = Query(None, ge=1, le=5),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE)
+):
+    company_obj_id = None
+    if company_id:
+        if not ObjectId.is_valid(company_id):
+            raise HTTPException(400, "company_id tidak valid")
+        company_obj_id = ObjectId(company_id)
+
+    pipeline = search_pipeline(q, company_obj_id, rating_min, rating_max, (page - 1) * limit, limit)
+    return list(reviews.aggregate(pipeline))
 
 # === UPDATE REVIEW (Admin only) ===
 @router.put("/{review_id}", response_model=ReviewOut)
@@ -117,27 +124,20 @@ async def update_review(review_id: str, review_in: ReviewCreate, current_admin=D
     if not ObjectId.is_valid(review_id):
         raise HTTPException(400, "ID tidak valid")
     
-    update_data = review_in.dict(exclude_unset=True)
-    result = reviews.update_one(
-        {"_id": ObjectId(review_id)},
-        {"$set": update_data}
-    )
-    if result.modified_count == 0:
+    # booking_id (string dari body) tidak ikut: review tetap milik booking yang sama
+    update_data = review_in.dict(exclude_unset=True, exclude={"booking_id"})
+    old = repo.reviews.update(ObjectId(review_id), update_data)
+    if not old:
         raise HTTPException(404, "Review tidak ditemukan")
 
-    # Refresh cached rating
-    updated = reviews.find_one({"_id": ObjectId(review_id)})
-    pipeline = [{"$match": {"company_id": updated["company_id"]}}, {"$group": {"_id": None, "avg": {"$avg": "$rating"}, "count": {"$sum": 1}}}]
-    agg = list(reviews.aggregate(pipeline))
-    if agg:
-        companies.update_one(
-            {"_id": updated["company_id"]},
-            {"$set": {"cached_rating": round(agg[0]["avg"], 1), "cached_total_reviews": agg[0]["count"]}}
-        )
+    # Koreksi cached rating dari versi lama (atomik dengan update-nya)
+    adjust_rating(old, update_data.get("rating", old["rating"]))
+    updated = repo.reviews.get(ObjectId(review_id))
+    audit.record(current_admin, "update", "review", review_id, fields=update_data)
 
     # Return dalam format ReviewOut
-    company = companies.find_one({"_id": updated["company_id"]})
-    user = users.find_one({"_id": updated["user_id"]})
+    company = repo.companies.get(updated["company_id"])
+    user = repo.users.get(updated["user_id"])
     return ReviewOut(
         id=review_id,
         company_id=str(updated["company_id"]),
@@ -154,30 +154,16 @@ async def delete_review(review_id: str, current_admin=Depends(get_current_user_a
     if not ObjectId.is_valid(review_id):
         raise HTTPException(400, "ID tidak valid")
     
-    review = reviews.find_one({"_id": ObjectId(review_id)})
+    # Hapus review dulu, baru status_review booking jadi pending lagi (urutan ini diandalkan
+    # _review_side_effects yang mungkin sedang berjalan)
+    review = repo.reviews.delete(ObjectId(review_id))
     if not review:
         raise HTTPException(404, "Review tidak ditemukan")
+    repo.bookings.set_status_review(review["booking_id"], "pending")
 
-    # Update status_review booking jadi pending lagi
-    bookings.update_one(
-        {"_id": review["booking_id"]},
-        {"$set": {"status_review": "pending"}}
-    )
-
-    reviews.delete_one({"_id": ObjectId(review_id)})
-
-    # Refresh cached rating
-    pipeline = [{"$match": {"company_id": review["company_id"]}}, {"$group": {"_id": None, "avg": {"$avg": "$rating"}, "count": {"$sum": 1}}}]
-    agg = list(reviews.aggregate(pipeline))
-    if agg:
-        companies.update_one(
-            {"_id": review["company_id"]},
-            {"$set": {"cached_rating": round(agg[0]["avg"], 1), "cached_total_reviews": agg[0]["count"]}}
-        )
-    else:
-        companies.update_one(
-            {"_id": review["company_id"]},
-            {"$unset": {"cached_rating": "", "cached_total_reviews": ""}}
-        )
+    # Koreksi cached rating
+    adjust_rating(review)
+    audit.record(current_admin, "delete", "review", review_id,
+                 booking_id=str(review["booking_id"]), rating=review.get("rating"))
 
     return {"message": "Review dihapus"}
\ No newline at end of file
@@ -1,12 +1,17 @@
 # routes/schedule.py
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from models.schedule import ScheduleCreate
-from database import schedules, bookings
+from database import daily_stats
+import repositories as repo
 from bson import ObjectId
 from typing import List, Optional
 from datetime import datetime
-import pymongo
-from utils.auth import get_current_user_admin
+from utils.auth import get_current_user_admin, require_mongo
+from utils import fare_calendar
+from utils.schedule_events import schedule_changed, schedules_bulk_changed
+from utils.schedule_import import import_schedules
+from utils.raw_json import aggregate_response
+from utils import schedule_snapshot, company_stats, schedule_cache, search_cache, audit, outbox
 
 router = APIRouter()
 
@@ -19,15 +24,37 @@ async def create_schedule(
         raise HTTPException(400, "company_id tidak valid")
     
     # Cek perusahaan ada
-    from database import companies
-    if not companies.find_one({"_id": ObjectId(schedule_in.company_id)}):
+    if not repo.companies.get(ObjectId(schedule_in.company_id)):
         raise HTTPException(404, "Perusahaan tidak ditemukan")
 
     doc = schedule_in.dict()
     doc["company_id"] = ObjectId(schedule_in.company_id)
+    doc["capacity"] = doc["available_seats"]   # dasar load factor (utils/occupancy.py)
     
-    result = schedules.insert_one(doc)
-    return {"id": str(result.inserted_id), "message": "Jadwal dibuat"}
+    schedule_id = repo.schedules.insert(doc)
+    schedule_changed(schedule_id, doc)
+    audit.record(current_admin, "create", "schedule", schedule_id, fields=schedule_in.dict())
+    return {"id": str(schedule_id), "message": "Jadwal dibuat"}
+
+# === POST: Import timetable massal (CSV / NDJSON, ADMIN ONLY) ===
+# Body dikirim mentah (bukan multipart), dibaca streaming per baris.
+# CSV: baris pertama header; company bisa lewat kolom company_id atau company (nama).
+@router.post("/import", response_model=dict)
+async def import_schedule_timetable(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_admin = Depends(get_current_user_admin)
+):
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "ndjson" in content_type or "json" in content_type else "csv"
+
+    report, route_days = await import_schedules(request.stream(), format)
+    if report["inserted"] or report["updated"]:
+        schedules_bulk_changed(route_days)
+    audit.record(current_admin, "import", "schedule", format=format,
+                 inserted=report["inserted"], updated=report["updated"])
+    return report
 
 # routes/schedule.py → GANTI SELURUH @router.get("/") dengan ini:
 
@@ -39,88 +66,73 @@ async def get_schedules(
     departure_date: Optional[str] = Query(None),
     price_min: Optional[int] = Query(None),
     price_max: Optional[int] = Query(None),
-    sort_by: Optional[str] = Query("departure_date", regex="^(departure_date|price)$"),
-    order: Optional[str] = Query("asc", regex="^(asc|desc)$")
+    sort_by: Optional[str] = Query("departure_date", pattern="^(departure_date|price)$"),
+    order: Optional[str] = Query("asc", pattern="^(asc|desc)$"),
+    include_ratings: bool = Query(False)
 ):
-    # 1. Bangun filter (sama persis seperti sebelumnya)
-    query = {}
-    if origin:
-        query["origin"] = {"$regex": origin, "$options": "i"}
-    if destination:
-        query["destination"] = {"$regex": destination, "$options": "i"}
-    if type:
-        query["type"] = {"$regex": f"^{type}$", "$options": "i"}  # lebih ketat
+    # 1. Rentang tanggal keberangkatan (filter lain dibangun di repository / snapshot)
+    start = end = None
     if departure_date:
         try:
             date_obj = datetime.strptime(departure_date, "%Y-%m-%d")
             start = date_obj.replace(hour=0, minute=0, second=0)
             end = date_obj.replace(hour=23, minute=59, second=59)
-            query["departure_date"] = {"$gte": start, "$lte": end}
         except ValueError:
             raise HTTPException(400, "Format departure_date: YYYY-MM-DD")
-    if price_min is not None:
-        query["price"] = {**query.get("price", {}), "$gte": price_min}
-    if price_max is not None:
-        query["price"] = {**query.get("price", {}), "$lte": price_max}
 
     # 2. Sort
-    sort_order = pymongo.ASCENDING if order == "asc" else pymongo.DESCENDING
     sort_field = sort_by if sort_by == "price" else "departure_date"
-
-    # 3. AGGREGATION PIPELINE → JOIN dengan companies
-    pipeline = [
-        {"$match": query},
-        {"$sort": {sort_field: sort_order}},
-
-        # Join dengan tabel companies
-        {
-            "$lookup": {
-                "from": "companies",
-                "localField": "company_id",
-                "foreignField": "_id",
-                "as": "company_info"
-            }
-        },
-        {"$unwind": {"path": "$company_info", "preserveNullAndEmptyArrays": True}},
-
-        # Pilih field yang mau ditampilkan
-        {
-            "$project": {
-                "id": {"$toString": "$_id"},
-                "_id": 0,
-                "type": 1,
-                "origin": 1,
-                "destination": 1,
-                "departure_date": 1,
-                "arrival_date": 1,
-                "price": 1,
-                "available_seats": 1,
-                "company": {
-                    "id": {"$toString": "$company_info._id"},
-                    "name": "$company_info.name",
-                    "type": "$company_info.type"
-                }
-            }
-        }
-    ]
-
-    result = list(schedules.aggregate(pipeline))
-
-    # Jika company_info kosong (jadwal lama), beri nilai default
+    descending = order == "desc"
+
+    # Read model in-memory (opsional, SCHEDULE_SNAPSHOT=1) → tanpa round-trip ke MongoDB
+    if schedule_snapshot.snapshot is not None:
+        result = schedule_snapshot.snapshot.search(
+            origin, destination, type, start, end, price_min, price_max, sort_field, descending=descending
+        )
+        if result is not None:
+            return _attach_ratings(result) if include_ratings else result
+
+    # 3. Hasil dari cache pencarian (key = filter ternormalisasi), query DB hanya saat miss
+    key = search_cache.make_key(origin, destination, type, departure_date, price_min, price_max, sort_field, order)
+    result = search_cache.get_or_load(key, lambda: repo.schedules.search(
+        origin, destination, type, start, end, price_min, price_max, sort_field, descending=descending
+    ))
+    return _attach_ratings(result) if include_ratings else result
+
+def _attach_ratings(result: list) -> list:
+    # Satu batch untuk semua company di halaman ini (bukan satu fetch per kartu)
+    stats = company_stats.get_many(s["company"]["id"] for s in result if s["company"].get("id"))
     for sched in result:
-        if not sched.get("company"):
-            sched["company"] = {"id": None, "name": "Unknown Operator", "type": "unknown"}
-
+        sched["company"]["rating"] = stats.get(sched["company"].get("id"))
     return result
 
-@router.get("/popular")
+# === GET: Kalender harga termurah per hari untuk satu rute ===
+@router.get("/fare-calendar", response_model=List[dict], dependencies=[Depends(require_mongo)])
+async def get_fare_calendar(
+    origin: str = Query(...),
+    destination: str = Query(...),
+    start: str = Query(...),
+    end: str = Query(...)
+):
+    try:
+        start_dt = datetime.strptime(start, "%Y-%m-%d")
+        end_dt = datetime.strptime(end, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(400, "Format start/end: YYYY-MM-DD")
+    if (end_dt - start_dt).days > 366:
+        raise HTTPException(400, "Rentang tanggal maksimal 1 tahun")
+    return fare_calendar.get_calendar(origin, destination, start_dt, end_dt)
+
+@router.get("/popular", dependencies=[Depends(require_mongo)])
 async def popular_schedules():
+    # Dihitung dari rollup harian (daily_stats), bukan scan bookings + archive.
+    # Peringkat pakai booking bersih: booking yang dibatalkan tidak ikut dihitung
     pipeline = [
         {
             "$group": {
                 "_id": "$schedule_id",
-                "booking_count": {"$sum": 1},
-                "total_revenue": {"$sum": "$total_price"}
+                "booking_count": {"$sum": {"$subtract": ["$bookings", {"$ifNull": ["$cancellations", 0]}]}},
+                "total_revenue": {"$sum": "$revenue"}
             }
         },
         {"$sort": {"booking_count": -1}},
@@ -144,27 +156,17 @@ async def popular_schedules():
             }
         }
     ]
-    raw_result = list(bookings.aggregate(pipeline))
-
-    def convert_obj_id(obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, dict):
-            return {k: convert_obj_id(v) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [convert_obj_id(i) for i in obj]
-        return obj
-    return convert_obj_id(raw_result)
-
-@router.get("/{id}")
+    # ObjectId (_id, schedule._id) jadi string saat di-serialize, tanpa walk rekursif
+    return aggregate_response(daily_stats, pipeline)
+
+# === GET: Detail jadwal (satu-satunya route /{id}, lewat cache objek jadwal) ===
+@router.get("/{id}", response_model=dict)
 async def get_schedule(id: str):
     if not ObjectId.is_valid(id):
-        raise HTTPException(400, f"ID tidak valid: {id}")
-    sched = schedules.find_one({"_id": ObjectId(id)})
+        raise HTTPException(400, "ID tidak valid")
+    sched = schedule_cache.get_detail(id)
     if not sched:
         raise HTTPException(404, "Jadwal tidak ditemukan")
-    sched["id"] = str(sched["_id"])
-    del sched["_id"]
     return sched
 
 @router.put("/{id}")
@@ -179,12 +181,16 @@ async def update_schedule(
     update_data = schedule_in.dict()
     update_data["company_id"] = ObjectId(schedule_in.company_id)
     
-    result = schedules.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": update_data}
-    )
-    if result.modified_count == 0:
+    old = repo.schedules.update(ObjectId(id), update_data)
+    if not old:
         raise HTTPException(404, "Jadwal tidak ditemukan")
+
+    # Rute/tanggal bisa berubah → refresh hari lama dan hari baru
+    schedule_changed(id, old, update_data)
+    # Kursi bertambah → waitlist dipromosikan (handler di routes/booking.py)
+    if update_data["available_seats"] > old.get("available_seats", 0):
+        outbox.enqueue("waitlist_promote", schedule_id=ObjectId(id))
+    audit.record(current_admin, "update", "schedule", id, fields=schedule_in.dict())
     return {"message": "Jadwal diperbarui"}
 
 @router.delete("/{id}")
@@ -193,46 +199,10 @@ async def delete_schedule(
     current_admin = Depends(get_current_user_admin)
 ):
     # Cek apakah ada booking aktif
-    if bookings.find_one({"schedule_id": ObjectId(id), "status": {"$ne": "cancelled"}}):
+    if repo.bookings.has_active(ObjectId(id)):
         raise HTTPException(400, "Jadwal masih punya booking aktif")
     
-    schedules.delete_one({"_id": ObjectId(id)})
+    deleted = repo.schedules.delete(ObjectId(id))
+    schedule_changed(id, deleted)
+    audit.record(current_admin, "delete", "schedule", id)
     return {"message": "Jadwal dihapus"}
-
-@router.get("/{id}", response_model=dict)
-async def get_schedule(id: str):
-    if not ObjectId.is_valid(id):
-        raise HTTPException(400, "ID tidak valid")
-    pipeline = [
-        {"$match": {"_id": ObjectId(id)}},
-        {"$lookup": {
-            "from": "companies",
-            "localField": "company_id",
-            "foreignField": "_id",
-            "as": "company_info"
-        }},
-        {"$unwind": {"path": "$company_info", "preserveNullAndEmptyArrays": True}},
-        {"$project": {
-            "id": {"$toString": "$_id"},
-            "_id": 0,
-            "type": 1,
-            "origin": 1,
-            "destination": 1,
-            "departure_date": 1,
-            "arrival_date": 1,
-            "price": 1,
-            "available_seats": 1,
-            "company": {
-                "id": {"$toString": "$company_info._id"},
-                "name": "$company_info.name",
-                "type": "$company_info.type"
-            }
-        }}
-    ]
-    try:
-        sched = next(schedules.aggregate(pipeline))
-        if not sched.get("company"):
-            sched["company"] = {"id": None, "name": "Unknown", "type": "unknown"}
-        return sched
-    except StopIteration:
-        raise HTTPException(404, "Jadwal tidak ditemukan")
\ No newline at end of file
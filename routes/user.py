@@ -1,29 +1,30 @@
 # routes/user.py (MODIFIKASI: Tambah register admin, CRUD lengkap)
 from fastapi import APIRouter, HTTPException, Depends
 from models.user import UserCreate, UserLogin, UserOut
-from database import users
-from passlib.context import CryptContext
+import repositories as repo
+from utils.passwords import hash_password, verify_password
 from bson import ObjectId
 from typing import List, Optional
 from utils.auth import get_current_user_admin
+from utils.raw_json import json_response
+from utils import audit
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Register customer (asli)
 @router.post("/register")
 async def register(user_in: UserCreate):
-    if users.find_one({"email": user_in.email}):
+    if repo.users.get_by_email(user_in.email):
         raise HTTPException(400, "Email sudah digunakan")
-    hashed = pwd_context.hash(user_in.password)
+    hashed = hash_password(user_in.password)
     user_doc = user_in.dict()
     user_doc["password"] = hashed
     user_doc["role"] = "customer"
-    result = users.insert_one(user_doc)
+    user_id = repo.users.insert(user_doc)
     return {
         "msg": "User dibuat",
         "user": {
-            "id": str(result.inserted_id),
+            "id": str(user_id),
             "name": user_doc["name"],
             "email": user_doc["email"],
             "role": "customer"
@@ -33,17 +34,18 @@ async def register(user_in: UserCreate):
 # Register admin (BARU: Khusus admin, mungkin panggil manual atau dari console)
 @router.post("/register_admin")
 async def register_admin(user_in: UserCreate, current_admin=Depends(get_current_user_admin)):
-    if users.find_one({"email": user_in.email}):
+    if repo.users.get_by_email(user_in.email):
         raise HTTPException(400, "Email sudah digunakan")
-    hashed = pwd_context.hash(user_in.password)
+    hashed = hash_password(user_in.password)
     user_doc = user_in.dict()
     user_doc["password"] = hashed
     user_doc["role"] = "admin"
-    result = users.insert_one(user_doc)
+    user_id = repo.users.insert(user_doc)
+    audit.record(current_admin, "create", "user", user_id, role="admin", email=user_doc["email"])
     return {
         "msg": "Admin dibuat",
         "user": {
-            "id": str(result.inserted_id),
+            "id": str(user_id),
             "name": user_doc["name"],
             "email": user_doc["email"],
             "role": "admin"
@@ -53,8 +55,8 @@ async def register_admin(user_in: UserCreate, current_admin=Depends(get_current_
 # Login (asli, support admin/customer)
 @router.post("/login")
 async def login(user_in: UserLogin):
-    user = users.find_one({"email": user_in.email})
-    if not user or not pwd_context.verify(user_in.password, user["password"]):
+    user = repo.users.get_by_email(user_in.email)
+    if not user or not verify_password(user_in.password, user["password"]):
         raise HTTPException(400, "Login gagal")
     return {
         "msg": "Login sukses",
@@ -69,19 +71,14 @@ async def login(user_in: UserLogin):
 # Get all users (ADMIN ONLY)
 @router.get("/", response_model=List[dict])
 async def get_users(current_admin=Depends(get_current_user_admin)):
-    user_list = []
-    for u in users.find({}, {"password": 0}):
-        u["id"] = str(u["_id"])
-        del u["_id"]
-        user_list.append(u)
-    return user_list
+    return json_response(repo.users.list_public())
 
 # Get user by ID (ADMIN ONLY)
 @router.get("/{user_id}", response_model=dict)
 async def get_user(user_id: str, current_admin=Depends(get_current_user_admin)):
     if not ObjectId.is_valid(user_id):
         raise HTTPException(400, "ID tidak valid")
-    user = users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
+    user = repo.users.get(ObjectId(user_id))
     if not user:
         raise HTTPException(404, "User tidak ditemukan")
     user["id"] = str(user["_id"])
@@ -95,10 +92,11 @@ async def update_user(user_id: str, user_in: UserCreate, current_admin=Depends(g
         raise HTTPException(400, "ID tidak valid")
     update_data = user_in.dict(exclude_unset=True)
     if "password" in update_data:
-        update_data["password"] = pwd_context.hash(update_data["password"])
-    result = users.update_one({"_id": ObjectId(user_id)}, {"$set": update_data})
-    if result.modified_count == 0:
+        update_data["password"] = hash_password(update_data["password"])
+    if not repo.users.update(ObjectId(user_id), update_data):
         raise HTTPException(404, "User tidak ditemukan atau tidak ada perubahan")
+    # Hash password tidak ikut dicatat
+    audit.record(current_admin, "update", "user", user_id, fields=sorted(update_data))
     return {"message": "User diperbarui"}
 
 # Delete user (ADMIN ONLY)
@@ -106,7 +104,7 @@ async def update_user(user_id: str, user_in: UserCreate, current_admin=Depends(g
 async def delete_user(user_id: str, current_admin=Depends(get_current_user_admin)):
     if not ObjectId.is_valid(user_id):
         raise HTTPException(400, "ID tidak valid")
-    result = users.delete_one({"_id": ObjectId(user_id)})
-    if result.deleted_count == 0:
+    if not repo.users.delete(ObjectId(user_id)):
         raise HTTPException(404, "User tidak ditemukan")
+    audit.record(current_admin, "delete", "user", user_id)
     return {"message": "User dihapus"}
\ No newline at end of file
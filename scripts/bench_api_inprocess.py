@@ -0,0 +1,86 @@
+# scripts/bench_api_inprocess.py → benchmark API lengkap in-process (TestClient), per backend repository
+# Pakai: python scripts/bench_api_inprocess.py [memory|mongo] [jumlah_jadwal] [repeat]
+# memory (default) tidak butuh mongod: selisihnya dengan mongo = biaya engine + round-trip DB.
+# Data sintetis diisi lewat repository; backend mongo memakai database BENCH_DB (di-drop dulu).
+
+import os
+import sys
+
+backend = sys.argv[1] if len(sys.argv) > 1 else "memory"
+n_schedules = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+# Harus sebelum modul aplikasi diimpor: backend dibaca database.py, rate limit jangan ikut diukur
+os.environ["REPOSITORY_BACKEND"] = backend
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "1000000")
+os.environ.setdefault("RATE_LIMIT_BURST", "1000000")
+
+import bench_common  # noqa: E402
+import random  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+
+if backend == "mongo":
+    db = bench_common.bench_db()
+    for name in ("users", "companies", "schedules", "bookings", "reviews"):
+        db[name].drop()
+
+import main  # noqa: E402
+import repositories as repo  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+rnd = random.Random(7)
+cities = ["Jakarta", "Bandung", "Surabaya", "Yogyakarta", "Semarang", "Malang", "Denpasar", "Medan"]
+company_ids = [repo.companies.insert({"name": f"PO {i}", "type": "bus"}) for i in range(20)]
+admin_id = repo.users.insert({"name": "Admin", "email": "admin@bench.local", "password": "-", "role": "admin"})
+user_ids = [
+    repo.users.insert({"name": f"User {i}", "email": f"user{i}@bench.local", "password": "-", "role": "customer"})
+    for i in range(200)
+]
+schedule_ids = []
+for i in range(n_schedules):
+    origin, destination = rnd.sample(cities, 2)
+    schedule_ids.append(repo.schedules.insert({
+        "company_id": rnd.choice(company_ids), "type": "bus", "origin": origin, "destination": destination,
+        "departure_date": datetime(2030, 1, 1) + timedelta(hours=i % 720), "price": rnd.randint(50, 500) * 1000,
+        "available_seats": 1_000_000
+    }))
+for i in range(n_schedules):
+    repo.bookings.insert({
+        "user_id": rnd.choice(user_ids), "schedule_id": rnd.choice(schedule_ids),
+        "passenger_name": f"Penumpang {i}", "passenger_count": 1, "total_price": 100_000,
+        "status": "confirmed", "status_review": "pending",
+        "booking_code": f"BENCH{i:08d}", "booking_date": datetime(2026, 1, 1) + timedelta(minutes=i)
+    })
+
+admin = {"X-User-ID": str(admin_id), "X-User-Role": "admin"}
+
+
+def get(client, path, headers=None):
+    def run():
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, (path, response.status_code, response.text[:200])
+    return run
+
+
+def book_and_cancel(client):
+    def run():
+        body = {"user_id": str(rnd.choice(user_ids)), "schedule_id": str(rnd.choice(schedule_ids)),
+                "passenger_name": "Bench", "passenger_count": 1}
+        created = client.post("/api/bookings/", json=body)
+        assert created.status_code == 200, created.text[:200]
+        assert client.delete(f"/api/bookings/{created.json()['id']}").status_code == 200
+    return run
+
+
+print(f"backend={backend} jadwal={n_schedules} booking={n_schedules} repeat={repeat}")
+with TestClient(main.app) as client:
+    cases = [
+        ("GET /api/schedules/ (rute)", get(client, "/api/schedules/?origin=jakarta&destination=bandung")),
+        ("GET /api/schedules/{id}", get(client, f"/api/schedules/{schedule_ids[0]}")),
+        ("GET /api/companies/", get(client, "/api/companies/")),
+        ("GET /api/bookings/user/{id}", get(client, f"/api/bookings/user/{user_ids[0]}")),
+        ("GET /api/bookings/ (admin, semua)", get(client, "/api/bookings/", admin)),
+        ("POST /api/bookings/ + DELETE", book_and_cancel(client)),
+    ]
+    for label, fn in cases:
+        bench_common.report(label, bench_common.measure(fn, repeat=repeat, warmup=5))
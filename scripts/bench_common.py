@@ -0,0 +1,81 @@
+# scripts/bench_common.py → helper bersama untuk script benchmark di folder ini
+# Data sintetis ditulis ke database terpisah (BENCH_DB), bukan travel_agency: MONGODB_DB di-set
+# sebelum database.py diimpor, jadi modul aplikasi (repository, snapshot, dll) ikut memakainya.
+
+import os
+import sys
+import statistics
+import time
+
+# Script dijalankan sebagai `python scripts/bench_x.py` → modul aplikasi ada di folder induk
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DB = os.getenv("BENCH_DB", "travel_agency_bench")
+os.environ["MONGODB_DB"] = BENCH_DB
+
+
+def bench_db():
+    from database import db
+    return db
+
+
+def measure(fn, repeat: int = 20, warmup: int = 2) -> dict:
+    """Jalankan fn berulang; return ringkasan latensi dalam milidetik."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "max_ms": round(samples[-1], 2),
+    }
+
+
+def report(label: str, result: dict):
+    print(f"{label:<46} " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+
+def insert_batched(coll, docs, batch_size: int = 10_000) -> int:
+    """insert_many per batch dari generator (tidak menahan semua dokumen di memori)."""
+    total, batch = 0, []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            coll.insert_many(batch, ordered=False)
+            total += len(batch)
+            batch = []
+    if batch:
+        coll.insert_many(batch, ordered=False)
+        total += len(batch)
+    return total
+
+
+def seed_bookings(db, n: int, seed: int = 3) -> int:
+    """Ganti isi users/companies/schedules/bookings dengan n booking sintetis."""
+    import random
+    from datetime import datetime, timedelta
+
+    for name in ("users", "companies", "schedules", "bookings"):
+        db[name].drop()
+    rnd = random.Random(seed)
+    company_ids = db.companies.insert_many([{"name": f"PO {i}", "type": "bus"} for i in range(50)]).inserted_ids
+    user_ids = db.users.insert_many(
+        [{"name": f"User {i}", "email": f"user{i}@bench.local", "role": "customer"} for i in range(2000)]
+    ).inserted_ids
+    schedule_ids = db.schedules.insert_many([{
+        "company_id": rnd.choice(company_ids), "type": "bus", "origin": "Jakarta", "destination": "Bandung",
+        "departure_date": datetime(2026, 1, 1) + timedelta(hours=i), "price": 150_000, "available_seats": 40
+    } for i in range(1000)]).inserted_ids
+    return insert_batched(db.bookings, ({
+        "user_id": rnd.choice(user_ids), "schedule_id": rnd.choice(schedule_ids),
+        "passenger_name": f"Penumpang {i}", "passenger_count": rnd.randint(1, 4), "total_price": 150_000,
+        "status": rnd.choice(["pending", "confirmed", "completed"]),
+        # Sebagian booking lama tanpa status_review
+        **({"status_review": "pending"} if i % 3 else {}),
+        "booking_code": f"TRV{i:08d}", "booking_date": datetime(2025, 6, 1) + timedelta(minutes=i)
+    } for i in range(n)))
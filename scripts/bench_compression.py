@@ -0,0 +1,34 @@
+# scripts/bench_compression.py → ukur byte di kabel per Accept-Encoding untuk listing booking
+# (default 5000 baris) dan landing page, lewat app in-process (CompressionMiddleware + aset build)
+# Pakai: python scripts/bench_compression.py [jumlah_booking]
+# Butuh MongoDB (data sintetis di BENCH_DB). Jalankan build_static.py dulu untuk salinan .gz/.br landing page.
+
+import sys
+import time
+from bench_common import bench_db, report, seed_bookings
+
+from fastapi.testclient import TestClient
+import main
+
+n_bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+seed_bookings(bench_db(), n_bookings)
+
+# Tanpa `with` → lifespan (worker background) tidak dijalankan, cukup untuk mengukur response
+client = TestClient(main.app)
+ENCODINGS = ["identity", "gzip", "br", "br;q=0, gzip"]
+
+for label, path in ((f"listing {n_bookings} booking", "/api/bookings/"), ("landing page", "/")):
+    for accept in ENCODINGS:
+        started = time.perf_counter()
+        with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+            body = response.read()   # sudah di-decode httpx; byte di kabel dari num_bytes_downloaded
+            wire = response.num_bytes_downloaded
+            encoding = response.headers.get("content-encoding", "identity")
+        report(f"{label} [{accept}]", {
+            "status": response.status_code,
+            "content_encoding": encoding,
+            "wire_bytes": wire,
+            "raw_bytes": len(body),
+            "ratio": round(wire / len(body), 3) if body else None,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        })
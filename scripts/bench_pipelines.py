@@ -0,0 +1,121 @@
+# scripts/bench_pipelines.py → biaya membangun pipeline per request: template beku bersama
+# (repositories/pipelines.py) vs dict literal yang dialokasikan ulang tiap request (cara lama)
+# Pakai: python scripts/bench_pipelines.py [jumlah_build] [--server]
+# Diukur per 10k build: CPU bangun pipeline, CPU bangun + encode BSON (yang dikirim driver), alokasi
+# (tracemalloc). --server: jalankan juga kedua versi di MongoDB (BENCH_DB) untuk memastikan hasilnya sama.
+
+import sys
+import time
+import tracemalloc
+import bson
+from bson import ObjectId
+from bench_common import bench_db, report, measure, seed_bookings
+
+from repositories.pipelines import booking_pipeline, review_context_pipeline
+from utils.review_search import search_pipeline
+
+n_builds = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 100_000
+with_server = "--server" in sys.argv
+
+
+def _lookup(collection, local_field, as_field):
+    return [
+        {"$lookup": {"from": collection, "localField": local_field, "foreignField": "_id", "as": as_field}},
+        {"$unwind": {"path": f"${as_field}", "preserveNullAndEmptyArrays": True}},
+    ]
+
+
+def literal_booking(match: dict) -> list:
+    # Bentuk pipeline listing booking sebelum template bersama (semua stage dibuat ulang)
+    return [
+        {"$match": match},
+        *_lookup("users", "user_id", "user_info"),
+        *_lookup("schedules", "schedule_id", "schedule_info"),
+        *_lookup("companies", "schedule_info.company_id", "schedule_info.company"),
+        {"$project": {
+            "_id": {"$toString": "$_id"}, "booking_code": 1, "status": 1,
+            "status_review": {"$ifNull": ["$status_review", "pending"]},
+            "total_price": 1, "passenger_name": 1, "passenger_count": 1, "booking_date": 1,
+            "user_info.name": 1, "user_info.email": 1,
+            "schedule_info.origin": 1, "schedule_info.destination": 1, "schedule_info.departure_date": 1,
+            "schedule_info.price": 1, "schedule_info.type": 1, "schedule_info.company.name": 1,
+            "user_info._id": {"$toString": "$user_info._id"},
+            "schedule_info._id": {"$toString": "$schedule_info._id"},
+        }},
+    ]
+
+
+def literal_search(q: str, company_id, skip: int, limit: int) -> list:
+    return [
+        {"$match": {"$text": {"$search": q}, "company_id": company_id, "rating": {"$gte": 3}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {"$sort": {"score": -1, "created_at": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        *_lookup("users", "user_id", "user_info"),
+        *_lookup("companies", "company_id", "company_info"),
+        {"$project": {
+            "id": {"$toString": "$_id"}, "company_id": {"$toString": "$company_id"},
+            "company_name": "$company_info.name", "user_name": {"$ifNull": ["$user_info.name", "Anonymous"]},
+            "rating": 1, "comment": 1, "created_at": 1, "score": 1
+        }},
+    ]
+
+
+def literal_review_context(booking_id) -> list:
+    return [
+        {"$match": {"_id": booking_id}},
+        *_lookup("schedules", "schedule_id", "schedule"),
+        *_lookup("companies", "schedule.company_id", "company"),
+        *_lookup("users", "user_id", "user"),
+        {"$project": {"status": 1, "status_review": 1, "user_id": 1,
+                      "schedule.company_id": 1, "company.name": 1, "user.name": 1}},
+    ]
+
+
+oid = ObjectId()
+cases = [
+    ("listing booking user", lambda: literal_booking({"user_id": oid}),
+     lambda: booking_pipeline([{"$match": {"user_id": oid}}], with_ids=True)),
+    ("pencarian review", lambda: literal_search("nyaman", oid, 20, 20),
+     lambda: search_pipeline("nyaman", oid, 3, None, 20, 20)),
+    ("konteks review", lambda: literal_review_context(oid), lambda: review_context_pipeline(oid)),
+]
+
+
+def cost(build, encode: bool) -> dict:
+    t0 = time.process_time()
+    for _ in range(n_builds):
+        pipeline = build()
+        if encode:
+            bson.encode({"pipeline": pipeline})
+    return round((time.process_time() - t0) * 1000 * 10_000 / n_builds, 1)
+
+
+def allocated(build) -> int:
+    tracemalloc.start()
+    kept = [build() for _ in range(1000)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size // 1000
+
+
+print(f"{n_builds} build per kasus, angka per 10k build")
+for label, literal, shared in cases:
+    for variant, build in (("literal", literal), ("template", shared)):
+        report(f"{label} ({variant})", {
+            "build_cpu_ms": cost(build, encode=False),
+            "build+bson_cpu_ms": cost(build, encode=True),
+            "bytes_per_build": allocated(build),
+        })
+
+if with_server:
+    db = bench_db()
+    seed_bookings(db, 20_000)
+    user_id = db.bookings.find_one()["user_id"]
+    literal = literal_booking({"user_id": user_id})
+    shared = booking_pipeline([{"$match": {"user_id": user_id}}], with_ids=True)
+    assert list(db.bookings.aggregate(literal)) == list(db.bookings.aggregate(shared))
+    report("server listing booking (literal)", measure(lambda: list(db.bookings.aggregate(literal))))
+    report("server listing booking (template)", measure(lambda: list(db.bookings.aggregate(shared))))
@@ -0,0 +1,55 @@
+# scripts/bench_raw_listing.py → bandingkan jalur listing booking: raw BSON batch + JSON streaming
+# (utils/raw_json.py) vs jalur lama (list dict → loop default status_review → jsonable_encoder → json)
+# Pakai: python scripts/bench_raw_listing.py [jumlah_booking] [repeat]
+# Hasil dinormalisasi per 10k baris: CPU (process_time), wall, puncak alokasi memori (tracemalloc).
+
+import sys
+import json
+import time
+import tracemalloc
+from bench_common import bench_db, report, seed_bookings
+
+from fastapi.encoders import jsonable_encoder
+from repositories.pipelines import booking_pipeline
+from utils.raw_json import RawBatches, _stream
+
+n_bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+db = bench_db()
+seed_bookings(db, n_bookings)
+pipeline = booking_pipeline([{"$match": {}}])
+
+
+def raw_path() -> int:
+    return sum(len(part) for part in _stream(RawBatches(db.bookings, pipeline)))
+
+
+def dict_path() -> int:
+    result = list(db.bookings.aggregate(pipeline))
+    for booking in result:
+        if "status_review" not in booking or booking["status_review"] is None:
+            booking["status_review"] = "pending"
+    # Yang dilakukan FastAPI untuk response_model=List[dict]: encode lalu json.dumps
+    return len(json.dumps(jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")))
+
+
+scale = 10_000 / n_bookings
+for label, fn in (("raw BSON stream", raw_path), ("dict + jsonable_encoder", dict_path)):
+    fn()   # warmup
+    cpu, wall = [], []
+    for _ in range(repeat):
+        c0, w0 = time.process_time(), time.perf_counter()
+        size = fn()
+        cpu.append(time.process_time() - c0)
+        wall.append(time.perf_counter() - w0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report(label, {
+        "cpu_ms_per_10k": round(min(cpu) * 1000 * scale, 1),
+        "wall_ms_per_10k": round(min(wall) * 1000 * scale, 1),
+        "peak_mb_per_10k": round(peak / 1e6 * scale, 2),
+        "body_kb": size // 1024,
+    })
@@ -0,0 +1,66 @@
+# scripts/bench_review_search.py → benchmark pencarian full-text review (utils/review_search.py)
+# Pakai: python scripts/bench_review_search.py [jumlah_review] [jumlah_company]
+# Mengisi BENCH_DB.reviews dengan review sintetis (default 1 juta), lalu mengukur latensi
+# search_pipeline (text index + textScore) vs scan $regex sebagai pembanding.
+
+import sys
+import random
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bench_common import bench_db, measure, report, insert_batched
+
+from utils.review_search import search_pipeline
+
+n_reviews = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+n_companies = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+WORDS = (
+    "bus nyaman supir ramah tepat waktu telat kotor bersih ac dingin kursi sempit lega "
+    "pelayanan buruk bagus mahal murah bagasi hilang aman cepat lambat toilet wifi snack "
+    "comfortable late clean dirty friendly rude delay smooth seat legroom"
+).split()
+
+db = bench_db()
+coll = db.reviews
+company_ids = [ObjectId() for _ in range(n_companies)]
+now = datetime.utcnow()
+
+
+def synthetic():
+    rnd = random.Random(42)
+    for _ in range(n_reviews):
+        yield {
+            "company_id": rnd.choice(company_ids),
+            "user_id": ObjectId(),
+            "rating": rnd.randint(1, 5),
+            "comment": " ".join(rnd.choices(WORDS, k=rnd.randint(5, 25))),
+            "created_at": now - timedelta(minutes=rnd.randint(0, 500_000)),
+        }
+
+
+coll.drop()
+t0 = datetime.utcnow()
+inserted = insert_batched(coll, synthetic())
+print(f"{inserted} review sintetis dimasukkan dalam {(datetime.utcnow() - t0).total_seconds():.1f} s")
+
+# ensure_indexes() aplikasi menulis ke koleksi produksi → index yang sama dibuat di BENCH_DB
+coll.create_index([("comment", "text")], name="comment_text", default_language="none")
+coll.create_index([("company_id", 1), ("created_at", -1)])
+
+cases = [
+    ("1 kata", dict(q="telat")),
+    ("2 kata", dict(q="supir ramah")),
+    ("frasa", dict(q='"tepat waktu"')),
+    ("kata + company", dict(q="kotor", company_id=company_ids[0])),
+    ("kata + rating 1-2", dict(q="bagasi", rating_min=1, rating_max=2)),
+    ("kata, halaman 10", dict(q="nyaman", skip=180)),
+]
+for label, args in cases:
+    pipeline = search_pipeline(**args)
+    report(f"text index: {label}", measure(lambda: list(coll.aggregate(pipeline)), repeat=10))
+
+# Pembanding tanpa text index: regex scan + sort tanggal (tanpa ranking relevansi)
+report("regex scan: 1 kata", measure(
+    lambda: list(coll.find({"comment": {"$regex": "telat"}}).sort("created_at", -1).limit(20)),
+    repeat=3, warmup=1
+))
@@ -0,0 +1,79 @@
+# scripts/bench_schedule_snapshot.py → bandingkan snapshot kolom NumPy (utils/schedule_snapshot.py)
+# dengan aggregation get_schedules (repository mongo) pada 100k dan 1 juta jadwal
+# Pakai: python scripts/bench_schedule_snapshot.py [ukuran,ukuran,...]
+# Butuh numpy + MongoDB. Data sintetis di BENCH_DB.schedules/companies (dihapus tiap ukuran).
+
+import sys
+import random
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bench_common import bench_db, measure, report, insert_batched
+
+from utils import schedule_snapshot
+from repositories.mongo import schedules as schedule_repo
+
+if schedule_snapshot.np is None:
+    sys.exit("numpy belum terpasang")
+
+sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [100_000, 1_000_000]
+
+CITIES = ["Jakarta", "Bandung", "Surabaya", "Yogyakarta", "Semarang", "Malang", "Denpasar",
+          "Medan", "Palembang", "Makassar", "Solo", "Cirebon", "Bogor", "Padang", "Lampung"]
+TYPES = ["bus", "train", "flight"]
+db = bench_db()
+start_day = datetime(2026, 1, 1)
+
+
+def synthetic(n: int, company_ids: list):
+    rnd = random.Random(7)
+    for _ in range(n):
+        origin, destination = rnd.sample(CITIES, 2)
+        departure = start_day + timedelta(minutes=rnd.randint(0, 365 * 24 * 60))
+        yield {
+            "company_id": rnd.choice(company_ids),
+            "type": rnd.choice(TYPES),
+            "origin": origin,
+            "destination": destination,
+            "departure_date": departure,
+            "arrival_date": departure + timedelta(hours=rnd.randint(1, 14)),
+            "price": rnd.randrange(50_000, 2_000_000, 5_000),
+            "available_seats": rnd.randint(0, 60),
+            "capacity": 60,
+        }
+
+
+day = start_day + timedelta(days=40)
+cases = [
+    ("rute + tanggal", dict(origin="Jakarta", destination="Bandung", start=day, end=day + timedelta(days=1))),
+    ("rute, sort harga", dict(origin="Jakarta", destination="Surabaya", sort_field="price")),
+    ("tipe + rentang harga", dict(type="train", price_min=100_000, price_max=300_000, start=day,
+                                  end=day + timedelta(days=7))),
+    ("origin saja, 30 hari", dict(origin="Medan", start=day, end=day + timedelta(days=30))),
+]
+defaults = dict(origin=None, destination=None, type=None, start=None, end=None,
+                price_min=None, price_max=None, sort_field="departure_date", descending=False)
+
+for n in sizes:
+    db.schedules.drop()
+    db.companies.drop()
+    company_ids = db.companies.insert_many(
+        [{"_id": ObjectId(), "name": f"PO {i}", "type": TYPES[i % 3]} for i in range(200)]
+    ).inserted_ids
+    inserted = insert_batched(db.schedules, synthetic(n, company_ids))
+    db.schedules.create_index([("departure_date", 1)])
+    db.schedules.create_index([("origin", 1), ("destination", 1), ("departure_date", 1)])
+    print(f"\n=== {inserted} jadwal ===")
+
+    snap = schedule_snapshot.ScheduleSnapshot()
+    report("snapshot load", measure(snap.load, repeat=1, warmup=0))
+    print(f"memori kolom snapshot: {sum(col.nbytes for col in snap._cols.values()) / 1e6:.1f} MB")
+
+    for label, args in cases:
+        params = {**defaults, **args}
+        rows = len(snap.search(**params))
+        report(f"snapshot: {label} ({rows} baris)", measure(lambda: snap.search(**params)))
+        report(f"aggregation: {label}", measure(lambda: schedule_repo.search(**params), repeat=5, warmup=1))
+
+    # Refresh satu jadwal (jalur cache_bus setelah update)
+    sid = str(db.schedules.find_one({}, {"_id": 1})["_id"])
+    report("snapshot refresh 1 jadwal", measure(lambda: snap.refresh(sid)))
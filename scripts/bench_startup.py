@@ -0,0 +1,51 @@
+# scripts/bench_startup.py → ukur cold start aplikasi di proses baru (import, lifespan, request pertama)
+# Pakai: python scripts/bench_startup.py [jumlah_run] [path_request_pertama]
+# Tiap run memakai interpreter baru supaya cache import tidak terbawa. Butuh MongoDB (warm_up di lifespan).
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import bench_common
+
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+first_path = sys.argv[2] if len(sys.argv) > 2 else "/api/schedules/"
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+t_client = time.perf_counter()
+with TestClient(main.app) as client:
+    t_ready = time.perf_counter()
+    status = client.get(sys.argv[1]).status_code
+    t_first = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "lifespan_ms": (t_ready - t_client) * 1000,
+    "first_request_ms": (t_first - t_ready) * 1000,
+    "total_ms": (t_first - t0) * 1000 - (t_client - t_import) * 1000,
+    "status": status,
+    "passlib_loaded_at_import": "passlib" in sys.modules,
+}))
+"""
+
+results = []
+for i in range(runs):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, first_path],
+        cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+    results.append(json.loads(out.strip().splitlines()[-1]))
+    print(f"run {i + 1}: " + "  ".join(
+        f"{k}={round(v, 1) if isinstance(v, float) else v}" for k, v in results[-1].items()
+    ))
+
+bench_common.report(f"median {runs} run", {
+    k: round(statistics.median(r[k] for r in results), 1)
+    for k in ("import_ms", "lifespan_ms", "first_request_ms", "total_ms")
+})
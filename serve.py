@@ -0,0 +1,15 @@
+# serve.py → entry point produksi (multi-worker, tanpa reload)
+# Pakai: python serve.py   (jumlah worker = WEB_CONCURRENCY atau jumlah CPU)
+
+import os
+import uvicorn
+
+if __name__ == "__main__":
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers,
+        proxy_headers=True
+    )
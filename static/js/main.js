@@ -354,6 +354,33 @@ async function deleteAdminItem(entity, id) {
   }
 }
 
+// Ringkasan dashboard admin (satu request kecil, bukan semua listing)
+async function loadAdminSummary() {
+  const data = await fetchWithAuth(apiUrl("admin/summary"));
+  if (!data) return;
+
+  const cards = [
+    ["Booking", data.bookings.total, Object.entries(data.bookings.by_status).map(([k, v]) => `${k}: ${v}`).join(" • ")],
+    ["Pendapatan", `Rp ${data.bookings.revenue.toLocaleString("id-ID")}`, `${data.bookings.passengers} penumpang`],
+    ["Ulasan", data.reviews.total, `Rata-rata ${data.reviews.average}`],
+    ["User", data.users.total, `${data.schedules.upcoming} jadwal mendatang`],
+  ];
+  document.getElementById("admin-summary").innerHTML = cards
+    .map(
+      ([title, value, sub]) => `
+      <div class="col-md-3 mb-3">
+        <div class="card h-100">
+          <div class="card-body">
+            <p class="text-muted mb-1">${title}</p>
+            <h4 class="fw-bold">${value}</h4>
+            <small class="text-muted">${sub}</small>
+          </div>
+        </div>
+      </div>`
+    )
+    .join("");
+}
+
 async function loadCompanies() {
   const res = await fetch(apiUrl("companies"));
   const companies = await res.json();
@@ -441,6 +468,10 @@ document.addEventListener("DOMContentLoaded", () => {
     ?.addEventListener("submit", searchSchedules);
 
   // Event untuk load data saat sub-tab admin ditampilkan
+  document
+    .querySelector('a[href="#admin"]')
+    ?.addEventListener("shown.bs.tab", loadAdminSummary);
+
   document.querySelectorAll("#adminSubTab a").forEach((tab) => {
     tab.addEventListener("shown.bs.tab", async (e) => {
       const entity = e.target.href.split("#admin-")[1].slice(0, -1); // users → user
@@ -538,6 +569,7 @@ async function searchSchedules(e) {
     destination: document.getElementById("destination").value,
     departure_date: document.getElementById("departure_date").value,
     type: document.getElementById("type").value,
+    include_ratings: true,
   });
 
   const url = apiUrl("schedules") + (params.toString() ? "?" + params : "");
@@ -556,7 +588,12 @@ function renderSchedules(schedules) {
     container.innerHTML += `
       <div class="card mb-3">
         <div class="card-body">
-          <h6>${s.type.toUpperCase()} • ${s.company?.name || "Unknown"}</h6>
+          <h6>${s.type.toUpperCase()} • ${s.company?.name || "Unknown"}
+            ${
+              s.company?.rating?.count
+                ? `<small class="text-warning">★ ${s.company.rating.average} (${s.company.rating.count})</small>`
+                : ""
+            }</h6>
           <p class="mb-1"><strong>${s.origin} → ${s.destination}</strong></p>
           <p class="mb-1">Berangkat: ${new Date(
             s.departure_date
@@ -0,0 +1,48 @@
+# tests/conftest.py
+# Test integrasi butuh MongoDB (MONGODB_URI, default localhost); tanpa server → di-skip.
+# Data ditulis ke database terpisah (MONGODB_DB) yang di-drop setelah sesi.
+import os
+import sys
+import pytest
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGODB_DB", "travel_agency_test")
+os.environ.setdefault("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "1000")
+
+
+class CommandRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Listener global harus terdaftar sebelum database.py membuat MongoClient
+recorder = CommandRecorder()
+monitoring.register(recorder)
+
+
+@pytest.fixture(scope="session")
+def mongo():
+    import database
+    try:
+        database.client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB tidak tersedia")
+    yield database
+    database.client.drop_database(database.MONGODB_DB)
+
+
+@pytest.fixture
+def commands():
+    recorder.commands.clear()
+    return recorder.commands
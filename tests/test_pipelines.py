@@ -0,0 +1,89 @@
+# tests/test_pipelines.py
+# Pipeline setiap endpoint: filter/sort/paging ($match, $sort, $skip, $limit) selalu sebelum $lookup
+# pertama, dan template bersama (repositories/pipelines.py) tidak bisa diubah. Tanpa MongoDB:
+# aggregate ditangkap koleksi palsu.
+from datetime import datetime
+from bson import ObjectId
+import pytest
+
+FILTER_STAGES = {"$match", "$sort", "$skip", "$limit"}
+
+
+class CaptureCollection:
+    name = "capture"
+
+    def __init__(self):
+        self.pipelines = []
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        return iter([])
+
+    aggregate_raw_batches = aggregate
+
+
+def _assert_filters_first(pipeline):
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert "$lookup" in stages, stages
+    first_lookup = stages.index("$lookup")
+    assert stages[0] in FILTER_STAGES, stages
+    late = [s for s in stages[first_lookup:] if s in FILTER_STAGES]
+    assert not late, f"{late} sesudah $lookup: {stages}"
+
+
+@pytest.fixture
+def captured(monkeypatch):
+    from repositories import mongo
+    from utils import archive
+    collection = CaptureCollection()
+    for name in ("bookings_col", "bookings_archive", "reviews_col", "schedules_col"):
+        monkeypatch.setattr(mongo, name, collection)
+    # Archive tidak kosong → source booking ikut $unionWith
+    monkeypatch.setattr(archive, "archive_watermark", lambda: datetime(2025, 1, 1))
+    return collection.pipelines
+
+
+def test_repository_pipelines_filter_before_lookup(captured):
+    from repositories import mongo
+    oid = ObjectId()
+    mongo.bookings.list_for_user(oid)
+    mongo.bookings.list_detailed(datetime(2024, 1, 1), datetime(2024, 2, 1))
+    mongo.bookings.get_detailed(oid)
+    mongo.bookings.get_review_context(oid)
+    mongo.reviews.list_detailed()
+    mongo.reviews.list_detailed(oid)
+    mongo.schedules.search("jakarta", "bandung", "bus", None, None, 100, 500, "price", descending=True)
+    mongo.schedules.get_with_company(oid)
+
+    assert len(captured) == 9   # get_detailed: bookings + bookings_archive
+    for pipeline in captured:
+        _assert_filters_first(pipeline)
+
+
+def test_review_search_pipeline_filter_before_lookup():
+    from utils.review_search import search_pipeline
+    pipeline = search_pipeline("nyaman", ObjectId(), 3, 5, skip=20, limit=20)
+    _assert_filters_first(pipeline)
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages[:5] == ["$match", "$addFields", "$sort", "$skip", "$limit"]
+
+
+def test_templates_are_immutable():
+    from repositories import pipelines
+    with pytest.raises(TypeError):
+        pipelines.JOIN_BOOKING_USER[0]["$lookup"]["from"] = "bookings"
+    with pytest.raises(TypeError):
+        pipelines.PROJECT_REVIEW["$project"]["comment"] = 0
+    with pytest.raises(TypeError):
+        pipelines.REVIEW_CONTEXT[-1]["$project"]["user.name"] = 0
+    with pytest.raises(TypeError):
+        pipelines.REVIEW_CONTEXT[-1]["$project"].update({"user.email": 1})
+    # List di dalam template (argumen operator) ikut beku
+    with pytest.raises(TypeError):
+        pipelines.PROJECT_BOOKING["$project"]["status_review"]["$ifNull"][1] = "done"
+
+    # Builder mengembalikan list baru; stage template dipakai ulang apa adanya
+    first = pipelines.review_pipeline({"rating": 5})
+    second = pipelines.review_pipeline({"rating": 1})
+    assert first is not second
+    assert first[-1] is second[-1] is pipelines.PROJECT_REVIEW
@@ -0,0 +1,51 @@
+# tests/test_review_commands.py
+# Jumlah command MongoDB per review baru: satu aggregate ($lookup booking → jadwal → company → user)
+# + satu batch tulis (review + outbox). Efek samping lain jalan di worker outbox, bukan di request.
+from datetime import datetime
+from fastapi.testclient import TestClient
+
+
+def _completed_booking(db):
+    user_id = db.users.insert_one({"name": "Budi", "email": "budi@test.local", "role": "customer"}).inserted_id
+    company_id = db.companies.insert_one({"name": "Sinar Jaya", "type": "bus"}).inserted_id
+    schedule_id = db.schedules.insert_one({
+        "company_id": company_id, "origin": "Jakarta", "destination": "Bandung",
+        "price": 100_000, "available_seats": 10, "type": "bus", "departure_date": datetime(2026, 1, 1)
+    }).inserted_id
+    return db.bookings.insert_one({
+        "user_id": user_id, "schedule_id": schedule_id, "status": "completed", "status_review": "pending",
+        "passenger_count": 1, "total_price": 100_000, "booking_date": datetime.utcnow()
+    }).inserted_id
+
+
+def test_create_review_commands(mongo, commands):
+    from utils import ratings
+    import main
+    ratings.ensure_indexes()
+    booking_id = _completed_booking(mongo)
+
+    # Tanpa `with` → lifespan (worker outbox, cache bus) tidak jalan, yang tercatat hanya command request
+    client = TestClient(main.app)
+    commands.clear()
+    response = client.post("/api/reviews/", json={"booking_id": str(booking_id), "rating": 5, "comment": "nyaman"})
+
+    assert response.status_code == 200
+    # MongoDB 8.0+: review + outbox dalam satu bulkWrite; server lama: dua insert
+    assert commands in (["aggregate", "bulkWrite"], ["aggregate", "insert", "insert"])
+    review = mongo.reviews.find_one({"booking_id": booking_id})
+    assert review["rating_pending"] is True
+    assert mongo.outbox.count_documents({"payload.review_id": review["_id"]}) == 1
+
+
+def test_duplicate_review_skips_outbox(mongo, commands):
+    from utils import ratings
+    import main
+    ratings.ensure_indexes()
+    booking_id = _completed_booking(mongo)
+    client = TestClient(main.app)
+    client.post("/api/reviews/", json={"booking_id": str(booking_id), "rating": 4})
+    # Lolos cek status_review (outbox belum jalan) → ditolak unique index, outbox tidak ikut ditulis
+    response = client.post("/api/reviews/", json={"booking_id": str(booking_id), "rating": 4})
+
+    assert response.status_code == 400
+    assert mongo.outbox.count_documents({"payload.booking_id": booking_id}) == 1
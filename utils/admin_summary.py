@@ -0,0 +1,108 @@
+# utils/admin_summary.py
+# Ringkasan dashboard admin: satu pipeline $facet per koleksi, hasilnya di-cache beberapa detik.
+from database import bookings, bookings_archive, reviews, users, companies, schedules
+from repositories.pipelines import JOIN_BOOKING_USER, JOIN_REVIEW_USER, JOIN_REVIEW_COMPANY
+from datetime import datetime
+import time
+
+SUMMARY_TTL_SECONDS = 5
+RECENT_LIMIT = 10
+
+_cached = {"value": None, "expires_at": 0.0}
+
+
+def _booking_facets() -> dict:
+    pipeline = [{"$facet": {
+        "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+        "revenue": [
+            {"$match": {"status": {"$ne": "cancelled"}}},
+            {"$group": {"_id": None, "total": {"$sum": "$total_price"}, "passengers": {"$sum": "$passenger_count"}}}
+        ],
+        "recent": [
+            {"$sort": {"booking_date": -1}},
+            {"$limit": RECENT_LIMIT},
+            *JOIN_BOOKING_USER,
+            {"$project": {
+                "_id": {"$toString": "$_id"},
+                "booking_code": 1,
+                "status": 1,
+                "total_price": 1,
+                "passenger_name": 1,
+                "booking_date": 1,
+                "user_name": {"$ifNull": ["$user_info.name", "Anonymous"]}
+            }}
+        ]
+    }}]
+    facets = next(bookings.aggregate(pipeline))
+    revenue = facets["revenue"][0] if facets["revenue"] else {}
+    by_status = {row["_id"] or "unknown": row["count"] for row in facets["by_status"]}
+    return {
+        "total": sum(by_status.values()),
+        "archived": bookings_archive.estimated_document_count(),
+        "by_status": by_status,
+        "revenue": revenue.get("total", 0),
+        "passengers": revenue.get("passengers", 0),
+        "recent": facets["recent"]
+    }
+
+
+def _review_facets() -> dict:
+    pipeline = [{"$facet": {
+        "by_rating": [{"$group": {"_id": "$rating", "count": {"$sum": 1}}}],
+        "average": [{"$group": {"_id": None, "avg": {"$avg": "$rating"}}}],
+        "recent": [
+            {"$sort": {"created_at": -1}},
+            {"$limit": RECENT_LIMIT},
+            *JOIN_REVIEW_USER,
+            *JOIN_REVIEW_COMPANY,
+            {"$project": {
+                "_id": 0,
+                "id": {"$toString": "$_id"},
+                "rating": 1,
+                "comment": 1,
+                "created_at": 1,
+                "user_name": {"$ifNull": ["$user_info.name", "Anonymous"]},
+                "company_name": "$company_info.name"
+            }}
+        ]
+    }}]
+    facets = next(reviews.aggregate(pipeline))
+    by_rating = {str(row["_id"]): row["count"] for row in facets["by_rating"]}
+    average = facets["average"][0].get("avg") if facets["average"] else None
+    return {
+        "total": sum(by_rating.values()),
+        "average": round(average, 2) if average is not None else 0.0,
+        "by_rating": by_rating,
+        "recent": facets["recent"]
+    }
+
+
+def _user_counts() -> dict:
+    by_role = {row["_id"] or "customer": row["count"]
+               for row in users.aggregate([{"$group": {"_id": "$role", "count": {"$sum": 1}}}])}
+    return {"total": sum(by_role.values()), "by_role": by_role}
+
+
+def _schedule_counts() -> dict:
+    pipeline = [{"$facet": {
+        "total": [{"$count": "n"}],
+        "upcoming": [{"$match": {"departure_date": {"$gte": datetime.utcnow()}}}, {"$count": "n"}],
+        "sold_out": [{"$match": {"available_seats": {"$lte": 0}}}, {"$count": "n"}]
+    }}]
+    facets = next(schedules.aggregate(pipeline))
+    return {k: (v[0]["n"] if v else 0) for k, v in facets.items()}
+
+
+def get_summary() -> dict:
+    now = time.monotonic()
+    if _cached["value"] is None or _cached["expires_at"] <= now:
+        _cached["value"] = {
+            "generated_at": datetime.utcnow(),
+            "bookings": _booking_facets(),
+            "reviews": _review_facets(),
+            "users": _user_counts(),
+            "schedules": _schedule_counts(),
+            "companies": {"total": companies.estimated_document_count()}
+        }
+        _cached["expires_at"] = now + SUMMARY_TTL_SECONDS
+    return _cached["value"]
@@ -0,0 +1,161 @@
+# utils/analytics.py
+# Rollup harian (per jadwal per hari) untuk laporan admin.
+# Dokumen di koleksi daily_stats di-update secara incremental setiap kali booking ditulis,
+# jadi laporan revenue/okupansi tidak perlu scan koleksi bookings.
+# Update dari worker outbox membawa event_id; id event terakhir disimpan per dokumen rollup
+# (applied_events) supaya retry event yang sama tidak menambah $inc dua kali.
+from database import daily_stats, bookings, bookings_archive, schedules
+from pymongo import UpdateOne, ASCENDING
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+
+BACKFILL_BATCH_SIZE = 1000
+# Retry outbox terjadi dalam hitungan menit (backoff maks ~4 menit), jendela ini cukup
+APPLIED_EVENTS_KEPT = 200
+
+
+def _day(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, dt.day)
+
+
+def ensure_indexes(collection=daily_stats):
+    collection.create_index([("day", ASCENDING), ("schedule_id", ASCENDING)], unique=True)
+    collection.create_index([("company_id", ASCENDING), ("day", ASCENDING)])
+    collection.create_index([("origin", ASCENDING), ("destination", ASCENDING), ("day", ASCENDING)])
+
+
+def _rollup_update(sched: dict, inc: dict) -> dict:
+    return {
+        "$inc": inc,
+        "$setOnInsert": {
+            "company_id": sched.get("company_id"),
+            "origin": sched.get("origin"),
+            "destination": sched.get("destination"),
+        },
+    }
+
+
+def _apply(booking: dict, sched: dict, inc: dict, event_id):
+    if not sched:
+        return
+    key = {"day": _day(booking["booking_date"]), "schedule_id": sched["_id"]}
+    update = _rollup_update(sched, inc)
+    update["$push"] = {"applied_events": {"$each": [event_id], "$slice": -APPLIED_EVENTS_KEPT}}
+    for _ in range(2):
+        try:
+            # Dokumen yang sudah memuat event ini tidak cocok → upsert bentrok unique index (day, schedule_id)
+            daily_stats.update_one({**key, "applied_events": {"$ne": event_id}}, update, upsert=True)
+            return
+        except DuplicateKeyError:
+            # Sudah diterapkan, atau dua event pertama untuk dokumen ini saling balapan upsert → ulangi
+            if daily_stats.find_one({**key, "applied_events": event_id}, {"_id": 1}):
+                return
+
+
+# === HOOK: dipanggil dari worker outbox (routes/booking.py) ===
+def record_booking_event(event_id, booking: dict, sched: dict, created=False,
+                         passenger_delta=0, revenue_delta=0, cancelled=False):
+    """Semua perubahan rollup dari satu event digabung jadi satu $inc, diterapkan sekali per event_id."""
+    inc = {"bookings": 0, "passengers": passenger_delta, "revenue": revenue_delta, "cancellations": 0}
+    if created:
+        inc["bookings"] += 1
+        inc["passengers"] += booking["passenger_count"]
+        inc["revenue"] += booking["total_price"]
+    if cancelled:
+        # Booking batal: passengers & revenue jadi net (dikurangi), bookings tetap dihitung.
+        # Booking cancelled tidak pernah dihapus (routes/booking.py _cancel), jadi _rebuild_from()
+        # melihatnya dengan status "cancelled" dan menghasilkan angka yang sama.
+        inc["cancellations"] += 1
+        inc["passengers"] -= booking["passenger_count"]
+        inc["revenue"] -= booking.get("total_price", 0)
+    inc = {k: v for k, v in inc.items() if v}
+    if inc:
+        _apply(booking, sched, inc, event_id)
+
+
+# === QUERY: dijawab langsung dari rollup ===
+def query_rollups(start: datetime, end: datetime, group_by: str, match: dict = None) -> list:
+    group_keys = {
+        "day": {"day": "$day"},
+        "company": {"company_id": "$company_id"},
+        "route": {"origin": "$origin", "destination": "$destination"},
+        "schedule": {"schedule_id": "$schedule_id"},
+    }
+    pipeline = [
+        {"$match": {"day": {"$gte": _day(start), "$lte": _day(end)}, **(match or {})}},
+        {"$group": {
+            "_id": group_keys[group_by],
+            "bookings": {"$sum": "$bookings"},
+            "passengers": {"$sum": "$passengers"},
+            "revenue": {"$sum": "$revenue"},
+            "cancellations": {"$sum": "$cancellations"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    result = []
+    for row in daily_stats.aggregate(pipeline):
+        key = row.pop("_id")
+        for k, v in key.items():
+            row[k] = str(v) if k.endswith("_id") and v is not None else v
+        result.append(row)
+    return result
+
+
+# === BACKFILL: bangun ulang seluruh rollup dari histori bookings ===
+def rebuild_rollups(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    # Dibangun di koleksi sementara lalu ditukar (renameCollection dropTarget): laporan tetap membaca
+    # rollup lama yang utuh selama rebuild, bukan koleksi kosong yang terisi setengah, dan $inc dari
+    # worker outbox selama rebuild tidak bercampur dengan hasil scan.
+    target = daily_stats.database[f"{daily_stats.name}_rebuild"]
+    target.drop()
+    ensure_indexes(target)
+
+    processed = 0
+    sched_cache = {}
+    # Booking yang sudah di-archive tetap ikut dihitung
+    for source in (bookings, bookings_archive):
+        processed += _rebuild_from(source, target, batch_size, sched_cache)
+    target.rename(daily_stats.name, dropTarget=True)
+    return processed
+
+
+def _rebuild_from(source, target, batch_size: int, sched_cache: dict) -> int:
+    processed = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        batch = list(source.find(query).sort("_id", ASCENDING).limit(batch_size))
+        if not batch:
+            break
+
+        missing = {b["schedule_id"] for b in batch if b["schedule_id"] not in sched_cache}
+        if missing:
+            for s in schedules.find({"_id": {"$in": list(missing)}},
+                                    {"company_id": 1, "origin": 1, "destination": 1}):
+                sched_cache[s["_id"]] = s
+
+        # Gabungkan dulu per (hari, jadwal) supaya satu batch = sedikit operasi tulis
+        acc = {}
+        for b in batch:
+            sched = sched_cache.get(b["schedule_id"])
+            if not sched:
+                continue
+            key = (_day(b["booking_date"]), b["schedule_id"])
+            inc = acc.setdefault(key, {"bookings": 0, "passengers": 0, "revenue": 0, "cancellations": 0})
+            inc["bookings"] += 1
+            if b.get("status") == "cancelled":
+                inc["cancellations"] += 1
+            else:
+                inc["passengers"] += b["passenger_count"]
+                inc["revenue"] += b.get("total_price", 0)
+
+        ops = [
+            UpdateOne({"day": day, "schedule_id": sid}, _rollup_update(sched_cache[sid], inc), upsert=True)
+            for (day, sid), inc in acc.items()
+        ]
+        if ops:
+            target.bulk_write(ops, ordered=False)
+
+        processed += len(batch)
+        last_id = batch[-1]["_id"]
+    return processed
@@ -0,0 +1,88 @@
+# utils/archive.py
+# Booking lama yang sudah selesai/batal dipindah dari bookings ke bookings_archive,
+# supaya working set koleksi bookings tetap kecil. Endpoint baca hanya ikut membaca
+# archive ($unionWith) kalau rentang tanggal yang diminta memang menyentuh data archive.
+from database import bookings, bookings_archive
+from utils import cache_bus
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timedelta
+import os
+import time
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("BOOKING_ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVABLE_STATUS = ["completed", "cancelled"]
+WATERMARK_TTL_SECONDS = 60
+
+# (booking_date terbaru di archive, expires_at)
+_watermark = {"value": None, "expires_at": 0.0}
+
+
+def ensure_indexes():
+    bookings.create_index([("status", ASCENDING), ("booking_date", ASCENDING)])
+    bookings.create_index([("user_id", ASCENDING)])
+    bookings_archive.create_index([("booking_date", ASCENDING)])
+    bookings_archive.create_index([("user_id", ASCENDING)])
+    bookings_archive.create_index([("schedule_id", ASCENDING)])
+
+
+def _invalidate_watermark(_key=None):
+    _watermark["expires_at"] = 0.0
+
+
+cache_bus.subscribe("bookings_archive", _invalidate_watermark)
+
+
+def archive_watermark():
+    """booking_date terbaru yang ada di archive (None jika archive kosong)."""
+    now = time.monotonic()
+    if _watermark["expires_at"] <= now:
+        newest = bookings_archive.find_one({}, {"booking_date": 1}, sort=[("booking_date", DESCENDING)])
+        _watermark["value"] = newest["booking_date"] if newest else None
+        _watermark["expires_at"] = now + WATERMARK_TTL_SECONDS
+    return _watermark["value"]
+
+
+def needs_archive(start: datetime = None) -> bool:
+    watermark = archive_watermark()
+    return watermark is not None and (start is None or start <= watermark)
+
+
+def date_match(start: datetime = None, end: datetime = None) -> dict:
+    match = {}
+    if start is not None:
+        match["$gte"] = start
+    if end is not None:
+        match["$lte"] = end
+    return {"booking_date": match} if match else {}
+
+
+def booking_source(match: dict, start: datetime = None) -> list:
+    # Stage awal pipeline: booking aktif + (jika perlu) booking di archive dengan filter yang sama
+    stages = [{"$match": match}]
+    if needs_archive(start):
+        stages.append({"$unionWith": {"coll": bookings_archive.name, "pipeline": [{"$match": match}]}})
+    return stages
+
+
+def archive_bookings(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    query = {"status": {"$in": ARCHIVABLE_STATUS}, "booking_date": {"$lt": cutoff}}
+    moved = 0
+    while True:
+        batch = list(bookings.find(query).sort("_id", ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        # Insert dulu baru hapus; kalau job mati di tengah, rerun aman (duplikat diabaikan)
+        try:
+            bookings_archive.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            if any(err["code"] != 11000 for err in e.details["writeErrors"]):
+                raise
+        bookings.delete_many({"_id": {"$in": [b["_id"] for b in batch]}})
+        moved += len(batch)
+
+    if moved:
+        cache_bus.publish("bookings_archive")
+    return moved
@@ -0,0 +1,68 @@
+# utils/audit.py
+# Jejak audit semua mutasi admin. Handler request hanya memasukkan event ke antrian in-process
+# (tanpa round-trip DB); utils/batch_writer.py menulisnya ke koleksi audit_log per batch
+# (BATCH_SIZE / FLUSH_SECONDS). Antrian penuh → event dibuang dan dihitung di stats().
+# Retensi lewat TTL index pada ts (AUDIT_RETENTION_DAYS).
+from database import audit_log, MONGO_ENABLED
+from pymongo import ASCENDING, DESCENDING
+from utils.batch_writer import BatchWriter
+from datetime import datetime
+import os
+
+QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "180"))
+QUERY_MAX_LIMIT = 500
+
+_writer = BatchWriter(audit_log, "audit", QUEUE_MAX, BATCH_SIZE, FLUSH_SECONDS)
+
+
+def ensure_indexes():
+    audit_log.create_index([("ts", ASCENDING)], expireAfterSeconds=RETENTION_DAYS * 86400)
+    audit_log.create_index([("actor_id", ASCENDING), ("ts", DESCENDING)])
+    audit_log.create_index([("entity", ASCENDING), ("entity_id", ASCENDING), ("ts", DESCENDING)])
+
+
+def record(actor: dict, action: str, entity: str, entity_id=None, **details):
+    """Catat mutasi admin (tidak pernah blocking). actor = dokumen user dari get_current_user_admin."""
+    if not MONGO_ENABLED:
+        # Backend memory: writer tidak dijalankan lifespan, event tidak ada tujuannya
+        return
+    event = {
+        "ts": datetime.utcnow(),
+        "actor_id": actor.get("_id"),
+        "actor_email": actor.get("email"),
+        "action": action,
+        "entity": entity,
+        "entity_id": str(entity_id) if entity_id is not None else None,
+        "details": details
+    }
+    _writer.put(event)
+
+
+def start():
+    """Jalankan flusher di background thread; return fungsi untuk menghentikannya."""
+    return _writer.start()
+
+
+def query(actor_id=None, entity: str = None, entity_id: str = None,
+          start: datetime = None, end: datetime = None, limit: int = 100) -> list:
+    filters = {}
+    if actor_id is not None:
+        filters["actor_id"] = actor_id
+    if entity:
+        filters["entity"] = entity
+    if entity_id:
+        filters["entity_id"] = entity_id
+    if start is not None or end is not None:
+        filters["ts"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v is not None}
+    cursor = audit_log.find(filters).sort("ts", DESCENDING).limit(min(limit, QUERY_MAX_LIMIT))
+    return [
+        {**doc, "_id": str(doc["_id"]), "actor_id": str(doc["actor_id"]) if doc.get("actor_id") else None}
+        for doc in cursor
+    ]
+
+
+def stats() -> dict:
+    return _writer.stats()
@@ -1,8 +1,16 @@
 # utils/auth.py
 from fastapi import Header, HTTPException
-from database import users
+import repositories as repo
+from database import MONGO_ENABLED
+from utils.rate_limit import remember_authenticated
 from bson import ObjectId
 
+def require_mongo():
+    # Dependency untuk endpoint yang langsung memakai koleksi MongoDB (rollup, text search, $facet,
+    # audit) dan tidak punya padanan di backend memory → 503, bukan 500
+    if not MONGO_ENABLED:
+        raise HTTPException(503, "Fitur ini butuh MongoDB (REPOSITORY_BACKEND=memory)")
+
 def get_current_user_admin(
     x_user_id: str = Header(None, alias="X-User-ID"),
     x_user_role: str = Header(None, alias="X-User-Role")
@@ -16,9 +24,10 @@ def get_current_user_admin(
     # Validasi user benar-benar ada dan role admin
     try:
         user_obj_id = ObjectId(x_user_id)
-        user = users.find_one({"_id": user_obj_id})
+        user = repo.users.get(user_obj_id)
         if not user or user.get("role") != "admin":
             raise HTTPException(403, "Admin tidak valid")
+        remember_authenticated(x_user_id)
         return user
     except ValueError:
         raise HTTPException(400, "X-User-ID tidak valid (harus ObjectId hex)")
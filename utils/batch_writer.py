@@ -0,0 +1,78 @@
+# utils/batch_writer.py
+# Penulis batch in-process untuk data append-only (audit log, riwayat okupansi). put() hanya
+# memasukkan dokumen ke antrian terbatas, tidak pernah menunggu DB; satu thread background
+# menulisnya dengan insert_many begitu batch penuh atau flush_seconds berlalu.
+# Antrian penuh (DB lambat/mati) atau batch gagal → dokumen dibuang dan dihitung di stats().
+from pymongo.errors import PyMongoError
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    def __init__(self, collection, name: str, queue_max: int, batch_size: int, flush_seconds: float):
+        self.collection = collection
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=queue_max)
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "dropped_full": 0, "dropped_error": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def put(self, doc: dict) -> bool:
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            self._count("dropped_full")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _flush(self, batch: list):
+        try:
+            self.collection.insert_many(batch, ordered=False)
+        except PyMongoError:
+            logger.exception("Gagal menulis %d dokumen %s", len(batch), self.name)
+            self._count("dropped_error", len(batch))
+            return
+        with self._stats_lock:
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+
+    def _run(self, stop: threading.Event):
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while not (stop.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_seconds
+        if batch:
+            self._flush(batch)
+
+    def start(self):
+        """Jalankan flusher di background thread; return fungsi untuk menghentikannya (sisa antrian di-flush)."""
+        stop = threading.Event()
+        thread = threading.Thread(target=self._run, args=(stop,), name=f"{self.name}-writer", daemon=True)
+        thread.start()
+
+        def shutdown():
+            stop.set()
+            thread.join(timeout=self.flush_seconds + 5)
+        return shutdown
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {**self._stats, "queued": self._queue.qsize(), "queue_max": self._queue.maxsize}
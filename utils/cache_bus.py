@@ -0,0 +1,117 @@
+# utils/cache_bus.py
+# Bus invalidasi cache antar worker. Setiap publish ditulis ke capped collection
+# cache_invalidations; setiap worker men-tail koleksi itu (tailable cursor) dan menjalankan
+# handler lokal, jadi cache in-process (company/schedule, dll) tetap koheren di semua worker.
+# Handler untuk publish dari worker sendiri dijalankan di thread dispatcher (berurutan), bukan di
+# request yang mem-publish: schedule_bulk memuat ulang seluruh snapshot jadwal.
+from database import db, cache_invalidations, MONGO_ENABLED
+from pymongo import CursorType
+from pymongo.errors import PyMongoError, CollectionInvalid
+from bson import ObjectId
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import os
+import socket
+import threading
+
+BUS_SIZE_BYTES = 1024 * 1024
+AWAIT_MS = 500
+
+logger = logging.getLogger(__name__)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{ObjectId()}"
+
+# topic -> [handler(key)]
+_handlers = defaultdict(list)
+# Satu thread → handler lokal jalan berurutan sesuai urutan publish
+_local = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-bus-local")
+_collection_ready = False
+
+
+def ensure_collection():
+    global _collection_ready
+    try:
+        db.create_collection("cache_invalidations", capped=True, size=BUS_SIZE_BYTES)
+        # Tailable cursor butuh minimal satu dokumen supaya tidak langsung mati
+        cache_invalidations.insert_one({"topic": "_init", "origin": WORKER_ID, "ts": datetime.utcnow()})
+    except CollectionInvalid:
+        pass
+    _collection_ready = True
+
+
+def subscribe(topic: str, handler):
+    _handlers[topic].append(handler)
+
+
+def _dispatch(topic: str, key):
+    for handler in _handlers.get(topic, []):
+        try:
+            handler(key)
+        except Exception:
+            logger.exception("Handler invalidasi %s gagal", topic)
+
+
+def publish(topic: str, key=None):
+    # Worker sendiri lewat thread dispatcher lokal; worker lain lewat tailer
+    _local.submit(_dispatch, topic, key)
+    if not MONGO_ENABLED:
+        # Backend memory = satu proses, tidak ada worker lain yang perlu diberi tahu
+        return
+    try:
+        # Script (import jadwal, archive) bisa publish tanpa lifespan aplikasi: koleksi biasa
+        # hasil insert otomatis tidak bisa di-tail, jadi capped collection dibuat dulu
+        if not _collection_ready:
+            ensure_collection()
+        cache_invalidations.insert_one({
+            "topic": topic,
+            "key": key,
+            "origin": WORKER_ID,
+            "ts": datetime.utcnow()
+        })
+    except PyMongoError:
+        logger.exception("Gagal publish invalidasi %s", topic)
+
+
+def _tail(stop: threading.Event):
+    # Posisi dilacak lewat urutan natural (urutan insert capped collection), bukan _id: ObjectId
+    # dari proses/host berbeda tidak terurut sesuai waktu insert.
+    last = cache_invalidations.find_one(sort=[("$natural", -1)], projection={"_id": 1})
+    last_id = last["_id"] if last else None
+    while not stop.is_set():
+        try:
+            # Dokumen terakhir yang diproses sudah tertimpa (capped penuh) → proses dari awal koleksi;
+            # invalidasi dobel tidak berbahaya, yang terlewat yang berbahaya
+            if last_id is not None and not cache_invalidations.find_one({"_id": last_id}, {"_id": 1}):
+                last_id = None
+            caught_up = last_id is None
+            cursor = cache_invalidations.find(
+                cursor_type=CursorType.TAILABLE_AWAIT
+            ).max_await_time_ms(AWAIT_MS)
+            while cursor.alive and not stop.is_set():
+                doc = cursor.try_next()
+                if doc is None:
+                    continue
+                if not caught_up:
+                    # Lewati sampai posisi terakhir; kalau posisi itu tertimpa selama dilewati,
+                    # cursor mati (CappedPositionLost) dan loop luar mulai ulang
+                    caught_up = doc["_id"] == last_id
+                    continue
+                last_id = doc["_id"]
+                if doc.get("origin") != WORKER_ID:
+                    _dispatch(doc["topic"], doc.get("key"))
+        except PyMongoError:
+            logger.exception("Tailer cache_invalidations error, mencoba lagi")
+        stop.wait(1)
+
+
+def start():
+    """Jalankan tailer di background thread; return fungsi untuk menghentikannya."""
+    stop = threading.Event()
+    thread = threading.Thread(target=_tail, args=(stop,), name="cache-bus", daemon=True)
+    thread.start()
+
+    def shutdown():
+        stop.set()
+        thread.join(timeout=AWAIT_MS / 1000 * 2)
+    return shutdown
@@ -0,0 +1,159 @@
+# utils/circuit_breaker.py
+# Circuit breaker di depan MongoDB. Setiap command dicatat lewat CommandListener pymongo
+# (didaftarkan di database.py); kalau di jendela command terakhir terlalu banyak yang gagal
+# karena jaringan/timeout atau lebih lambat dari SLOW_CALL_MS, breaker "open":
+# - GET endpoint publik (PUBLIC_READ_PATHS) dilayani dari response sukses terakhir + header stale,
+# - request /api lain langsung 503 (fail fast) tanpa menunggu timeout driver,
+# - thread probe mem-ping server berkala dan menutup breaker lagi begitu ping sukses & cepat.
+from fastapi.responses import JSONResponse, Response
+from pymongo import monitoring
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, ServerSelectionTimeoutError
+from collections import OrderedDict, deque
+import logging
+import os
+import threading
+import time
+
+SLOW_CALL_MS = float(os.getenv("CIRCUIT_SLOW_CALL_MS", "1000"))
+WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+FAILURE_RATIO = float(os.getenv("CIRCUIT_FAILURE_RATIO", "0.5"))
+PROBE_INTERVAL_SECONDS = float(os.getenv("CIRCUIT_PROBE_INTERVAL_SECONDS", "2"))
+STALE_MAX_ENTRIES = 500
+
+# Response terakhir yang sukses disimpan per path+query, hanya untuk endpoint ini
+PUBLIC_READ_PATHS = {"/api/schedules/", "/api/schedules/popular", "/api/companies/"}
+
+# Command yang memang menunggu lama (tailable await cache_bus) / dipakai monitoring → tidak dihitung
+IGNORED_COMMANDS = {"getMore", "ping", "hello", "isMaster", "ismaster", "endSessions"}
+# Error server yang berarti server tidak sehat (bukan error query seperti duplicate key)
+UNHEALTHY_CODES = {50, 89, 91, 189, 262, 10107, 11600, 11602, 13435, 13436}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_outcomes = deque(maxlen=WINDOW_SIZE)   # True = sukses & cepat
+_state = {"open": False, "opened_at": 0.0}
+_stale = OrderedDict()                  # key -> (stored_at, body, media_type)
+
+
+def record(ok: bool):
+    """Catat hasil satu operasi DB; buka breaker kalau rasio gagal di jendela terlampaui."""
+    with _lock:
+        if _state["open"]:
+            return
+        _outcomes.append(ok)
+        failures = _outcomes.count(False)
+        if len(_outcomes) < MIN_CALLS or failures < FAILURE_RATIO * len(_outcomes):
+            return
+        _state["open"] = True
+        _state["opened_at"] = time.monotonic()
+        _outcomes.clear()
+    logger.warning("Circuit breaker MongoDB open (%d/%d command gagal/lambat)", failures, WINDOW_SIZE)
+    threading.Thread(target=_probe, name="circuit-probe", daemon=True).start()
+
+
+def _close():
+    with _lock:
+        _state["open"] = False
+        _outcomes.clear()
+    logger.warning("Circuit breaker MongoDB closed setelah %.1f detik",
+                   time.monotonic() - _state["opened_at"])
+
+
+def _probe():
+    # Import di sini: database.py mengimpor modul ini untuk mendaftarkan listener
+    from database import client
+    while _state["open"]:
+        time.sleep(PROBE_INTERVAL_SECONDS)
+        started = time.perf_counter()
+        try:
+            client.admin.command("ping")
+        except ConnectionFailure:
+            continue
+        except Exception:
+            # Error lain (auth, server, bug) tidak boleh mematikan thread probe: breaker akan
+            # terbuka selamanya karena tidak ada yang menutupnya lagi
+            logger.exception("Probe circuit breaker gagal")
+            continue
+        if (time.perf_counter() - started) * 1000 <= SLOW_CALL_MS:
+            _close()
+
+
+class CommandListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            record(event.duration_micros / 1000 <= SLOW_CALL_MS)
+
+    def failed(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        failure = event.failure or {}
+        # Error jaringan dari driver punya "errtype"; error server dinilai dari kodenya
+        if "errtype" in failure or failure.get("code") in UNHEALTHY_CODES:
+            record(False)
+        else:
+            record(event.duration_micros / 1000 <= SLOW_CALL_MS)
+
+
+def _stale_key(request) -> str:
+    return f"{request.url.path}?{request.url.query}"
+
+
+def _store(key: str, body: bytes, media_type: str):
+    with _lock:
+        _stale.pop(key, None)
+        _stale[key] = (time.monotonic(), body, media_type)
+        while len(_stale) > STALE_MAX_ENTRIES:
+            _stale.popitem(last=False)
+
+
+def _serve_stale(key: str):
+    entry = _stale.get(key)
+    if entry is None:
+        return _unavailable()
+    stored_at, body, media_type = entry
+    return Response(body, media_type=media_type, headers={
+        "Age": str(int(time.monotonic() - stored_at)),
+        "Warning": '110 - "Response is Stale"',
+        "Cache-Control": "no-store"
+    })
+
+
+def _unavailable():
+    return JSONResponse(
+        {"detail": "Database sedang bermasalah, coba lagi sebentar"},
+        status_code=503,
+        headers={"Retry-After": str(max(1, round(PROBE_INTERVAL_SECONDS)))}
+    )
+
+
+async def circuit_breaker_middleware(request, call_next):
+    path = request.url.path
+    if not path.startswith("/api/"):
+        return await call_next(request)
+
+    cacheable = request.method == "GET" and path in PUBLIC_READ_PATHS
+    if _state["open"]:
+        return _serve_stale(_stale_key(request)) if cacheable else _unavailable()
+
+    try:
+        response = await call_next(request)
+    except (ConnectionFailure, ExecutionTimeout) as exc:
+        # Server selection timeout tidak lewat CommandListener → dicatat di sini
+        if isinstance(exc, ServerSelectionTimeoutError):
+            record(False)
+        if cacheable:
+            return _serve_stale(_stale_key(request))
+        raise
+    if not cacheable or response.status_code != 200:
+        return response
+
+    # Body dibaca penuh supaya bisa disimpan sebagai cadangan saat breaker open
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    _store(_stale_key(request), body, response.headers.get("content-type"))
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return Response(body, status_code=200, headers=headers, background=response.background)
@@ -0,0 +1,51 @@
+# utils/company_stats.py
+# Cache in-process statistik rating perusahaan (rata-rata, jumlah, histogram) untuk
+# ditempel ke kartu jadwal. Satu halaman hasil = satu query $in untuk company yang belum di-cache.
+from database import companies, MONGO_ENABLED
+from utils import cache_bus
+from bson import ObjectId
+import time
+
+STATS_TTL_SECONDS = 300
+
+# company_id (str) -> (stats, expires_at)
+_cache = {}
+
+_PROJECTION = {"cached_rating": 1, "cached_total_reviews": 1, "rating_counts": 1}
+
+
+def _stats(doc: dict) -> dict:
+    counts = doc.get("rating_counts") or {}
+    return {
+        "average": doc.get("cached_rating") or 0.0,
+        "count": doc.get("cached_total_reviews") or 0,
+        "histogram": {str(r): counts.get(str(r), 0) for r in range(1, 6)}
+    }
+
+
+def get_many(company_ids) -> dict:
+    now = time.monotonic()
+    result = {}
+    missing = []
+    for cid in set(company_ids):
+        entry = _cache.get(cid)
+        if entry and entry[1] > now:
+            result[cid] = entry[0]
+        elif ObjectId.is_valid(cid):
+            missing.append(ObjectId(cid))
+
+    # Backend memory: cached rating hanya ada di koleksi MongoDB → kartu jadwal tanpa rating
+    if missing and MONGO_ENABLED:
+        for doc in companies.find({"_id": {"$in": missing}}, _PROJECTION):
+            stats = _stats(doc)
+            _cache[str(doc["_id"])] = (stats, now + STATS_TTL_SECONDS)
+            result[str(doc["_id"])] = stats
+    return result
+
+
+def invalidate(company_id: str):
+    _cache.pop(company_id, None)
+
+
+cache_bus.subscribe("company", invalidate)
+cache_bus.subscribe("company_rating", invalidate)
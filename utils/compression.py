@@ -0,0 +1,93 @@
+# utils/compression.py
+# Negosiasi Accept-Encoding (dengan q-value, RFC 9110 §12.5.3) + kompresi response API.
+# CompressionMiddleware = GZipMiddleware Starlette yang juga bisa brotli: encoding dipilih dari
+# q-value client ("br;q=0" berarti brotli ditolak), bukan sekadar substring di header.
+# Brotli opsional (paket `brotli`); tanpa itu response API tetap gzip seperti sebelumnya.
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+import anyio.to_thread
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Kualitas 4: rasio sudah di atas gzip-6 untuk JSON, CPU masih setara (11 hanya untuk aset build)
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+
+def accepted_encodings(header: str) -> dict:
+    """'gzip, br;q=0.5, *;q=0' → {'gzip': 1.0, 'br': 0.5, '*': 0.0}"""
+    result = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        result[name] = q
+    return result
+
+
+def negotiate(header: str, available) -> str:
+    """Encoding dari `available` (urut preferensi server) dengan q tertinggi > 0, atau None."""
+    accepted = accepted_encodings(header or "")
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int, thread_minimum_size: int, **kwargs):
+        super().__init__(app, minimum_size, **kwargs)
+        self.thread_minimum_size = thread_minimum_size
+        self._compressor = brotli.Compressor(quality=quality)
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # Sama seperti gzip Starlette: chunk besar dikompres di thread supaya event loop tidak tertahan
+        if len(body) >= self.thread_minimum_size:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def __init__(self, app, minimum_size: int = 500, compresslevel: int = 9, brotli_quality: int = BROTLI_QUALITY):
+        super().__init__(app, minimum_size, compresslevel)
+        self.brotli_quality = brotli_quality
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        options = {"exclude_content_types": self.exclude_content_types}
+        if encoding == "br":
+            responder = BrotliResponder(
+                self.app, self.minimum_size, self.brotli_quality, self.thread_minimum_size, **options
+            )
+        elif encoding == "gzip":
+            responder = GZipResponder(
+                self.app, self.minimum_size, self.compresslevel,
+                thread_minimum_size=self.thread_minimum_size, **options
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size, **options)
+        await responder(scope, receive, send)
@@ -0,0 +1,109 @@
+# utils/fare_calendar.py
+# Ringkasan harian per rute (origin → destination): harga termurah yang masih ada kursinya,
+# total kursi tersedia, jumlah jadwal. Disimpan di koleksi fare_calendar dan di-refresh
+# per (rute, hari) setiap kali jadwal atau stok kursinya berubah.
+from database import fare_calendar, schedules, MONGO_ENABLED
+from pymongo import ASCENDING
+from datetime import datetime, timedelta
+import re
+
+
+def _key(value: str) -> str:
+    return (value or "").strip().lower()
+
+
+def _day(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, dt.day)
+
+
+def ensure_indexes():
+    fare_calendar.create_index(
+        [("origin_key", ASCENDING), ("destination_key", ASCENDING), ("day", ASCENDING)], unique=True
+    )
+    schedules.create_index([("departure_date", ASCENDING)])
+
+
+def _summary_pipeline(match: dict, group_id) -> list:
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": group_id,
+            "origin": {"$first": "$origin"},
+            "destination": {"$first": "$destination"},
+            # Harga termurah hanya dari jadwal yang masih ada kursi
+            "min_price": {"$min": {"$cond": [{"$gt": ["$available_seats", 0]}, "$price", None]}},
+            "available_seats": {"$sum": {"$max": ["$available_seats", 0]}},
+            "schedule_count": {"$sum": 1}
+        }}
+    ]
+
+
+def refresh_day(origin: str, destination: str, departure_date: datetime):
+    day = _day(departure_date)
+    match = {
+        "origin": {"$regex": f"^\\s*{re.escape(origin.strip())}\\s*$", "$options": "i"},
+        "destination": {"$regex": f"^\\s*{re.escape(destination.strip())}\\s*$", "$options": "i"},
+        "departure_date": {"$gte": day, "$lt": day + timedelta(days=1)}
+    }
+    key = {"origin_key": _key(origin), "destination_key": _key(destination), "day": day}
+    summary = next(schedules.aggregate(_summary_pipeline(match, None)), None)
+    if not summary:
+        fare_calendar.delete_one(key)
+        return
+    summary.pop("_id")
+    fare_calendar.update_one(key, {"$set": summary}, upsert=True)
+
+
+def refresh_for_schedule(sched: dict):
+    if not MONGO_ENABLED:
+        # Backend memory: kalender harga (koleksi MongoDB) tidak dipakai
+        return
+    if sched and sched.get("origin") and sched.get("destination") and sched.get("departure_date"):
+        refresh_day(sched["origin"], sched["destination"], sched["departure_date"])
+
+
+def get_calendar(origin: str, destination: str, start: datetime, end: datetime) -> list:
+    cursor = fare_calendar.find(
+        {
+            "origin_key": _key(origin),
+            "destination_key": _key(destination),
+            "day": {"$gte": _day(start), "$lte": _day(end)}
+        },
+        {"_id": 0, "day": 1, "min_price": 1, "available_seats": 1, "schedule_count": 1}
+    ).sort("day", ASCENDING)
+    return [
+        {
+            "date": doc["day"].strftime("%Y-%m-%d"),
+            "min_price": doc.get("min_price"),
+            "available_seats": doc["available_seats"],
+            "schedule_count": doc["schedule_count"]
+        }
+        for doc in cursor
+    ]
+
+
+def rebuild():
+    # Bangun ulang seluruh kalender dari koleksi schedules dalam satu pipeline
+    fare_calendar.delete_many({})
+    ensure_indexes()
+    group_id = {
+        "origin_key": {"$toLower": {"$trim": {"input": "$origin"}}},
+        "destination_key": {"$toLower": {"$trim": {"input": "$destination"}}},
+        "day": {"$dateTrunc": {"date": "$departure_date", "unit": "day"}}
+    }
+    pipeline = _summary_pipeline({}, group_id) + [
+        {"$replaceWith": {"$mergeObjects": ["$_id", {
+            "origin": "$origin",
+            "destination": "$destination",
+            "min_price": "$min_price",
+            "available_seats": "$available_seats",
+            "schedule_count": "$schedule_count"
+        }]}},
+        {"$merge": {
+            "into": "fare_calendar",
+            "on": ["origin_key", "destination_key", "day"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+    schedules.aggregate(pipeline)
@@ -0,0 +1,164 @@
+# utils/idempotency.py
+# Header Idempotency-Key untuk POST yang sering di-retry client (booking, review).
+# Response pertama disimpan di koleksi idempotency_keys (TTL) + LRU in-process,
+# retry dengan key yang sama langsung dapat response yang sama tanpa menjalankan handler lagi.
+# Reservasi "in_progress" punya lease pendek: kalau proses mati di tengah handler, retry
+# setelah lease lewat boleh mengambil alih key (tidak menunggu TTL 24 jam).
+# Backend memory (tanpa MongoDB): hanya LRU + reservasi in-process, cukup untuk satu proses.
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+from database import idempotency_keys, MONGO_ENABLED
+from bson import ObjectId
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import functools
+import hashlib
+import json
+import os
+import time
+
+KEY_TTL_SECONDS = 24 * 60 * 60
+# Harus jauh di atas durasi handler normal; lewat dari ini reservasi dianggap milik proses mati
+LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "30"))
+LRU_MAX_ENTRIES = 10_000
+
+# (scope, key) -> (fingerprint, response, expires_at)
+_lru = OrderedDict()
+# Backend memory: doc_id -> fingerprint selama handler berjalan
+_reserved = {}
+
+
+def ensure_indexes():
+    idempotency_keys.create_index("created_at", expireAfterSeconds=KEY_TTL_SECONDS)
+
+
+def _fingerprint(kwargs: dict) -> str:
+    payload = {k: v for k, v in kwargs.items() if k != "idempotency_key"}
+    raw = json.dumps(jsonable_encoder(payload), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _remember(scope: str, key: str, fingerprint: str, response):
+    _lru[(scope, key)] = (fingerprint, response, time.monotonic() + KEY_TTL_SECONDS)
+    _lru.move_to_end((scope, key))
+    while len(_lru) > LRU_MAX_ENTRIES:
+        _lru.popitem(last=False)
+
+
+def _check(fingerprint: str, stored_fingerprint: str):
+    if fingerprint != stored_fingerprint:
+        raise HTTPException(422, "Idempotency-Key sudah dipakai untuk request dengan isi berbeda")
+
+
+def _lookup(scope: str, key: str, fingerprint: str):
+    entry = _lru.get((scope, key))
+    if entry:
+        stored_fp, response, expires_at = entry
+        if expires_at > time.monotonic():
+            _lru.move_to_end((scope, key))
+            _check(fingerprint, stored_fp)
+            return response
+        del _lru[(scope, key)]
+
+    if not MONGO_ENABLED:
+        stored_fp = _reserved.get(f"{scope}:{key}")
+        if stored_fp is not None:
+            _check(fingerprint, stored_fp)
+        return None
+    doc = idempotency_keys.find_one({"_id": f"{scope}:{key}"})
+    if not doc:
+        return None
+    _check(fingerprint, doc["fingerprint"])
+    if doc["status"] != "done":
+        return None
+    _remember(scope, key, doc["fingerprint"], doc["response"])
+    return doc["response"]
+
+
+def _reserve(doc_id: str, fingerprint: str, owner: str) -> bool:
+    """Reservasi key untuk owner ini; False jika sedang dipegang request lain (lease masih berlaku)."""
+    if not MONGO_ENABLED:
+        # Dipanggil di event loop tanpa await di antaranya → cek + set tidak bisa disela request lain
+        if doc_id in _reserved:
+            return False
+        _reserved[doc_id] = fingerprint
+        return True
+    now = datetime.utcnow()
+    lease = {"status": "in_progress", "owner": owner, "lease_until": now + timedelta(seconds=LEASE_SECONDS)}
+    try:
+        idempotency_keys.insert_one({"_id": doc_id, "fingerprint": fingerprint, "created_at": now, **lease})
+        return True
+    except DuplicateKeyError:
+        pass
+    # Pemilik sebelumnya mati di tengah handler (lease lewat / reservasi lama tanpa lease) → ambil alih
+    taken = idempotency_keys.find_one_and_update(
+        {"_id": doc_id, "status": "in_progress", "fingerprint": fingerprint,
+         "lease_until": {"$not": {"$gte": now}}},
+        {"$set": lease}
+    )
+    return taken is not None
+
+
+def _release(doc_id: str, owner: str):
+    if not MONGO_ENABLED:
+        _reserved.pop(doc_id, None)
+        return
+    idempotency_keys.delete_one({"_id": doc_id, "owner": owner})
+
+
+def _complete(doc_id: str, owner: str, stored):
+    if not MONGO_ENABLED:
+        # Response sudah ada di LRU (_remember) → reservasi tidak diperlukan lagi
+        _reserved.pop(doc_id, None)
+        return
+    # Filter owner: kalau reservasi sudah diambil alih, response milik pengambil alih yang disimpan
+    idempotency_keys.update_one(
+        {"_id": doc_id, "owner": owner},
+        {"$set": {"status": "done", "response": stored}, "$unset": {"owner": "", "lease_until": ""}}
+    )
+
+
+def _in_progress() -> HTTPException:
+    return HTTPException(
+        409, "Request dengan Idempotency-Key ini masih diproses",
+        headers={"Retry-After": str(LEASE_SECONDS)}
+    )
+
+
+def idempotent(scope: str):
+    """Decorator route: handler wajib punya parameter `idempotency_key` (Header Idempotency-Key)."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = kwargs.get("idempotency_key")
+            if not key:
+                return await func(*args, **kwargs)
+
+            fingerprint = _fingerprint(kwargs)
+            cached = _lookup(scope, key, fingerprint)
+            if cached is not None:
+                return cached
+
+            # Reservasi key dulu supaya retry paralel tidak ikut mengeksekusi handler
+            doc_id = f"{scope}:{key}"
+            owner = str(ObjectId())
+            if not _reserve(doc_id, fingerprint, owner):
+                cached = _lookup(scope, key, fingerprint)
+                if cached is not None:
+                    return cached
+                raise _in_progress()
+
+            try:
+                response = await func(*args, **kwargs)
+            except Exception:
+                # Gagal (validasi dsb) → key dilepas, client boleh retry
+                _release(doc_id, owner)
+                raise
+
+            stored = jsonable_encoder(response)
+            _remember(scope, key, fingerprint, stored)
+            _complete(doc_id, owner, stored)
+            return stored
+        return wrapper
+    return decorator
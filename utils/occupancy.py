@@ -0,0 +1,123 @@
+# utils/occupancy.py
+# Riwayat okupansi kursi per jadwal di time-series collection schedule_occupancy
+# (metaField = jadwal + rute, jadi MongoDB mem-bucket per jadwal). Setiap perubahan stok dari
+# booking (buat/ubah/cancel/promosi waitlist) dicatat lewat schedule_events.seats_changed()
+# dengan nilai available_seats sesudah update, ditulis per batch oleh utils/batch_writer.py.
+# Kurva load factor di-downsample di server ($dateTrunc) dalam satu aggregation untuk
+# banyak jadwal sekaligus.
+from fastapi import HTTPException
+from database import db, schedule_occupancy, schedules, MONGO_ENABLED
+from pymongo import ASCENDING
+from pymongo.errors import CollectionInvalid
+from utils.batch_writer import BatchWriter
+from datetime import datetime
+import os
+
+QUEUE_MAX = int(os.getenv("OCCUPANCY_QUEUE_MAX", "50000"))
+BATCH_SIZE = int(os.getenv("OCCUPANCY_BATCH_SIZE", "500"))
+FLUSH_SECONDS = float(os.getenv("OCCUPANCY_FLUSH_SECONDS", "2"))
+MAX_SCHEDULES = 5000
+
+_writer = BatchWriter(schedule_occupancy, "occupancy", QUEUE_MAX, BATCH_SIZE, FLUSH_SECONDS)
+
+
+def ensure_collection():
+    try:
+        db.create_collection(
+            "schedule_occupancy",
+            timeseries={"timeField": "ts", "metaField": "meta", "granularity": "minutes"}
+        )
+    except CollectionInvalid:
+        pass
+    schedule_occupancy.create_index([("meta.schedule_id", ASCENDING), ("ts", ASCENDING)])
+    schedule_occupancy.create_index([("meta.origin", ASCENDING), ("meta.destination", ASCENDING), ("ts", ASCENDING)])
+
+
+def record(sched: dict, sold: int):
+    """sched = dokumen jadwal sesudah update (_id, origin, destination, available_seats)."""
+    if not MONGO_ENABLED:
+        return
+    _writer.put({
+        "ts": datetime.utcnow(),
+        "meta": {
+            "schedule_id": sched["_id"],
+            "origin": sched.get("origin", "").strip().lower(),
+            "destination": sched.get("destination", "").strip().lower()
+        },
+        "available_seats": sched.get("available_seats", 0),
+        "sold": sold   # kursi terjual dalam perubahan ini (negatif = dilepas)
+    })
+
+
+def start():
+    """Jalankan writer di background thread; return fungsi untuk menghentikannya."""
+    return _writer.start()
+
+
+def stats() -> dict:
+    return _writer.stats()
+
+
+def curves(schedule_ids: list = None, origin: str = None, destination: str = None,
+           start: datetime = None, end: datetime = None, unit: str = "hour", bin_size: int = 1) -> list:
+    """Kurva okupansi per jadwal: satu titik per bucket waktu (available_seats terakhir di bucket).
+    Rentang waktu [start, end). HTTPException 400 jika lebih dari MAX_SCHEDULES jadwal cocok
+    (hasil tidak pernah dipotong diam-diam)."""
+    match = {}
+    if schedule_ids:
+        match["meta.schedule_id"] = {"$in": schedule_ids}
+    if origin:
+        match["meta.origin"] = origin.strip().lower()
+    if destination:
+        match["meta.destination"] = destination.strip().lower()
+    if start is not None or end is not None:
+        match["ts"] = {k: v for k, v in (("$gte", start), ("$lt", end)) if v is not None}
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"ts": 1}},
+        {"$group": {
+            "_id": {
+                "schedule_id": "$meta.schedule_id",
+                "t": {"$dateTrunc": {"date": "$ts", "unit": unit, "binSize": bin_size}}
+            },
+            "available_seats": {"$last": "$available_seats"},
+            "sold": {"$sum": "$sold"}
+        }},
+        {"$sort": {"_id.t": 1}},
+        {"$group": {
+            "_id": "$_id.schedule_id",
+            "peak_available": {"$max": "$available_seats"},
+            "points": {"$push": {"t": "$_id.t", "available_seats": "$available_seats", "sold": "$sold"}}
+        }},
+        # Satu lebih dari batas → ketahuan kalau hasilnya akan terpotong
+        {"$limit": MAX_SCHEDULES + 1}
+    ]
+    series = list(schedule_occupancy.aggregate(pipeline, allowDiskUse=True))
+    if len(series) > MAX_SCHEDULES:
+        raise HTTPException(
+            400, f"Lebih dari {MAX_SCHEDULES} jadwal cocok, persempit rute/rentang waktu atau pakai schedule_ids"
+        )
+
+    # Kapasitas + info jadwal dalam satu query; jadwal lama tanpa field capacity memakai
+    # available_seats tertinggi yang pernah tercatat (bisa lebih kecil dari kapasitas asli)
+    info = {s["_id"]: s for s in schedules.find(
+        {"_id": {"$in": [s["_id"] for s in series]}},
+        {"origin": 1, "destination": 1, "departure_date": 1, "capacity": 1, "available_seats": 1}
+    )}
+    result = []
+    for s in series:
+        sched = info.get(s["_id"], {})
+        capacity = sched.get("capacity") or max(s["peak_available"], sched.get("available_seats", 0))
+        for point in s["points"]:
+            point["load_factor"] = round(1 - point["available_seats"] / capacity, 4) if capacity else None
+        result.append({
+            "schedule_id": str(s["_id"]),
+            "origin": sched.get("origin"),
+            "destination": sched.get("destination"),
+            "departure_date": sched.get("departure_date"),
+            "capacity": capacity,
+            "points": s["points"]
+        })
+    result.sort(key=lambda r: (r["departure_date"] or datetime.min, r["schedule_id"]))
+    return result
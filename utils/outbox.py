@@ -0,0 +1,191 @@
+# utils/outbox.py
+# Outbox untuk efek samping yang tidak perlu selesai di dalam request (rollup analitik,
+# kalender harga, flag status_review, cached rating). Handler request cukup menulis satu
+# dokumen outbox; worker thread di proses aplikasi mengambilnya per batch dan menjalankan
+# task yang terdaftar, dengan retry + backoff. Lag (created_at → selesai) diukur di stats().
+# Eksekusi at-least-once: handler menerima event_id (_id dokumen outbox) untuk deduplikasi
+# efek yang tidak idempotent (mis. $inc rollup analitik).
+from database import outbox, MONGO_ENABLED
+from pymongo import ASCENDING, InsertOne
+from pymongo.errors import ClientBulkWriteException, DuplicateKeyError, InvalidOperation
+from bson import ObjectId
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+
+WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))
+BATCH_SIZE = 50
+IDLE_POLL_SECONDS = 0.2
+CLAIM_SECONDS = 60
+MAX_ATTEMPTS = 8
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(**payload, event_id=...)
+_tasks = {}
+# kind yang handler-nya hanya memakai repository → dijalankan langsung di backend memory
+_inline_kinds = set()
+_stats = {"processed": 0, "retried": 0, "failed": 0, "skipped": 0,
+          "last_lag_ms": 0.0, "max_lag_ms": 0.0, "avg_lag_ms": 0.0}
+_stats_lock = threading.Lock()
+# False setelah server menolak MongoClient.bulk_write (butuh MongoDB 8.0+)
+_client_bulk_write = True
+
+
+def ensure_indexes():
+    outbox.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+    outbox.create_index([("claim", ASCENDING)])
+
+
+def task(kind: str, inline_without_mongo: bool = False):
+    """Decorator: daftarkan fungsi sebagai handler outbox untuk `kind` (wajib menerima event_id).
+    inline_without_mongo: dengan backend memory handler dijalankan langsung saat enqueue (event_id=None)."""
+    def decorator(func):
+        _tasks[kind] = func
+        if inline_without_mongo:
+            _inline_kinds.add(kind)
+        return func
+    return decorator
+
+
+def _outbox_doc(kind: str, payload: dict) -> dict:
+    now = datetime.utcnow()
+    return {
+        "kind": kind,
+        "payload": payload,
+        "status": "pending",
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now
+    }
+
+
+def enqueue(kind: str, **payload):
+    if not MONGO_ENABLED:
+        if kind in _inline_kinds:
+            _tasks[kind](**payload, event_id=None)
+            return
+        # Backend memory: handler outbox menulis ke koleksi MongoDB → event tidak dijalankan
+        with _stats_lock:
+            _stats["skipped"] += 1
+        return
+    outbox.insert_one(_outbox_doc(kind, payload))
+
+
+def insert_with(collection, doc: dict, kind: str, **payload):
+    """Insert doc + dokumen outbox-nya dalam satu command bulkWrite lintas koleksi (MongoDB 8.0+).
+    Ordered: kalau insert doc gagal (DuplicateKeyError), dokumen outbox tidak ditulis.
+    Server lama → dua insert berurutan."""
+    global _client_bulk_write
+    if _client_bulk_write:
+        try:
+            outbox.database.client.bulk_write([
+                InsertOne(doc, namespace=collection.full_name),
+                InsertOne(_outbox_doc(kind, payload), namespace=outbox.full_name)
+            ])
+            return
+        except InvalidOperation:
+            _client_bulk_write = False
+        except ClientBulkWriteException as exc:
+            error = (exc.write_errors or [{}])[0]
+            if error.get("code") == 11000:
+                raise DuplicateKeyError(error.get("errmsg", "duplicate key"), 11000, error)
+            raise
+    collection.insert_one(doc)
+    enqueue(kind, **payload)
+
+
+def _claim(worker_claim: str) -> list:
+    now = datetime.utcnow()
+    ready = {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": now}},
+        {"status": "processing", "locked_until": {"$lt": now}}   # worker sebelumnya mati
+    ]}
+    ids = [d["_id"] for d in outbox.find(ready, {"_id": 1}).sort("next_attempt_at", ASCENDING).limit(BATCH_SIZE)]
+    if not ids:
+        return []
+    # Klaim atomik per dokumen: worker lain yang memilih id sama tidak akan cocok lagi
+    outbox.update_many(
+        {"_id": {"$in": ids}, **ready},
+        {"$set": {"status": "processing", "claim": worker_claim, "locked_until": now + timedelta(seconds=CLAIM_SECONDS)}}
+    )
+    return list(outbox.find({"claim": worker_claim, "status": "processing"}))
+
+
+def _record_lag(created_at: datetime):
+    lag_ms = (datetime.utcnow() - created_at).total_seconds() * 1000
+    with _stats_lock:
+        _stats["processed"] += 1
+        _stats["last_lag_ms"] = lag_ms
+        _stats["max_lag_ms"] = max(_stats["max_lag_ms"], lag_ms)
+        _stats["avg_lag_ms"] = lag_ms if _stats["processed"] == 1 else _stats["avg_lag_ms"] * 0.9 + lag_ms * 0.1
+
+
+def _run_batch(worker_claim: str) -> int:
+    batch = _claim(worker_claim)
+    done = []
+    for doc in batch:
+        try:
+            _tasks[doc["kind"]](**doc["payload"], event_id=doc["_id"])
+            done.append(doc["_id"])
+            _record_lag(doc["created_at"])
+        except Exception:
+            logger.exception("Task outbox %s gagal (percobaan %s)", doc["kind"], doc["attempts"] + 1)
+            attempts = doc["attempts"] + 1
+            failed = attempts >= MAX_ATTEMPTS
+            with _stats_lock:
+                _stats["failed" if failed else "retried"] += 1
+            outbox.update_one({"_id": doc["_id"]}, {
+                "$set": {
+                    "status": "failed" if failed else "pending",
+                    "attempts": attempts,
+                    "next_attempt_at": datetime.utcnow() + timedelta(seconds=2 ** attempts)
+                },
+                "$unset": {"claim": "", "locked_until": ""}
+            })
+    if done:
+        outbox.delete_many({"_id": {"$in": done}})
+    return len(batch)
+
+
+def _worker(stop: threading.Event):
+    worker_claim = str(ObjectId())
+    while not stop.is_set():
+        try:
+            if _run_batch(worker_claim) == 0:
+                stop.wait(IDLE_POLL_SECONDS)
+        except Exception:
+            logger.exception("Worker outbox error")
+            stop.wait(1)
+
+
+def start(workers: int = WORKERS):
+    """Jalankan worker di background thread; return fungsi untuk menghentikannya."""
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_worker, args=(stop,), name=f"outbox-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    def shutdown():
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
+    return shutdown
+
+
+def stats() -> dict:
+    with _stats_lock:
+        result = dict(_stats)
+    if not MONGO_ENABLED:
+        return result
+    result["pending"] = outbox.count_documents({"status": {"$in": ["pending", "processing"]}})
+    result["failed_total"] = outbox.count_documents({"status": "failed"})
+    oldest = outbox.find_one({"status": "pending"}, {"created_at": 1}, sort=[("created_at", ASCENDING)])
+    result["oldest_pending_age_ms"] = (
+        (datetime.utcnow() - oldest["created_at"]).total_seconds() * 1000 if oldest else 0.0
+    )
+    return result
@@ -0,0 +1,18 @@
+# utils/passwords.py
+# Hash/verify password bcrypt. passlib + backend bcrypt baru di-load saat pertama dipakai,
+# supaya cold start worker tidak membayar import-nya.
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    return _context().hash(password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return _context().verify(password, hashed)
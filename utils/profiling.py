@@ -0,0 +1,207 @@
+# utils/profiling.py
+# Profil satu request atas permintaan admin: kirim header X-Profile: 1 (+ header admin biasa).
+# Request itu dijalankan di bawah cProfile, setiap command MongoDB dicatat lewat CommandListener,
+# lalu waktu dibagi per kategori (Python, validasi pydantic, encoding JSON, driver MongoDB).
+# Hasilnya disimpan in-memory (PROFILE_MAX terakhir) dan bisa diunduh dari /api/admin/profiles.
+# Tanpa header: middleware langsung meneruskan request, listener hanya membaca satu ContextVar.
+# cProfile merekam semua coroutine di thread event loop, jadi profil hanya dibuat saat tidak ada
+# request lain yang sedang berjalan (selain itu response diberi header X-Profile-Skipped: busy).
+from starlette.datastructures import Headers
+from pymongo import monitoring
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from bson import ObjectId
+import cProfile
+import marshal
+import pstats
+import threading
+import time
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_MAX = 20
+TOP_FUNCTIONS = 30
+
+# Kategori dicocokkan dari path file fungsi (urutan penting: yang pertama cocok dipakai)
+CATEGORIES = [
+    ("pydantic", ("/pydantic/", "/pydantic_core/", "fastapi/_compat")),
+    ("json", ("/json/", "fastapi/encoders.py", "starlette/responses.py", "utils/raw_json.py")),
+    ("mongodb", ("/pymongo/", "/bson/")),
+]
+# Fungsi built-in (filename "~") untuk socket/selector = menunggu/baca jaringan, bukan CPU Python
+IO_BUILTINS = ("_socket.", "socket.", "select.", "selectors", "epoll", "kqueue", "_ssl.")
+
+_commands = ContextVar("profile_commands", default=None)
+_lock = threading.Lock()
+_profiles = OrderedDict()   # id -> {"summary": ..., "stats": pstats.Stats}
+
+
+class CommandListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        commands = _commands.get()
+        if commands is not None:
+            commands.append(_command(event, True))
+
+    def failed(self, event):
+        commands = _commands.get()
+        if commands is not None:
+            commands.append(_command(event, False))
+
+
+def _command(event, ok: bool) -> dict:
+    return {
+        "command": event.command_name,
+        "database": event.database_name,
+        "duration_ms": round(event.duration_micros / 1000, 3),
+        "ok": ok
+    }
+
+
+def _category(filename: str, func: str) -> str:
+    if filename == "~" and any(p in func for p in IO_BUILTINS):
+        return "io"
+    for name, patterns in CATEGORIES:
+        if any(p in filename for p in patterns):
+            return name
+    return "python"
+
+
+def _summarize(stats: pstats.Stats) -> tuple:
+    # tottime per kategori (waktu di fungsi itu sendiri, tanpa anak) → jumlahnya = total CPU-ish
+    split = {name: 0.0 for name, _ in CATEGORIES}
+    split["io"] = 0.0
+    split["python"] = 0.0
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+        split[_category(filename, func)] += tt
+        rows.append({
+            "function": f"{filename}:{line}({func})",
+            "calls": nc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3)
+        })
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return {k: round(v * 1000, 3) for k, v in split.items()}, rows[:TOP_FUNCTIONS]
+
+
+def _save(summary: dict, stats: pstats.Stats):
+    with _lock:
+        _profiles[summary["id"]] = {"summary": summary, "stats": stats}
+        while len(_profiles) > PROFILE_MAX:
+            _profiles.popitem(last=False)
+
+
+def list_profiles() -> list:
+    with _lock:
+        return [{k: v for k, v in p["summary"].items() if k not in ("commands", "top")}
+                for p in reversed(_profiles.values())]
+
+
+def get_profile(profile_id: str):
+    entry = _profiles.get(profile_id)
+    return entry["summary"] if entry else None
+
+
+def dump_profile(profile_id: str):
+    """Isi file .prof (format pstats.dump_stats, bisa dibuka snakeviz/pstats), atau None."""
+    entry = _profiles.get(profile_id)
+    return marshal.dumps(entry["stats"].stats) if entry else None
+
+
+def _is_admin(headers) -> bool:
+    # Import di sini: database.py mengimpor modul ini untuk mendaftarkan listener
+    from utils.auth import get_current_user_admin
+    from fastapi import HTTPException
+    try:
+        get_current_user_admin(headers.get("X-User-ID"), headers.get("X-User-Role"))
+    except HTTPException:
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI murni (tanpa BaseHTTPMiddleware): request tanpa header hanya dihitung
+    in-flight lalu diteruskan apa adanya, body response tidak pernah ditampung."""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        self.started_total = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.in_flight += 1
+        self.started_total += 1
+        try:
+            headers = Headers(scope=scope)
+            if headers.get(PROFILE_HEADER) != "1" or not _is_admin(headers):
+                await self.app(scope, receive, send)
+            elif self.in_flight > 1:
+                # cProfile merekam semua coroutine di event loop ini → request lain ikut terukur
+                await self.app(scope, receive, _with_header(send, "x-profile-skipped", "busy"))
+            else:
+                await self._profile(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _profile(self, scope, receive, send):
+        profile_id = str(ObjectId())
+        status = {"code": 500}
+        profiler = cProfile.Profile()
+
+        async def send_unprofiled(message):
+            # Middleware luar (kompresi, rate limit) berjalan di dalam send → tidak ikut diprofil
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            profiler.disable()
+            try:
+                await send(message)
+            finally:
+                profiler.enable()
+
+        commands = []
+        token = _commands.set(commands)
+        started_total = self.started_total
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            # Body streaming di-encode di dalam app (sebelum send) → ikut terprofil
+            await self.app(scope, receive, send_unprofiled)
+        finally:
+            profiler.disable()
+            _commands.reset(token)
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        stats = pstats.Stats(profiler)
+        split, top = _summarize(stats)
+        _save({
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "status_code": status["code"],
+            "created_at": datetime.utcnow(),
+            "wall_ms": round(wall_ms, 3),
+            "split_ms": split,
+            # Waktu menunggu (threadpool dependency sync, event loop) yang tidak terlihat cProfile
+            "unaccounted_ms": round(max(0.0, wall_ms - sum(split.values())), 3),
+            "mongodb_server_ms": round(sum(c["duration_ms"] for c in commands), 3),
+            # > 0 → request lain mulai selagi diprofil, angka split ikut memuat pekerjaan mereka
+            "overlapping_requests": self.started_total - started_total,
+            "commands": commands,
+            "top": top
+        }, stats)
+
+
+def _with_header(send, name: str, value: str):
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (name.encode(), value.encode())]}
+        await send(message)
+    return wrapped
@@ -0,0 +1,152 @@
+# utils/rate_limit.py
+# Rate limit token bucket per client + admission control untuk endpoint berat, semuanya in-process.
+# - Setiap request /api memakan token sesuai bobot route (login bcrypt, listing admin, agregasi = mahal).
+# - Endpoint berat juga harus dapat slot dari semaphore global; kalau penuh terlalu lama → 503.
+# - Bucket per IP; bucket per user hanya untuk X-User-ID yang sudah lolos validasi auth (utils/auth.py),
+#   jadi header acak tidak bisa dipakai untuk mendapat bucket baru.
+from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection
+from collections import OrderedDict, Counter
+import asyncio
+import math
+import os
+import time
+
+RATE_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))
+MAX_HEAVY_CONCURRENCY = int(os.getenv("MAX_HEAVY_CONCURRENCY", "8"))
+ADMISSION_WAIT_SECONDS = float(os.getenv("ADMISSION_WAIT_SECONDS", "0.5"))
+MAX_TRACKED_CLIENTS = 100_000
+# Lewat dari ini user harus lolos auth lagi (admin yang dihapus/diturunkan kembali ke bucket IP)
+AUTHENTICATED_TTL_SECONDS = 300
+
+# (method, path, cost, heavy) — path diakhiri "*" berarti prefix
+ROUTE_COSTS = [
+    ("POST", "/api/users/login", 10, True),
+    ("POST", "/api/users/register", 10, True),
+    ("POST", "/api/users/register_admin", 10, True),
+    ("GET", "/api/schedules/popular", 5, True),
+    ("POST", "/api/schedules/import", 20, True),
+    ("GET", "/api/schedules/fare-calendar", 2, False),
+    ("GET", "/api/bookings/", 10, True),
+    ("GET", "/api/reviews/", 10, True),
+    ("GET", "/api/users/", 10, True),
+    ("GET", "/api/reviews/search", 3, True),
+    ("GET", "/api/analytics/*", 5, True),
+    ("GET", "/api/admin/*", 5, True),
+]
+DEFAULT_COST = 1
+
+# client -> (tokens, last_refill)
+_buckets = OrderedDict()
+# user_id -> berlaku sampai (monotonic)
+_authenticated = OrderedDict()
+_heavy_slots = None
+rejected = Counter()
+
+
+def _route_cost(method: str, path: str):
+    # Return (cost, heavy, label); label = pola route supaya counter tidak tumbuh per ID
+    for m, pattern, cost, heavy in ROUTE_COSTS:
+        if m != method:
+            continue
+        if pattern.endswith("*") and path.startswith(pattern[:-1]):
+            return cost, heavy, f"{m} {pattern}"
+        if path == pattern or path == pattern.rstrip("/"):
+            return cost, heavy, f"{m} {pattern}"
+    return DEFAULT_COST, False, f"{method} (lainnya)"
+
+
+def _take(client: str, cost: float):
+    """Return 0 jika token cukup, atau detik yang perlu ditunggu sampai cukup."""
+    now = time.monotonic()
+    tokens, last = _buckets.pop(client, (BURST, now))
+    tokens = min(BURST, tokens + (now - last) * RATE_PER_SECOND)
+    wait = 0.0
+    if tokens >= cost:
+        tokens -= cost
+    else:
+        wait = (cost - tokens) / RATE_PER_SECOND
+    _buckets[client] = (tokens, now)
+    while len(_buckets) > MAX_TRACKED_CLIENTS:
+        _buckets.popitem(last=False)
+    return wait
+
+
+def remember_authenticated(user_id: str):
+    """Dipanggil auth setelah user_id tervalidasi; request berikutnya memakai bucket user."""
+    _authenticated[user_id] = time.monotonic() + AUTHENTICATED_TTL_SECONDS
+    _authenticated.move_to_end(user_id)
+    while len(_authenticated) > MAX_TRACKED_CLIENTS:
+        _authenticated.popitem(last=False)
+
+
+def _client_key(request) -> str:
+    user_id = request.headers.get("X-User-ID")
+    if user_id and _authenticated.get(user_id, 0) > time.monotonic():
+        return f"user:{user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI murni: slot endpoint berat baru dilepas setelah body response selesai dikirim.
+    Listing besar (/api/bookings/, /api/users/) di-stream sesudah handler kembali, jadi melepas slot
+    saat call_next kembali membiarkan stream tanpa batas berjalan paralel."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _heavy_slots
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        cost, heavy, label = _route_cost(scope["method"], scope["path"])
+        wait = _take(_client_key(HTTPConnection(scope)), cost)
+        if wait:
+            rejected["rate_limited"] += 1
+            rejected[f"rate_limited {label}"] += 1
+            response = JSONResponse(
+                {"detail": "Terlalu banyak request, coba lagi nanti"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+            await response(scope, receive, send)
+            return
+
+        if not heavy:
+            await self.app(scope, receive, send)
+            return
+
+        # Semaphore dibuat di event loop yang sedang jalan
+        if _heavy_slots is None:
+            _heavy_slots = asyncio.Semaphore(MAX_HEAVY_CONCURRENCY)
+        try:
+            await asyncio.wait_for(_heavy_slots.acquire(), ADMISSION_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            rejected["overloaded"] += 1
+            rejected[f"overloaded {label}"] += 1
+            response = JSONResponse(
+                {"detail": "Server sedang sibuk, coba lagi sebentar"},
+                status_code=503,
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            # Kembali setelah seluruh body terkirim (atau request gagal/putus)
+            await self.app(scope, receive, send)
+        finally:
+            _heavy_slots.release()
+
+
+def stats() -> dict:
+    return {
+        "rate_per_second": RATE_PER_SECOND,
+        "burst": BURST,
+        "max_heavy_concurrency": MAX_HEAVY_CONCURRENCY,
+        "tracked_clients": len(_buckets),
+        "authenticated_users": len(_authenticated),
+        "rejected": dict(rejected)
+    }
@@ -0,0 +1,85 @@
+# utils/ratings.py
+# Cached rating perusahaan (cached_rating, cached_total_reviews, rating_sum, rating_counts) di koleksi companies.
+# Review baru disimpan dengan rating_pending: True sampai add_rating (worker outbox) menghitungnya;
+# review yang diubah/dihapus dikoreksi adjust_rating hanya jika sudah terhitung, jadi tiap review
+# terhitung tepat sekali. Perubahan rating diumumkan di topic cache_bus "company_rating" (hanya
+# dipakai utils/company_stats.py), terpisah dari "company" yang mem-flush cache jadwal/pencarian.
+# Backend memory: rating dihitung langsung dari review oleh repositories/memory.py, tanpa cache.
+from database import reviews, companies, MONGO_ENABLED
+from utils import cache_bus
+from pymongo import ASCENDING
+
+
+def ensure_indexes():
+    # Satu booking hanya boleh punya satu review → duplikat ditolak oleh index, bukan query
+    reviews.create_index([("booking_id", ASCENDING)], unique=True)
+    reviews.create_index([("company_id", ASCENDING), ("created_at", ASCENDING)])
+
+
+def add_rating(company_id, rating: int, review_id=None):
+    # Klaim flag pending dulu: retry outbox → tidak dobel; review yang sudah dihapus → dilewati.
+    # Rating diambil dari review saat ini (admin bisa mengubahnya selagi masih antri).
+    # (Outbox lama tanpa review_id langsung ditambahkan seperti sebelumnya.)
+    if not MONGO_ENABLED:
+        # Backend memory menghitung rating langsung dari review (repositories/memory.py)
+        return
+    if review_id is not None:
+        claimed = reviews.find_one_and_update(
+            {"_id": review_id, "rating_pending": True},
+            {"$unset": {"rating_pending": ""}},
+            projection={"rating": 1}
+        )
+        if not claimed:
+            return
+        rating = claimed["rating"]
+    try:
+        _apply(company_id, added=rating)
+    except Exception:
+        # Kembalikan flag supaya retry outbox tetap menghitung review ini
+        if review_id is not None:
+            reviews.update_one({"_id": review_id}, {"$set": {"rating_pending": True}})
+        raise
+    cache_bus.publish("company_rating", str(company_id))
+
+
+def adjust_rating(old_review: dict, new_rating: int = None):
+    """Review diubah (new_rating) atau dihapus (None) → koreksi cached rating company-nya.
+    old_review = dokumen sebelum perubahan (hasil atomik repository update/delete)."""
+    # Review yang masih pending belum terhitung: add_rating membaca rating terbaru saat klaim,
+    # dan review yang dihapus tidak bisa diklaim lagi
+    if not MONGO_ENABLED or old_review.get("rating_pending"):
+        return
+    if new_rating == old_review["rating"]:
+        return
+    _apply(old_review["company_id"], added=new_rating, removed=old_review["rating"])
+    cache_bus.publish("company_rating", str(old_review["company_id"]))
+
+
+def _apply(company_id, added: int = None, removed: int = None):
+    # Update incremental 1 round-trip (update pipeline), tanpa aggregate ulang semua review.
+    # Selisih (bukan $set hasil hitung ulang) → update paralel dari worker lain tidak saling menimpa.
+    # Dokumen lama yang belum punya rating_sum diestimasi dari cached_rating * cached_total_reviews.
+    sum_delta = (added or 0) - (removed or 0)
+    count_delta = (added is not None) - (removed is not None)
+    fields = {
+        "rating_sum": {"$add": [
+            {"$ifNull": ["$rating_sum", {"$multiply": [
+                {"$ifNull": ["$cached_rating", 0]}, {"$ifNull": ["$cached_total_reviews", 0]}
+            ]}]},
+            sum_delta
+        ]},
+        "cached_total_reviews": {"$add": [{"$ifNull": ["$cached_total_reviews", 0]}, count_delta]},
+    }
+    for rating, delta in ((added, 1), (removed, -1)):
+        if rating is not None:
+            fields[f"rating_counts.{rating}"] = {"$max": [
+                0, {"$add": [{"$ifNull": [f"$rating_counts.{rating}", 0]}, delta]}
+            ]}
+    companies.update_one({"_id": company_id}, [
+        {"$set": fields},
+        {"$set": {"cached_rating": {"$cond": [
+            {"$gt": ["$cached_total_reviews", 0]},
+            {"$round": [{"$divide": ["$rating_sum", "$cached_total_reviews"]}, 1]},
+            0.0
+        ]}}}
+    ])
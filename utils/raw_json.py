@@ -0,0 +1,78 @@
+# utils/raw_json.py
+# Jalur baca cepat untuk endpoint listing read-only: hasil aggregation diambil sebagai batch
+# BSON mentah (aggregate_raw_batches), di-decode per batch di C (bson.decode_all) lalu langsung
+# ditulis sebagai JSON secara streaming. Tidak ada dict per baris yang disimpan sampai akhir,
+# tidak ada jalan-jalan rekursif (convert_obj_id) maupun jsonable_encoder/validasi FastAPI.
+# Konsekuensinya: pipeline harus sudah menghasilkan bentuk akhir response (default, $toString).
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
+from datetime import datetime
+from itertools import islice
+import bson
+import json
+
+# Jumlah dokumen per chunk response untuk iterable biasa (mis. repository in-memory)
+CHUNK_SIZE = 500
+
+
+def _default(obj):
+    # Sama dengan format jsonable_encoder: ObjectId → str, datetime → ISO 8601
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Tipe {type(obj).__name__} tidak bisa di-serialize ke JSON")
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+class RawBatches:
+    """Hasil aggregate_raw_batches sebagai iterable list dokumen (satu list per batch server)."""
+
+    def __init__(self, collection, pipeline: list):
+        # Command aggregate dikirim di sini (bukan saat streaming) → error query masih jadi 4xx/5xx biasa
+        self._cursor = collection.aggregate_raw_batches(pipeline)
+
+    def __iter__(self):
+        for batch in self._cursor:
+            yield bson.decode_all(batch)
+
+    def close(self):
+        self._cursor.close()
+
+
+def _chunks(docs):
+    if isinstance(docs, RawBatches):
+        yield from docs
+        return
+    docs = iter(docs)
+    while chunk := list(islice(docs, CHUNK_SIZE)):
+        yield chunk
+
+
+def _stream(docs):
+    first = True
+    try:
+        yield "["
+        for chunk in _chunks(docs):
+            if not chunk:
+                continue
+            text = ",".join(_encoder.encode(doc) for doc in chunk)
+            yield text if first else "," + text
+            first = False
+        yield "]"
+    finally:
+        # Client putus di tengah jalan → cursor server tetap ditutup
+        if isinstance(docs, RawBatches):
+            docs.close()
+
+
+def json_response(docs) -> StreamingResponse:
+    """Kirim dokumen (RawBatches atau iterable dict biasa) sebagai array JSON secara streaming."""
+    return StreamingResponse(_stream(docs), media_type="application/json")
+
+
+def aggregate_response(collection, pipeline: list) -> StreamingResponse:
+    """Jalankan aggregation dan kirim hasilnya sebagai array JSON secara streaming."""
+    return json_response(RawBatches(collection, pipeline))
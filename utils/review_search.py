@@ -0,0 +1,38 @@
+# utils/review_search.py
+# Pencarian full-text komentar review pakai text index MongoDB (ranking via textScore).
+from database import reviews
+from repositories.pipelines import review_search_pipeline
+from typing import Optional
+
+MAX_PAGE_SIZE = 100
+
+
+def ensure_indexes():
+    # Satu koleksi hanya boleh punya satu text index
+    reviews.create_index(
+        [("comment", "text")],
+        name="comment_text",
+        default_language="none"   # komentar campur Indonesia/Inggris → tanpa stemming
+    )
+
+
+def search_pipeline(
+    q: str,
+    company_id=None,
+    rating_min: Optional[int] = None,
+    rating_max: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> list:
+    match = {"$text": {"$search": q}}
+    if company_id is not None:
+        match["company_id"] = company_id
+    if rating_min is not None or rating_max is not None:
+        match["rating"] = {}
+        if rating_min is not None:
+            match["rating"]["$gte"] = rating_min
+        if rating_max is not None:
+            match["rating"]["$lte"] = rating_max
+
+    # Filter + ranking + paging dulu, baru join (template bersama di repositories/pipelines.py)
+    return review_search_pipeline(match, skip, limit)
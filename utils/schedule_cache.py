@@ -0,0 +1,115 @@
+# utils/schedule_cache.py
+# Cache objek jadwal per ID (LRU + TTL) yang dipakai bersama oleh GET /api/schedules/{id}
+# dan validasi create_booking. Invalidasi lewat cache_bus; setiap ID punya nomor generasi
+# lokal supaya hasil baca DB yang dimulai sebelum invalidasi tidak ikut tersimpan (stale).
+import repositories as repo
+from utils import cache_bus
+from bson import ObjectId
+from collections import OrderedDict, Counter
+import threading
+import time
+
+MAX_ENTRIES = 10_000
+TTL_SECONDS = 60
+
+UNKNOWN_COMPANY = {"id": None, "name": "Unknown", "type": "unknown"}
+
+# schedule_id (str) -> (raw_doc, detail, expires_at)
+_entries = OrderedDict()
+# schedule_id (str) -> generasi; naik setiap invalidasi
+_generations = Counter()
+_clear_generation = 0
+_lock = threading.Lock()
+metrics = Counter()
+
+
+def _load(schedule_id: str):
+    raw = repo.schedules.get_with_company(ObjectId(schedule_id))
+    if not raw:
+        return None, None
+    company = raw.pop("company_info", None)
+    detail = {
+        "id": schedule_id,
+        "type": raw.get("type"),
+        "origin": raw.get("origin"),
+        "destination": raw.get("destination"),
+        "departure_date": raw.get("departure_date"),
+        "arrival_date": raw.get("arrival_date"),
+        "price": raw.get("price"),
+        "available_seats": raw.get("available_seats"),
+        "operator": raw.get("operator"),
+        "company": {
+            "id": str(company["_id"]),
+            "name": company.get("name"),
+            "type": company.get("type")
+        } if company else dict(UNKNOWN_COMPANY)
+    }
+    return raw, detail
+
+
+def _get(schedule_id: str):
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(schedule_id)
+        if entry and entry[2] > now:
+            _entries.move_to_end(schedule_id)
+            metrics["hits"] += 1
+            return entry
+        metrics["misses"] += 1
+        generation = (_generations[schedule_id], _clear_generation)
+
+    raw, detail = _load(schedule_id)
+    entry = (raw, detail, now + TTL_SECONDS)
+    with _lock:
+        # Simpan hanya jika tidak ada invalidasi selama baca DB
+        if raw is not None and generation == (_generations[schedule_id], _clear_generation):
+            _entries[schedule_id] = entry
+            _entries.move_to_end(schedule_id)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+    return entry
+
+
+def get_raw(schedule_id: str):
+    """Dokumen jadwal mentah (field asli MongoDB) atau None."""
+    raw = _get(schedule_id)[0]
+    return dict(raw) if raw else None
+
+
+def get_detail(schedule_id: str):
+    """Detail jadwal untuk response API (company sudah di-join) atau None."""
+    detail = _get(schedule_id)[1]
+    return {**detail, "company": dict(detail["company"])} if detail else None
+
+
+def invalidate(schedule_id: str):
+    with _lock:
+        _generations[schedule_id] += 1
+        if _entries.pop(schedule_id, None) is not None:
+            metrics["invalidations"] += 1
+
+
+def clear(_key=None):
+    global _clear_generation
+    with _lock:
+        _clear_generation += 1
+        metrics["invalidations"] += len(_entries)
+        _entries.clear()
+        _generations.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        lookups = metrics["hits"] + metrics["misses"]
+        return {
+            "size": len(_entries),
+            "hits": metrics["hits"],
+            "misses": metrics["misses"],
+            "invalidations": metrics["invalidations"],
+            "hit_rate": round(metrics["hits"] / lookups, 4) if lookups else None
+        }
+
+
+cache_bus.subscribe("schedule", invalidate)
+cache_bus.subscribe("schedule_bulk", clear)
+cache_bus.subscribe("company", clear)
@@ -0,0 +1,32 @@
+# utils/schedule_events.py
+# Satu titik notifikasi "jadwal berubah" (dibuat/diubah/dihapus/stok kursi berubah).
+# Semua data turunan jadwal di-refresh dari sini supaya route tidak perlu tahu daftarnya.
+from utils import fare_calendar, cache_bus, schedule_cache, search_cache, occupancy
+
+
+def schedule_changed(schedule_id, *versions):
+    # versions: dokumen jadwal versi lama/baru (boleh None) untuk refresh kalender harga
+    for sched in versions:
+        fare_calendar.refresh_for_schedule(sched)
+    cache_bus.publish("schedule", str(schedule_id))
+
+
+def seats_changed(schedule_id, sched: dict = None, sold: int = 0):
+    # Stok kursi berubah di request: cache lokal dibuang langsung supaya worker ini tidak
+    # membaca stok lama; worker lain menyusul lewat schedule_changed() di outbox.
+    # sched = hasil reserve/release_seats (None jika gagal) → dicatat ke riwayat okupansi
+    if sched:
+        occupancy.record(sched, sold)
+    schedule_cache.invalidate(str(schedule_id))
+    search_cache.bump()
+
+
+def schedules_bulk_changed(route_day_samples: list):
+    # Import massal: refresh kalender per rute-hari (bukan per jadwal), cache dimuat ulang sekali
+    for sched in route_day_samples:
+        fare_calendar.refresh_for_schedule(sched)
+    cache_bus.publish("schedule_bulk")
+
+
+def company_changed(company_id):
+    cache_bus.publish("company", str(company_id))
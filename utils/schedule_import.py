@@ -0,0 +1,184 @@
+# utils/schedule_import.py
+# Import timetable operator (CSV / NDJSON) dari body request secara streaming.
+# Baris divalidasi per chunk, company di-resolve sekali lewat cache, lalu ditulis dengan
+# bulk_write unordered (upsert per company + origin + destination + departure_date).
+# Kolom available_seats di file = kapasitas kendaraan. Jadwal baru: capacity = available_seats = nilai
+# itu; jadwal yang sudah ada: kursi yang sudah terjual dipertahankan, available_seats hanya
+# bergeser sebesar selisih kapasitas baru − lama.
+from database import schedules, companies
+from models.schedule import ScheduleCreate
+from pymongo import UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError
+from pydantic import ValidationError
+from bson import ObjectId
+import codecs
+import csv
+import json
+import re
+import time
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+UPSERT_KEY = ("company_id", "origin", "destination", "departure_date")
+
+
+def ensure_indexes():
+    schedules.create_index([(field, ASCENDING) for field in UPSERT_KEY])
+
+
+async def _lines(stream):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def _rows(stream, fmt: str):
+    # Yield (nomor_baris, dict | Exception)
+    header = None
+    line_no = 0
+    async for line in _lines(stream):
+        line_no += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if len(values) != len(header):
+            yield line_no, ValueError(f"Jumlah kolom {len(values)}, seharusnya {len(header)}")
+            continue
+        # Kolom kosong di CSV dianggap tidak diisi
+        yield line_no, {k: v.strip() for k, v in zip(header, values) if v.strip() != ""}
+
+
+class _CompanyResolver:
+    """Cache company_id/nama → ObjectId untuk satu import; lookup DB sekali per chunk."""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+
+    def prefetch(self, rows: list):
+        ids = {r["company_id"] for r in rows if r.get("company_id") and r["company_id"] not in self.by_id}
+        names = {r["company"].lower() for r in rows if not r.get("company_id") and r.get("company")}
+        names -= set(self.by_name)
+        valid_ids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+        if valid_ids:
+            found = {str(c["_id"]) for c in companies.find({"_id": {"$in": valid_ids}}, {"_id": 1})}
+            for i in ids:
+                self.by_id[i] = ObjectId(i) if i in found else None
+        else:
+            for i in ids:
+                self.by_id[i] = None
+        if names:
+            patterns = [re.compile(f"^{re.escape(n)}$", re.IGNORECASE) for n in names]
+            for c in companies.find({"name": {"$in": patterns}}, {"name": 1}):
+                self.by_name[c["name"].lower()] = c["_id"]
+            for n in names:
+                self.by_name.setdefault(n, None)
+
+    def resolve(self, row: dict):
+        if row.get("company_id"):
+            return self.by_id.get(row["company_id"])
+        if row.get("company"):
+            return self.by_name.get(row["company"].lower())
+        return None
+
+
+def _error(report: dict, line_no: int, message: str):
+    report["error_count"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line_no, "error": message})
+
+
+def _upsert_pipeline(doc: dict) -> list:
+    capacity = doc.pop("available_seats")
+    # Jadwal lama tanpa field capacity dianggap kapasitasnya tidak berubah (stok tidak disentuh)
+    old_capacity = {"$ifNull": ["$capacity", capacity]}
+    return [{"$set": {
+        # $literal: nilai dari file (mis. deskripsi "$...") tidak boleh dibaca sebagai field path
+        **{k: {"$literal": v} for k, v in doc.items()},
+        "available_seats": {"$max": [0, {"$add": [
+            {"$ifNull": ["$available_seats", capacity]},
+            {"$subtract": [capacity, old_capacity]}
+        ]}]},
+        "capacity": capacity
+    }}]
+
+
+def _write_chunk(chunk: list, resolver: _CompanyResolver, report: dict, route_days: dict):
+    resolver.prefetch([row for _, row in chunk])
+    ops = []
+    op_lines = []
+    for line_no, row in chunk:
+        company_id = resolver.resolve(row)
+        if company_id is None:
+            _error(report, line_no, "Perusahaan tidak ditemukan")
+            continue
+        try:
+            sched = ScheduleCreate(**{**row, "company_id": str(company_id)})
+        except ValidationError as e:
+            _error(report, line_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        doc = sched.dict()
+        doc["company_id"] = company_id
+        ops.append(UpdateOne({k: doc[k] for k in UPSERT_KEY}, _upsert_pipeline(doc), upsert=True))
+        op_lines.append(line_no)
+        dep = doc["departure_date"]
+        route_day = (doc["origin"].strip().lower(), doc["destination"].strip().lower(), dep.year, dep.month, dep.day)
+        route_days.setdefault(route_day, doc)
+
+    if not ops:
+        return
+    try:
+        result = schedules.bulk_write(ops, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for err in details["writeErrors"]:
+            _error(report, op_lines[err["index"]], err.get("errmsg", "Gagal menulis"))
+    report["inserted"] += details.get("nUpserted", 0)
+    report["updated"] += details.get("nModified", 0)
+
+
+async def import_schedules(stream, fmt: str) -> tuple:
+    """Return (laporan, satu dokumen contoh per rute-hari yang tersentuh)."""
+    started = time.perf_counter()
+    report = {"rows": 0, "inserted": 0, "updated": 0, "error_count": 0, "errors": []}
+    resolver = _CompanyResolver()
+    route_days = {}
+    chunk = []
+    async for line_no, row in _rows(stream, fmt):
+        report["rows"] += 1
+        if isinstance(row, Exception):
+            _error(report, line_no, str(row))
+            continue
+        if not isinstance(row, dict):
+            _error(report, line_no, "Baris harus berupa object")
+            continue
+        chunk.append((line_no, row))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            _write_chunk(chunk, resolver, report, route_days)
+            chunk = []
+    if chunk:
+        _write_chunk(chunk, resolver, report, route_days)
+
+    report["errors"].sort(key=lambda e: e["line"])
+    elapsed = time.perf_counter() - started
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed else None
+    return report, list(route_days.values())
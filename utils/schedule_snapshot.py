@@ -0,0 +1,260 @@
+# utils/schedule_snapshot.py
+# Read model in-process (opsional) untuk get_schedules: semua jadwal disimpan per kolom
+# di array NumPy (harga, kursi, timestamp, kode origin/destination/type yang di-intern),
+# jadi filter + sort cukup operasi vektor tanpa round-trip ke MongoDB.
+# Aktif jika SCHEDULE_SNAPSHOT=1 dan numpy terpasang; di-refresh per jadwal lewat cache_bus.
+# Hanya jadwal yang belum berangkat yang dimuat/dicari, jadi memori tidak tumbuh oleh histori.
+from database import schedules, companies
+from utils import cache_bus
+from bson import ObjectId
+from datetime import datetime, timedelta
+import os
+import re
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # tanpa numpy, get_schedules tetap lewat aggregation
+    np = None
+
+SNAPSHOT_ENABLED = os.getenv("SCHEDULE_SNAPSHOT", "0") == "1" and np is not None
+LOAD_BATCH_SIZE = 5000
+INITIAL_CAPACITY = 1024
+
+EPOCH = datetime(1970, 1, 1)
+NULL_TS = -(2 ** 63)
+# Kunci sort descending = -timestamp; -NULL_TS overflow int64, jadi null memakai sentinel sendiri
+# (null paling akhir, sama seperti sort descending MongoDB)
+NULL_TS_DESC = 2 ** 63 - 1
+UNKNOWN_COMPANY = {"id": None, "name": "Unknown Operator", "type": "unknown"}
+
+
+def _to_us(dt):
+    if dt is None:
+        return NULL_TS
+    return (dt.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+
+
+def _upcoming(doc: dict) -> bool:
+    # Sama dengan filter load(): departure_date >= sekarang (null/tidak ada → tidak dimuat)
+    departure = doc.get("departure_date")
+    return departure is not None and departure.replace(tzinfo=None) >= datetime.utcnow()
+
+
+def _from_us(value):
+    if value == NULL_TS:
+        return None
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+class _Interner:
+    """String → kode int32; filter regex cukup dicek ke daftar nilai unik."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value) -> int:
+        value = value if value is not None else ""
+        if value not in self.codes:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        return self.codes[value]
+
+    def matching(self, pattern):
+        regex = re.compile(pattern, re.IGNORECASE)
+        return np.array([c for c, v in enumerate(self.values) if regex.search(v)], dtype=np.int32)
+
+
+class ScheduleSnapshot:
+    _INT_COLUMNS = ("price", "seats", "departure", "arrival")
+    _CODE_COLUMNS = ("origin", "destination", "type", "company")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        # schedule_id yang di-refresh selama load() berjalan → diulang sesudah snapshot baru dipasang
+        self._pending = None
+        self._reset()
+
+    def _reset(self, capacity: int = INITIAL_CAPACITY):
+        self._n = 0
+        self._dead = 0
+        self._ids = []
+        self._rows = {}
+        self._cols = {name: np.zeros(capacity, dtype=np.int64) for name in self._INT_COLUMNS}
+        self._cols.update({name: np.zeros(capacity, dtype=np.int32) for name in self._CODE_COLUMNS})
+        self._cols["live"] = np.zeros(capacity, dtype=bool)
+        self._origins = _Interner()
+        self._destinations = _Interner()
+        self._types = _Interner()
+        self._companies = []
+        self._company_idx = {}
+
+    # === Penulisan baris ===
+    def _grow(self):
+        for name, col in self._cols.items():
+            bigger = np.zeros(len(col) * 2, dtype=col.dtype)
+            bigger[:self._n] = col[:self._n]
+            self._cols[name] = bigger
+
+    def _company_code(self, company_id) -> int:
+        if company_id is None:
+            return -1
+        key = str(company_id)
+        if key not in self._company_idx:
+            doc = companies.find_one({"_id": company_id}, {"name": 1, "type": 1})
+            self._company_idx[key] = len(self._companies)
+            self._companies.append(
+                {"id": key, "name": doc.get("name"), "type": doc.get("type")} if doc else None
+            )
+        return self._company_idx[key]
+
+    def _put(self, doc: dict):
+        sid = str(doc["_id"])
+        idx = self._rows.get(sid)
+        if idx is None:
+            if self._n == len(self._cols["live"]):
+                self._grow()
+            idx = self._n
+            self._n += 1
+            self._ids.append(sid)
+            self._rows[sid] = idx
+        c = self._cols
+        c["price"][idx] = doc.get("price", 0)
+        c["seats"][idx] = doc.get("available_seats", 0)
+        c["departure"][idx] = _to_us(doc.get("departure_date"))
+        c["arrival"][idx] = _to_us(doc.get("arrival_date"))
+        c["origin"][idx] = self._origins.code(doc.get("origin"))
+        c["destination"][idx] = self._destinations.code(doc.get("destination"))
+        c["type"][idx] = self._types.code(doc.get("type"))
+        c["company"][idx] = self._company_code(doc.get("company_id"))
+        c["live"][idx] = True
+
+    def _drop(self, sid: str):
+        idx = self._rows.pop(sid, None)
+        if idx is None:
+            return
+        self._cols["live"][idx] = False
+        self._ids[idx] = None
+        self._dead += 1
+
+    def _compact(self):
+        live = np.nonzero(self._cols["live"][:self._n])[0]
+        for name, col in self._cols.items():
+            packed = np.zeros(max(len(live) * 2, INITIAL_CAPACITY), dtype=col.dtype)
+            packed[:len(live)] = col[live]
+            self._cols[name] = packed
+        self._ids = [self._ids[i] for i in live]
+        self._rows = {sid: i for i, sid in enumerate(self._ids)}
+        self._n = len(live)
+        self._dead = 0
+
+    # === Load & refresh ===
+    def load(self):
+        # Array dibangun di snapshot baru tanpa lock (scan MongoDB bisa lama); lock hanya untuk
+        # menukar state, jadi search tetap dilayani snapshot lama selama load
+        with self._lock:
+            if self._pending is None:
+                self._pending = set()
+        fresh = ScheduleSnapshot()
+        for company in companies.find({}, {"name": 1, "type": 1}):
+            fresh._company_idx[str(company["_id"])] = len(fresh._companies)
+            fresh._companies.append({"id": str(company["_id"]), "name": company.get("name"), "type": company.get("type")})
+        query = {"departure_date": {"$gte": datetime.utcnow()}}
+        for doc in schedules.find(query).batch_size(LOAD_BATCH_SIZE):
+            fresh._put(doc)
+        with self._lock:
+            self.__dict__.update({k: v for k, v in vars(fresh).items() if k not in ("_lock", "ready", "_pending")})
+            pending, self._pending = self._pending, None
+            self.ready = True
+        for schedule_id in pending:
+            self.refresh(schedule_id)
+
+    def refresh(self, schedule_id: str):
+        if not ObjectId.is_valid(schedule_id):
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.add(schedule_id)
+                return
+            if not self.ready:
+                return
+        doc = schedules.find_one({"_id": ObjectId(schedule_id)})
+        with self._lock:
+            if doc and _upcoming(doc):
+                self._put(doc)
+            else:
+                self._drop(schedule_id)
+                if self._dead > INITIAL_CAPACITY and self._dead * 2 > self._n:
+                    self._compact()
+
+    def refresh_company(self, company_id: str):
+        if not self.ready or not ObjectId.is_valid(company_id):
+            return
+        doc = companies.find_one({"_id": ObjectId(company_id)}, {"name": 1, "type": 1})
+        with self._lock:
+            idx = self._company_idx.get(company_id)
+            if idx is not None:
+                self._companies[idx] = {"id": company_id, "name": doc.get("name"), "type": doc.get("type")} if doc else None
+
+    # === Query ===
+    def search(self, origin=None, destination=None, type=None, start=None, end=None,
+               price_min=None, price_max=None, sort_field="departure_date", descending=False):
+        """Hasil sama dengan pipeline get_schedules untuk jadwal yang belum berangkat; None jika snapshot
+        belum siap, regex tidak didukung, atau rentang tanggalnya sudah lewat (biar dijawab MongoDB)."""
+        now = datetime.utcnow()
+        if not self.ready or (end is not None and end < now):
+            return None
+        with self._lock:
+            n = self._n
+            c = self._cols
+            mask = c["live"][:n].copy()
+            try:
+                if origin:
+                    mask &= np.isin(c["origin"][:n], self._origins.matching(origin))
+                if destination:
+                    mask &= np.isin(c["destination"][:n], self._destinations.matching(destination))
+                if type:
+                    mask &= np.isin(c["type"][:n], self._types.matching(f"^{type}$"))
+            except re.error:
+                return None
+            # Jadwal yang sudah berangkat sejak load/refresh terakhir ikut tersaring
+            mask &= c["departure"][:n] >= _to_us(max(start, now) if start is not None else now)
+            if end is not None:
+                mask &= c["departure"][:n] <= _to_us(end)
+            if price_min is not None:
+                mask &= c["price"][:n] >= price_min
+            if price_max is not None:
+                mask &= c["price"][:n] <= price_max
+
+            rows = np.nonzero(mask)[0]
+            key = c["price" if sort_field == "price" else "departure"][rows]
+            if descending:
+                key = np.where(key == NULL_TS, NULL_TS_DESC, -key)
+            order = np.argsort(key, kind="stable")
+            return [self._row(i) for i in rows[order]]
+
+    def _row(self, i) -> dict:
+        c = self._cols
+        company_idx = int(c["company"][i])
+        company = self._companies[company_idx] if company_idx >= 0 else None
+        return {
+            "id": self._ids[i],
+            "type": self._types.values[c["type"][i]],
+            "origin": self._origins.values[c["origin"][i]],
+            "destination": self._destinations.values[c["destination"][i]],
+            "departure_date": _from_us(c["departure"][i]),
+            "arrival_date": _from_us(c["arrival"][i]),
+            "price": int(c["price"][i]),
+            "available_seats": int(c["seats"][i]),
+            "company": dict(company) if company else dict(UNKNOWN_COMPANY)
+        }
+
+
+snapshot = ScheduleSnapshot() if SNAPSHOT_ENABLED else None
+
+if SNAPSHOT_ENABLED:
+    cache_bus.subscribe("schedule", snapshot.refresh)
+    cache_bus.subscribe("schedule_bulk", lambda _key: snapshot.load())
+    cache_bus.subscribe("company", snapshot.refresh_company)
@@ -0,0 +1,95 @@
+# utils/search_cache.py
+# Cache hasil pencarian jadwal (GET /api/schedules/) dengan key = filter yang dinormalisasi.
+# Invalidasi murah: satu nomor generasi global yang dinaikkan setiap jadwal/stok kursi
+# berubah, tanpa perlu tahu query mana yang terdampak. Ukuran dibatasi total byte (BSON).
+from utils import cache_bus
+from collections import OrderedDict, Counter
+import bson
+import threading
+import time
+import os
+
+MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "30"))
+
+# key -> (result, size_bytes, expires_at)
+_entries = OrderedDict()
+_generation = 0
+_total_bytes = 0
+_lock = threading.Lock()
+metrics = Counter()
+
+
+def make_key(origin, destination, type, departure_date, price_min, price_max, sort_by, order) -> tuple:
+    # Filter teks dicocokkan case-insensitive → "Jakarta" dan "jakarta" satu entry.
+    # Nilai dengan backslash dibiarkan apa adanya (escape regex seperti \d vs \D beda arti).
+    def norm(value):
+        if not value:
+            return None
+        return value if "\\" in value else value.lower()
+    return (norm(origin), norm(destination), norm(type), departure_date, price_min, price_max, sort_by, order)
+
+
+def _copy(result: list) -> list:
+    # Pemanggil boleh mengubah hasil (mis. menambah rating company) tanpa merusak cache
+    return [{**sched, "company": dict(sched["company"])} for sched in result]
+
+
+def get_or_load(key: tuple, loader) -> list:
+    global _total_bytes
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[2] > now:
+            _entries.move_to_end(key)
+            metrics["hits"] += 1
+            return _copy(entry[0])
+        metrics["misses"] += 1
+        generation = _generation
+
+    result = loader()
+    size = len(bson.encode({"r": result}))
+    with _lock:
+        # Simpan hanya jika tidak ada penulisan jadwal selama query berjalan
+        if generation == _generation and size <= MAX_BYTES:
+            old = _entries.pop(key, None)
+            if old:
+                _total_bytes -= old[1]
+            _entries[key] = (result, size, now + TTL_SECONDS)
+            _total_bytes += size
+            while _total_bytes > MAX_BYTES:
+                _, evicted = _entries.popitem(last=False)
+                _total_bytes -= evicted[1]
+                metrics["evictions"] += 1
+    return _copy(result)
+
+
+def bump(_key=None):
+    """Naikkan generasi: semua hasil pencarian yang tersimpan dianggap basi."""
+    global _generation, _total_bytes
+    with _lock:
+        _generation += 1
+        metrics["invalidations"] += 1
+        _entries.clear()
+        _total_bytes = 0
+
+
+def stats() -> dict:
+    with _lock:
+        lookups = metrics["hits"] + metrics["misses"]
+        return {
+            "size": len(_entries),
+            "bytes": _total_bytes,
+            "max_bytes": MAX_BYTES,
+            "generation": _generation,
+            "hits": metrics["hits"],
+            "misses": metrics["misses"],
+            "evictions": metrics["evictions"],
+            "invalidations": metrics["invalidations"],
+            "hit_rate": round(metrics["hits"] / lookups, 4) if lookups else None
+        }
+
+
+cache_bus.subscribe("schedule", bump)
+cache_bus.subscribe("schedule_bulk", bump)
+cache_bus.subscribe("company", bump)
@@ -0,0 +1,101 @@
+# utils/static_assets.py
+# Aset statis versi build: build() (dipanggil build_static.py) menyalin css/js ke static/dist
+# dengan hash isi di nama file + salinan .gz/.br, lalu menulis ulang index.html ke URL baru.
+# Saat runtime, PrecompressedStaticFiles menyajikan salinan terkompresi sesuai Accept-Encoding;
+# file ber-hash tidak pernah berubah isinya → boleh di-cache browser selamanya (immutable).
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+from utils.compression import negotiate
+import mimetypes
+import stat
+import hashlib
+import gzip
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # tanpa brotli, build hanya menghasilkan .gz
+    brotli = None
+
+STATIC_DIR = "static"
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+ASSETS = ["css/style.css", "js/main.js"]
+INDEX = "index.html"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+NO_CACHE = "no-cache"
+# Urutan preferensi encoding → ekstensi file salinan
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def _write_compressed(path: str, data: bytes) -> dict:
+    sizes = {"raw": len(data)}
+    with open(path + ".gz", "wb") as f:
+        # mtime=0 → output build deterministik
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    sizes["gzip"] = os.path.getsize(path + ".gz")
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        sizes["br"] = os.path.getsize(path + ".br")
+    return sizes
+
+
+def build() -> dict:
+    """Tulis aset ber-hash + salinan terkompresi ke static/dist; return ukuran per file."""
+    os.makedirs(DIST_DIR, exist_ok=True)
+    report = {}
+    with open(os.path.join(STATIC_DIR, INDEX), encoding="utf-8") as f:
+        index_html = f.read()
+
+    for asset in ASSETS:
+        with open(os.path.join(STATIC_DIR, asset), "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(asset)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        target = os.path.join(DIST_DIR, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        report[hashed] = _write_compressed(target, data)
+        index_html = re.sub(rf'(["\'])/static/{re.escape(asset)}\1', rf"\1/static/dist/{hashed}\1", index_html)
+
+    target = os.path.join(DIST_DIR, INDEX)
+    data = index_html.encode("utf-8")
+    with open(target, "wb") as f:
+        f.write(data)
+    report[INDEX] = _write_compressed(target, data)
+    return report
+
+
+def index_path() -> str:
+    # index.html hasil build jika ada, kalau belum build pakai yang asli
+    built = os.path.join(DIST_DIR, INDEX)
+    return built if os.path.exists(built) else os.path.join(STATIC_DIR, INDEX)
+
+
+def file_response(path: str, accept_encoding: str, cache_control: str) -> FileResponse:
+    """FileResponse untuk path, memakai salinan .br/.gz jika ada dan diterima client."""
+    media_type = mimetypes.guess_type(path)[0] or "text/plain"
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    available = [encoding for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)]
+    encoding = negotiate(accept_encoding, available)
+    if encoding:
+        suffix = dict(ENCODINGS)[encoding]
+        return FileResponse(path + suffix, media_type=media_type, headers={**headers, "Content-Encoding": encoding})
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles yang menyajikan static/dist dengan salinan terkompresi + cache immutable."""
+
+    async def get_response(self, path: str, scope):
+        if not path.startswith("dist/") or path.endswith((".gz", ".br")):
+            return await super().get_response(path, scope)
+        full_path, stat_result = self.lookup_path(path)
+        if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+            return await super().get_response(path, scope)
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        cache_control = NO_CACHE if path == f"dist/{INDEX}" else IMMUTABLE
+        return file_response(full_path, accept_encoding, cache_control)
@@ -0,0 +1,129 @@
+# utils/waitlist.py
+# Antrian tunggu FIFO per jadwal yang penuh. Posisi diambil dari counter schedules.waitlist_seq
+# (atomik, $inc) dan di-index unik per jadwal. Saat kursi dilepas, entry terdepan di-claim satu
+# per satu (status waiting → promoting) lalu dibuatkan booking oleh routes/booking.py.
+# FIFO ketat: selama entry terdepan sedang dipromosikan proses lain, entry di belakangnya tidak di-claim.
+# Backend memory (tanpa MongoDB): waitlist tidak tersedia, antrian selalu kosong.
+from database import waitlist, schedules, MONGO_ENABLED
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+
+# Entry "promoting" yang tidak selesai (proses mati di tengah jalan) dianggap waiting lagi
+CLAIM_TIMEOUT = timedelta(seconds=60)
+ENABLED = MONGO_ENABLED
+
+
+def ensure_indexes():
+    waitlist.create_index([("schedule_id", ASCENDING), ("position", ASCENDING)], unique=True)
+    waitlist.create_index([("schedule_id", ASCENDING), ("status", ASCENDING), ("position", ASCENDING)])
+    # Satu user hanya boleh antri sekali per jadwal
+    waitlist.create_index(
+        [("schedule_id", ASCENDING), ("user_id", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"status": "waiting"}
+    )
+
+
+def _queued(schedule_id) -> dict:
+    return {"schedule_id": schedule_id, "status": {"$in": ["waiting", "promoting"]}}
+
+
+def join(schedule_id, user_id, passenger_name: str, passenger_count: int):
+    """Masukkan ke antrian; None jika jadwal tidak ada. DuplicateKeyError jika sudah antri."""
+    counter = schedules.find_one_and_update(
+        {"_id": schedule_id},
+        {"$inc": {"waitlist_seq": 1}},
+        projection={"waitlist_seq": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not counter:
+        return None
+    entry = {
+        "schedule_id": schedule_id,
+        "user_id": user_id,
+        "passenger_name": passenger_name,
+        "passenger_count": passenger_count,
+        "position": counter["waitlist_seq"],
+        "status": "waiting",
+        "created_at": datetime.utcnow()
+    }
+    entry["_id"] = waitlist.insert_one(entry).inserted_id
+    return entry
+
+
+def get(entry_id):
+    return waitlist.find_one({"_id": entry_id})
+
+
+def has_waiting(schedule_id, capacity: int = None) -> bool:
+    """Ada antrian yang harus dilayani dulu? Entry yang lebih besar dari kapasitas jadwal tidak
+    akan pernah muat, jadi tidak dihitung (dan tidak boleh menahan booking langsung)."""
+    if not ENABLED:
+        return False
+    query = _queued(schedule_id)
+    if capacity is not None:
+        query["passenger_count"] = {"$lte": capacity}
+    return waitlist.find_one(query, {"_id": 1}) is not None
+
+
+def ahead(entry: dict) -> int:
+    # Jumlah entry di depan; count pakai index (schedule_id, status, position)
+    return waitlist.count_documents({**_queued(entry["schedule_id"]), "position": {"$lt": entry["position"]}})
+
+
+def claim_head(schedule_id):
+    """Claim entry terdepan secara atomik; None jika antrian kosong atau entry terdepan sedang
+    dipromosikan proses lain (claim-nya belum kedaluwarsa)."""
+    if not ENABLED:
+        return None
+    head = waitlist.find_one(_queued(schedule_id), {"status": 1, "claimed_at": 1}, sort=[("position", ASCENDING)])
+    if not head:
+        return None
+    now = datetime.utcnow()
+    claimable = {"status": "waiting"}
+    if head["status"] == "promoting":
+        if head["claimed_at"] >= now - CLAIM_TIMEOUT:
+            return None
+        claimable = {"status": "promoting", "claimed_at": head["claimed_at"]}
+    # Gagal = proses lain lebih dulu meng-claim entry yang sama → biarkan proses itu yang lanjut
+    return waitlist.find_one_and_update(
+        {"_id": head["_id"], **claimable},
+        {"$set": {"status": "promoting", "claimed_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def release(entry: dict):
+    # Kursi belum cukup untuk entry terdepan → kembali menunggu di posisi yang sama
+    claimed = {"_id": entry["_id"], "status": "promoting"}
+    try:
+        waitlist.update_one(claimed, {"$set": {"status": "waiting"}})
+    except DuplicateKeyError:
+        # User antri lagi selagi entry ini dipromosikan (index unik hanya untuk status waiting).
+        # Entry ini posisinya lebih depan → entry baru digabung ke sini
+        waitlist.update_one(
+            {"schedule_id": entry["schedule_id"], "user_id": entry["user_id"], "status": "waiting"},
+            {"$set": {"status": "merged", "merged_into": entry["_id"]}}
+        )
+        waitlist.update_one(claimed, {"$set": {"status": "waiting"}})
+
+
+def mark_promoted(entry: dict, booking_id):
+    waitlist.update_one(
+        {"_id": entry["_id"]},
+        {"$set": {"status": "promoted", "booking_id": booking_id, "promoted_at": datetime.utcnow()}}
+    )
+
+
+def reject(entry: dict, reason: str):
+    # Entry ter-claim yang tidak akan pernah bisa dipromosikan → keluar dari antrian
+    waitlist.update_one(
+        {"_id": entry["_id"], "status": "promoting"},
+        {"$set": {"status": "rejected", "reason": reason, "rejected_at": datetime.utcnow()}}
+    )
+
+
+def leave(entry_id) -> bool:
+    result = waitlist.update_one({"_id": entry_id, "status": "waiting"}, {"$set": {"status": "left"}})
+    return result.modified_count == 1